@@ -13,6 +13,18 @@ let editor = null;
 let currentChatTelegram = null;
 let currentChatWebsite = null;
 
+// Lists are cursor paginated; only the columns each grid shows are requested
+const PAGE_SIZE = 50;
+const UNIT_FIELDS = 'id,unit_number,unit_type,area_sqm,total_price,status,images';
+const MEDIA_FIELDS = 'id,filename,thumbnail_url,file_size';
+let unitsCursor = null;
+let mediaCursor = null;
+
+// Chat inbox: summaries paged by recency, messages paged backwards per chat
+const CHAT_SOURCES = ['telegram', 'website'];
+const inboxCursors = { telegram: null, website: null };
+const olderMessagesCursors = { telegram: null, website: null };
+
 // ==================== AUTH ====================
 
 async function login(username, password) {
@@ -113,8 +125,9 @@ async function loadDashboard() {
         document.getElementById('active-chats').textContent = stats.chats;
     }
 
-    // Load chats
+    // Load chats, then follow new messages live
     await loadChats();
+    connectChatEvents();
 
     // Load activity
     const activity = await apiCall('/api/activity');
@@ -124,55 +137,169 @@ async function loadDashboard() {
 }
 
 async function loadChats() {
-    const chats = await apiCall('/api/chats');
-    if (chats) {
-        renderTelegramChats(chats.telegram || []);
-        renderWebsiteChats(chats.website || []);
+    const inbox = await apiCall(`/api/chats/inbox?limit=${PAGE_SIZE}`);
+    if (inbox) {
+        CHAT_SOURCES.forEach(source => renderInbox(source, inbox[source]));
+    }
+}
+
+window.loadMoreChats = async function (source) {
+    const params = new URLSearchParams({ source, limit: PAGE_SIZE, cursor: inboxCursors[source] });
+    const page = await apiCall(`/api/chats/inbox?${params}`);
+    if (page) renderInbox(source, page, true);
+}
+
+function renderInbox(source, page, append = false) {
+    const container = document.getElementById(`${source}-chats`);
+    const html = page.items.map(chat => chatItemHtml(source, chat)).join('');
+    if (append) {
+        container.insertAdjacentHTML('beforeend', html);
+    } else {
+        container.innerHTML = html;
     }
+    updateUnreadBadge(source);
+    inboxCursors[source] = page.next_cursor;
+    toggleLoadMore(`${source}-chats-more`, page.next_cursor);
+}
+
+// Names and message texts come from customers: never insert them as HTML
+function escapeHtml(value) {
+    return String(value ?? '').replace(/[&<>"']/g, ch => ({
+        '&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;', "'": '&#39;'
+    })[ch]);
 }
 
-function renderTelegramChats(chats) {
-    const container = document.getElementById('telegram-chats');
-    container.innerHTML = chats.map(chat => `
-        <div class="chat-item" onclick="selectTelegramChat('${chat.id}')">
-            <strong>${chat.user_name}</strong>
-            <p>${chat.messages[chat.messages.length - 1]?.text || ''}</p>
+function chatItemHtml(source, chat) {
+    const select = source === 'telegram' ? 'selectTelegramChat' : 'selectWebsiteChat';
+    return `
+        <div class="chat-item" id="chat-${chat.id}" onclick="${select}('${chat.id}')">
+            <strong>${escapeHtml(source === 'telegram' ? chat.user_name : `Visitor #${chat.user_id}`)}</strong>
+            ${chat.unread_count ? `<span class="unread-count">${Number(chat.unread_count)}</span>` : ''}
+            <p>${escapeHtml(chat.last_message)}</p>
         </div>
-    `).join('');
+    `;
 }
 
-function renderWebsiteChats(chats) {
-    const container = document.getElementById('website-chats');
-    container.innerHTML = chats.map(chat => `
-        <div class="chat-item" onclick="selectWebsiteChat('${chat.id}')">
-            <strong>Visitor #${chat.user_id}</strong>
-            <p>${chat.messages[chat.messages.length - 1]?.text || ''}</p>
+function messageHtml(msg) {
+    return `
+        <div class="message ${msg.from_admin ? 'admin' : 'user'}" data-seq="${Number(msg.seq)}">
+            ${escapeHtml(msg.text)}
         </div>
-    `).join('');
+    `;
 }
 
-window.selectTelegramChat = async function (chatId) {
-    const chats = await apiCall('/api/chats?source=telegram');
-    currentChatTelegram = chats.find(c => c.id === chatId);
+function updateUnreadBadge(source) {
+    const counts = document.querySelectorAll(`#${source}-chats .unread-count`);
+    const unread = [...counts].reduce((sum, el) => sum + Number(el.textContent), 0);
+    document.getElementById(`${source}-unread`).textContent = `${unread} جديدة`;
+}
 
-    const container = document.getElementById('telegram-messages');
-    container.innerHTML = currentChatTelegram.messages.map(msg => `
-        <div class="message ${msg.from_admin ? 'admin' : 'user'}">
-            ${msg.text}
-        </div>
-    `).join('');
+async function loadChatMessages(source, chatId, older = false) {
+    const params = new URLSearchParams({ limit: PAGE_SIZE });
+    if (older) params.set('cursor', olderMessagesCursors[source]);
+    const page = await apiCall(`/api/chats/${chatId}/messages?${params}`);
+    if (!page) return;
+
+    const container = document.getElementById(`${source}-messages`);
+    const html = page.items.map(messageHtml).join('');
+    if (older) {
+        container.querySelector('.load-older')?.remove();
+        container.insertAdjacentHTML('afterbegin', html);
+    } else {
+        container.innerHTML = html;
+    }
+    olderMessagesCursors[source] = page.next_cursor;
+    if (page.next_cursor) {
+        container.insertAdjacentHTML('afterbegin',
+            `<button class="btn-secondary load-more load-older" onclick="loadOlderMessages('${source}')">رسائل أقدم</button>`);
+    }
+}
+
+async function openChat(source, chat) {
+    await loadChatMessages(source, chat.id);
+    if (chat.unread_count) {
+        await apiCall(`/api/chats/${chat.id}/read`, { method: 'POST' });
+    }
+}
+
+window.loadOlderMessages = function (source) {
+    const chat = source === 'telegram' ? currentChatTelegram : currentChatWebsite;
+    if (chat) loadChatMessages(source, chat.id, true);
+}
+
+window.selectTelegramChat = async function (chatId) {
+    currentChatTelegram = await apiCall(`/api/chats/${chatId}`);
+    if (!currentChatTelegram) return;
+    await openChat('telegram', currentChatTelegram);
 }
 
 window.selectWebsiteChat = async function (chatId) {
-    const chats = await apiCall('/api/chats?source=website');
-    currentChatWebsite = chats.find(c => c.id === chatId);
+    currentChatWebsite = await apiCall(`/api/chats/${chatId}`);
+    if (!currentChatWebsite) return;
+    await openChat('website', currentChatWebsite);
+}
 
-    const container = document.getElementById('website-messages');
-    container.innerHTML = currentChatWebsite.messages.map(msg => `
-        <div class="message ${msg.from_admin ? 'admin' : 'user'}">
-            ${msg.text}
-        </div>
-    `).join('');
+// ==================== REAL-TIME CHAT ====================
+// New messages are pushed over WebSocket (SSE when WebSockets fail);
+// reconnects resume after the last event seen.
+
+let lastEventSeq = null;
+let chatEvents = null;
+let wsFailures = 0;
+
+function connectChatEvents() {
+    if (chatEvents) return;
+    const params = new URLSearchParams({ token: authToken });
+    if (lastEventSeq !== null) params.set('since', lastEventSeq);
+
+    if (wsFailures < 3 && 'WebSocket' in window) {
+        const socket = new WebSocket(`${API_BASE.replace(/^http/, 'ws')}/api/chats/ws?${params}`);
+        let opened = false;
+        socket.onopen = () => { opened = true; wsFailures = 0; };
+        socket.onmessage = (e) => handleChatEvent(JSON.parse(e.data));
+        socket.onclose = () => {
+            chatEvents = null;
+            if (!opened) wsFailures++;
+            setTimeout(connectChatEvents, opened ? 1000 : 3000);
+        };
+        chatEvents = socket;
+    } else {
+        // EventSource reconnects by itself and resumes with Last-Event-ID
+        const source = new EventSource(`${API_BASE}/api/chats/events?${params}`);
+        ['message', 'read', 'reset'].forEach(type =>
+            source.addEventListener(type, (e) => handleChatEvent(JSON.parse(e.data))));
+        chatEvents = source;
+    }
+}
+
+async function handleChatEvent(event) {
+    lastEventSeq = event.seq;
+    if (event.type === 'reset') {
+        // Missed events: reload from the REST API
+        await loadChats();
+        if (currentChatTelegram) await loadChatMessages('telegram', currentChatTelegram.id);
+        if (currentChatWebsite) await loadChatMessages('website', currentChatWebsite.id);
+        return;
+    }
+
+    const { source, chat, message } = event;
+    const current = source === 'telegram' ? currentChatTelegram : currentChatWebsite;
+    const isOpen = current && current.id === chat.id;
+
+    if (event.type === 'message') {
+        // Move the conversation to the top of its inbox
+        document.getElementById(`chat-${chat.id}`)?.remove();
+        document.getElementById(`${source}-chats`).insertAdjacentHTML('afterbegin', chatItemHtml(source, chat));
+
+        const container = document.getElementById(`${source}-messages`);
+        if (isOpen && !container.querySelector(`[data-seq="${message.seq}"]`)) {
+            container.insertAdjacentHTML('beforeend', messageHtml(message));
+            if (!message.from_admin) await apiCall(`/api/chats/${chat.id}/read`, { method: 'POST' });
+        }
+    } else if (event.type === 'read') {
+        document.querySelector(`#chat-${chat.id} .unread-count`)?.remove();
+    }
+    updateUnreadBadge(source);
 }
 
 window.sendTelegramMessage = async function () {
@@ -272,7 +399,7 @@ function initEditor() {
     });
 }
 
-window.savePage = async function () {
+window.savePage = async function (isPublished = false) {
     if (!editor) return;
 
     const html = editor.getHtml();
@@ -284,11 +411,11 @@ window.savePage = async function () {
         body: JSON.stringify({
             slug,
             content: { html, css },
-            is_published: false
+            is_published: isPublished
         })
     });
 
-    alert('تم الحفظ بنجاح!');
+    if (!isPublished) alert('تم الحفظ بنجاح!');
 }
 
 window.previewPage = function () {
@@ -299,23 +426,38 @@ window.previewPage = function () {
 }
 
 window.publishPage = async function () {
-    await savePage();
-    // Mark as published
+    // Publishing prerenders the page to static HTML on the server
+    await savePage(true);
     alert('تم النشر بنجاح!');
 }
 
 // ==================== UNITS ====================
 
-async function loadUnits() {
-    const units = await apiCall('/api/units');
+function listQuery(fields, cursor) {
+    const params = new URLSearchParams({ limit: PAGE_SIZE, fields });
+    if (cursor) params.set('cursor', cursor);
+    return params.toString();
+}
+
+function toggleLoadMore(buttonId, cursor) {
+    document.getElementById(buttonId).style.display = cursor ? '' : 'none';
+}
+
+async function loadUnits(append = false) {
+    const units = await apiCall(`/api/units?${listQuery(UNIT_FIELDS, append ? unitsCursor : null)}`);
     if (units) {
-        renderUnits(units.units);
+        renderUnits(units.units, append);
+        unitsCursor = units.next_cursor;
+        toggleLoadMore('units-load-more', unitsCursor);
     }
 }
 
-function renderUnits(units) {
+window.loadMoreUnits = () => loadUnits(true);
+
+function renderUnits(units, append = false) {
     const container = document.getElementById('units-grid');
-    container.innerHTML = units.map(unit => `
+    if (!append) container.innerHTML = '';
+    container.insertAdjacentHTML('beforeend', units.map(unit => `
         <div class="unit-card">
             <img src="${unit.images?.[0] || '/placeholder.jpg'}" alt="${unit.unit_number}">
             <div class="unit-info">
@@ -326,21 +468,26 @@ function renderUnits(units) {
                 <span class="status ${unit.status}">${unit.status}</span>
             </div>
         </div>
-    `).join('');
+    `).join(''));
 }
 
 // ==================== MEDIA ====================
 
-async function loadMedia() {
-    const media = await apiCall('/api/media');
+async function loadMedia(append = false) {
+    const media = await apiCall(`/api/media?${listQuery(MEDIA_FIELDS, append ? mediaCursor : null)}`);
     if (media) {
-        renderMedia(media.media);
+        renderMedia(media.media, append);
+        mediaCursor = media.next_cursor;
+        toggleLoadMore('media-load-more', mediaCursor);
     }
 }
 
-function renderMedia(mediaFiles) {
+window.loadMoreMedia = () => loadMedia(true);
+
+function renderMedia(mediaFiles, append = false) {
     const container = document.getElementById('media-grid');
-    container.innerHTML = mediaFiles.map(file => `
+    if (!append) container.innerHTML = '';
+    container.insertAdjacentHTML('beforeend', mediaFiles.map(file => `
         <div class="media-card">
             <img src="${file.thumbnail_url}" alt="${file.filename}">
             <div class="media-info">
@@ -348,7 +495,7 @@ function renderMedia(mediaFiles) {
                 <small>${(file.file_size / 1024).toFixed(2)} KB</small>
             </div>
         </div>
-    `).join('');
+    `).join(''));
 }
 
 window.openUploadModal = function () {
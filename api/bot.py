@@ -1,23 +1,46 @@
-import requests
 import asyncio
-from typing import Dict, Any
+from typing import Any, Callable, Dict, Optional
 from .config import settings
-from .services.supabase_service import db
+from .services.database import db
 from .services.nlp_service import NLPCommandProcessor
 from .services.chat_service import chat_service
+from .services.unit_search import unit_search
+from .services.telegram_sender import telegram_sender
+from .services.ai_cache import ai_cache
+from .services.groq_client import groq_client, AIUnavailable
+from .services.conversation_memory import conversation_memory, Conversation
 
 # Initialize NLP Processor
 nlp = NLPCommandProcessor()
 
 async def send_message(chat_id: str, text: str):
-    """Send message to Telegram user"""
-    url = f"https://api.telegram.org/bot{settings.TELEGRAM_TOKEN}/sendMessage"
-    payload = {
-        "chat_id": chat_id,
-        "text": text,
-        "parse_mode": "Markdown"
-    }
-    requests.post(url, json=payload)
+    """Send message to Telegram user (rate limited, retried)"""
+    return await telegram_sender.send_message(chat_id, text)
+
+def format_search_reply(result: Dict[str, Any]) -> str:
+    """Format unit search results as a customer reply"""
+    units = result['units']
+    if not units:
+        return "🔍 للأسف مفيش وحدات متاحة دلوقتي بالمواصفات دي، سيب رقمك وهنكلمك أول ما يتوفر."
+
+    if result['exact']:
+        header = f"🔍 لقيت لك {result['total']} وحدات متاحة تناسب طلبك، دي أقربهم:"
+    else:
+        header = "🔍 مفيش وحدة مطابقة بالظبط، بس دي أقرب الوحدات المتاحة لطلبك:"
+
+    lines = [header]
+    for unit in units:
+        details = [f"🏠 وحدة {unit.get('unit_number', '')}"]
+        if unit.get('bedrooms'):
+            details.append(f"{unit['bedrooms']} غرف")
+        if unit.get('floor_number') is not None:
+            details.append(f"دور {unit['floor_number']}")
+        if unit.get('area_sqm'):
+            details.append(f"{unit['area_sqm']:g} م²")
+        if unit.get('total_price'):
+            details.append(f"{unit['total_price']:,.0f}")
+        lines.append(" - ".join(details))
+    return "\n".join(lines)
 
 async def process_update(data: Dict[str, Any]):
     """Process incoming Telegram update"""
@@ -31,7 +54,7 @@ async def process_update(data: Dict[str, Any]):
     text = message.get('text', '')
 
     # 1. Save message to database
-    await chat_service.save_message(
+    chat = await chat_service.save_message(
         source='telegram',
         user_id=user_id,
         user_name=user_name,
@@ -59,10 +82,7 @@ async def process_update(data: Dict[str, Any]):
             
         elif command_type == "unknown":
             # If admin speaks normally, fall back to AI or just echo
-            response = await ask_groq_ai(text, persona="admin_assistant")
-            await send_message(chat_id, response)
-            # Save bot response
-            await chat_service.save_message(source='telegram', user_id=user_id, user_name="Bot", message=response, is_from_admin=True)
+            await reply_with_ai(chat_id, chat['id'], user_id, text, persona="admin_assistant")
 
     else:
         # --- SALES MODE: Customer Support ---
@@ -70,20 +90,43 @@ async def process_update(data: Dict[str, Any]):
         command_type, parsed_data = nlp.process_command(text)
         
         if command_type == "search_units":
-            # Perform DB search
-            units = await db.get_units(status='available')
-            # Filter logic (simplified)
-            count = len(units)
-            await send_message(chat_id, f"🔍 لقيت لك {count} وحدات متاحة تناسب طلبك.")
+            result = await unit_search.search(parsed_data['filters'], project=parsed_data.get('project_id'))
+            await send_message(chat_id, format_search_reply(result))
         else:
             # 2. General AI Chat (Groq)
-            response = await ask_groq_ai(text, persona="sales_agent")
-            await send_message(chat_id, response)
-            # Save bot response
-            await chat_service.save_message(source='telegram', user_id=user_id, user_name="Bot", message=response, is_from_admin=True)
+            await reply_with_ai(chat_id, chat['id'], user_id, text, persona="sales_agent")
 
-async def ask_groq_ai(text: str, persona: str = "sales_agent") -> str:
-    """Get response from Groq AI"""
+async def reply_with_ai(chat_id: str, conversation_id: str, user_id: str, text: str, persona: str):
+    """Answer with the AI, streaming the reply into a placeholder message, then save it"""
+    conversation = await conversation_memory.get(conversation_id)
+    if settings.GROQ_STREAMING:
+        stream = telegram_sender.stream(chat_id)
+        stream.start()
+        response = None
+        try:
+            response = await ask_groq_ai(text, persona=persona, on_text=stream.update, conversation=conversation)
+        finally:
+            # Whatever went wrong, the placeholder never stays at "…"
+            await stream.finish(response or stream.text or await unavailable_reply(text, persona))
+    else:
+        response = await ask_groq_ai(text, persona=persona, conversation=conversation)
+        await send_message(chat_id, response)
+    # Save bot response
+    await chat_service.save_message(source='telegram', user_id=user_id, user_name="Bot", message=response, is_from_admin=True)
+
+async def ask_groq_ai(
+    text: str,
+    persona: str = "sales_agent",
+    on_text: Optional[Callable[[str], None]] = None,
+    conversation: Optional[Conversation] = None
+) -> str:
+    """
+    Get response from Groq AI.
+    With `on_text`, the completion is streamed and on_text receives the
+    reply so far as tokens arrive (cached replies are returned directly).
+    With a `conversation` whose last turn is `text`, its summary and recent
+    turns are sent as context; cached replies are only used for a first message.
+    """
     if not settings.GROQ_API_KEY:
         return "⚠️ عذراً، خدمة الذكاء الاصطناعي غير مفعلة حالياً."
 
@@ -102,25 +145,73 @@ async def ask_groq_ai(text: str, persona: str = "sales_agent") -> str:
         - لو الأمر مش واضح، اطلب توضيح.
         """
 
-    url = "https://api.groq.com/openai/v1/chat/completions"
-    headers = {
-        "Authorization": f"Bearer {settings.GROQ_API_KEY}",
-        "Content-Type": "application/json"
-    }
-    payload = {
-        "messages": [
+    if conversation is not None and conversation.turns and conversation.turns[-1]['role'] == 'user':
+        messages = conversation.messages(system_prompt)
+        cacheable = not conversation.has_history
+    else:
+        messages = [
             {"role": "system", "content": system_prompt},
             {"role": "user", "content": text}
-        ],
-        "model": "llama-3.3-70b-versatile",
-        "temperature": 0.7
-    }
+        ]
+        cacheable = True
+    partial = ""
+
+    async def stream_completion() -> str:
+        nonlocal partial
+        async for delta in groq_client.stream(messages):
+            partial += delta
+            on_text(partial)
+        return partial
 
     try:
-        response = requests.post(url, json=payload, headers=headers)
-        if response.status_code == 200:
-            return response.json()['choices'][0]['message']['content']
-        else:
-            return "عذراً، في مشكلة في الاتصال بالذكاء الاصطناعي."
+        create = stream_completion if on_text else lambda: groq_client.complete(messages)
+        if not cacheable:
+            # The answer depends on the conversation so far
+            return await create()
+        return await ai_cache.get_or_create(persona, text, create)
+    except AIUnavailable:
+        if partial:
+            # Cut short mid-stream: keep what the customer already sees
+            return partial
+        return await unavailable_reply(text, persona)
+
+async def unavailable_reply(text: str, persona: str) -> str:
+    """Reply used when the AI gave no answer"""
+    if persona == "sales_agent":
+        return await fallback_reply(text)
+    return "عذراً، في مشكلة في الاتصال بالذكاء الاصطناعي."
+
+def format_price(value: float) -> str:
+    if value >= 1000000:
+        return f"{value / 1000000:g} مليون"
+    return f"{value:,.0f}"
+
+async def fallback_reply(text: str) -> str:
+    """Instant templated answer from the NLP intent and live unit data, used while the AI is unavailable"""
+    intent = nlp.detect_intent(text)
+    contact = "سيب رقم تليفونك وحد من فريق المبيعات هيكلمك في أقرب وقت 📞"
+    try:
+        overview = await unit_search.overview(nlp.extract_project_id(text))
     except Exception as e:
-        return f"حدث خطأ: {str(e)}"
+        print(f"Fallback Reply Error: {e}")
+        return f"أهلاً بيك يا فندم 👋\n{contact}"
+
+    names = "، ".join(p.get('name_ar') or p.get('name', '') for p in overview['projects'])
+    if intent == "price" and overview['price_min']:
+        reply = f"💰 أسعار الوحدات المتاحة تبدأ من {format_price(overview['price_min'])}"
+        if overview['price_max'] != overview['price_min']:
+            reply += f" لحد {format_price(overview['price_max'])}"
+        reply += " جنيه."
+    elif intent == "location" and overview['projects']:
+        places = [f"📍 {p.get('name_ar') or p.get('name', '')}: {p['location']}" for p in overview['projects'] if p.get('location')]
+        reply = "\n".join(places) if places else f"🏢 مشاريعنا: {names}."
+    elif intent in ("availability", "price") and overview['available']:
+        reply = f"🏠 عندنا دلوقتي {overview['available']} وحدة متاحة"
+        if overview['bedrooms']:
+            reply += f" ({'، '.join(str(b) for b in overview['bedrooms'])} غرف)"
+        reply += "."
+    elif names:
+        reply = f"أهلاً بيك يا فندم 👋 في كيان برو، مشاريعنا: {names}."
+    else:
+        reply = "أهلاً بيك يا فندم 👋 في كيان برو."
+    return f"{reply}\n{contact}"
@@ -8,6 +8,26 @@ class Settings(BaseSettings):
     
     # AI (Groq)
     GROQ_API_KEY: str = os.getenv("GROQ_API_KEY", "")
+    GROQ_API_URL: str = os.getenv("GROQ_API_URL", "https://api.groq.com/openai/v1")
+    GROQ_STREAMING: bool = os.getenv("GROQ_STREAMING", "true").lower() == "true"  # edit replies in place as tokens arrive
+    CONVERSATION_RECENT_TOKENS: int = int(os.getenv("CONVERSATION_RECENT_TOKENS", "1200"))  # recent turns sent verbatim
+    CONVERSATION_SUMMARY_TOKENS: int = int(os.getenv("CONVERSATION_SUMMARY_TOKENS", "300"))  # older turns, compacted
+    CONVERSATION_LOAD_LIMIT: int = int(os.getenv("CONVERSATION_LOAD_LIMIT", "40"))  # messages read on first use
+    CONVERSATION_CACHE_SIZE: int = int(os.getenv("CONVERSATION_CACHE_SIZE", "2000"))  # chats kept per worker
+    GROQ_TIMEOUT: float = float(os.getenv("GROQ_TIMEOUT", "15"))  # deadline per reply, queueing included
+    GROQ_FIRST_TOKEN_TIMEOUT: float = float(os.getenv("GROQ_FIRST_TOKEN_TIMEOUT", "10"))  # streamed replies: seconds to the first token
+    GROQ_STREAM_IDLE_TIMEOUT: float = float(os.getenv("GROQ_STREAM_IDLE_TIMEOUT", "5"))  # streamed replies: longest gap between chunks
+    GROQ_MAX_CONCURRENCY: int = int(os.getenv("GROQ_MAX_CONCURRENCY", "4"))
+    GROQ_MAX_WAITING: int = int(os.getenv("GROQ_MAX_WAITING", "16"))  # beyond this, answer from templates
+    GROQ_SLOW_CALL: float = float(os.getenv("GROQ_SLOW_CALL", "8"))  # seconds; slower calls count as failures
+    GROQ_BREAKER_WINDOW: int = int(os.getenv("GROQ_BREAKER_WINDOW", "20"))  # recent calls considered
+    GROQ_BREAKER_MIN_CALLS: int = int(os.getenv("GROQ_BREAKER_MIN_CALLS", "5"))
+    GROQ_BREAKER_FAILURE_RATE: float = float(os.getenv("GROQ_BREAKER_FAILURE_RATE", "0.5"))
+    GROQ_BREAKER_COOLDOWN: float = float(os.getenv("GROQ_BREAKER_COOLDOWN", "30"))  # seconds open
+    AI_CACHE_SIZE: int = int(os.getenv("AI_CACHE_SIZE", "2000"))  # cached replies
+    AI_CACHE_TTL: float = float(os.getenv("AI_CACHE_TTL", "21600"))  # seconds
+    AI_CACHE_PATH: str = os.getenv("AI_CACHE_PATH", "ai_cache.json")  # empty = memory only, ignored when SERVERLESS
+    AI_CACHE_PERSONAS: str = os.getenv("AI_CACHE_PERSONAS", "sales_agent")  # comma separated
     
     # Database (Supabase)
     SUPABASE_URL: str = os.getenv("SUPABASE_URL", "")
@@ -19,15 +39,85 @@ class Settings(BaseSettings):
     CLOUDINARY_API_KEY: str = os.getenv("CLOUDINARY_API_KEY", "")
     CLOUDINARY_API_SECRET: str = os.getenv("CLOUDINARY_API_SECRET", "")
 
+    # Media files: "auto" (Cloudinary when configured, local disk otherwise), "cloudinary" or "local"
+    MEDIA_STORAGE: str = os.getenv("MEDIA_STORAGE", "auto")
+    MEDIA_ROOT: str = os.getenv("MEDIA_ROOT", "media")  # local storage directory
+    MEDIA_URL: str = os.getenv("MEDIA_URL", "/media")  # URL of MEDIA_ROOT; a path is served by the API
+    MEDIA_MAX_UPLOAD_SIZE: int = int(os.getenv("MEDIA_MAX_UPLOAD_SIZE", str(25 * 1024 * 1024)))  # bytes
+    MEDIA_SPOOL_DIR: str = os.getenv("MEDIA_SPOOL_DIR", "")  # uploads are spooled here; empty = system temp dir
+    MEDIA_UPLOAD_RETRIES: int = int(os.getenv("MEDIA_UPLOAD_RETRIES", "2"))  # per file
+    MEDIA_UPLOAD_BACKOFF: float = float(os.getenv("MEDIA_UPLOAD_BACKOFF", "0.5"))  # seconds, doubled per retry
+
+    # Image processing (0 workers = thread pool, for hosts without multiprocessing)
+    IMAGE_WORKERS: int = int(os.getenv("IMAGE_WORKERS", str(min(4, os.cpu_count() or 1))))  # processes, ignored when SERVERLESS
+    IMAGE_QUEUE_SIZE: int = int(os.getenv("IMAGE_QUEUE_SIZE", "8"))  # jobs waiting beyond busy workers
+    IMAGE_JOB_TIMEOUT: float = float(os.getenv("IMAGE_JOB_TIMEOUT", "60"))  # seconds per image
+    IMAGE_WIDTHS: str = os.getenv("IMAGE_WIDTHS", "320,640,960,1280,1920")  # srcset widths, comma-separated
+    IMAGE_MAX_PIXELS: int = int(os.getenv("IMAGE_MAX_PIXELS", "50000000"))  # width x height, checked before decoding
+    IMAGE_AVIF: bool = os.getenv("IMAGE_AVIF", "false").lower() == "true"  # AVIF next to WebP (needs Pillow AVIF support)
+
+    # Storage backend: "auto", "supabase", "jsonbin" or "sqlite"
+    DB_BACKEND: str = os.getenv("DB_BACKEND", "auto")
+    SQLITE_PATH: str = os.getenv("SQLITE_PATH", "kayan_pro.db")
+
     # Legacy DB (JSONBin) - Auto-Fallback
     JSONBIN_ID: str = os.getenv("JSONBIN_ID", "6966a8fad0ea881f4069c8df")
     JSONBIN_KEY: str = os.getenv("JSONBIN_KEY", "$2a$10$I3My9ywZFIufic9w1dpf5ON5h4pfPTpFXg5Gt.qC4ty2rFd5ZCmsO")
+    JSONBIN_CACHE_TTL: float = float(os.getenv("JSONBIN_CACHE_TTL", "30"))  # seconds a bin snapshot is reused
+    JSONBIN_FLUSH_INTERVAL: float = float(os.getenv("JSONBIN_FLUSH_INTERVAL", "1.0"))  # write-behind window
     
+    # Outbound HTTP pool & sync executor
+    HTTP_TIMEOUT: float = float(os.getenv("HTTP_TIMEOUT", "15"))
+    HTTP_MAX_CONNECTIONS: int = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+    HTTP_MAX_KEEPALIVE: int = int(os.getenv("HTTP_MAX_KEEPALIVE", "20"))
+    SYNC_EXECUTOR_WORKERS: int = int(os.getenv("SYNC_EXECUTOR_WORKERS", "8"))
+
+    # Unit search engine
+    UNIT_SEARCH_TTL: float = float(os.getenv("UNIT_SEARCH_TTL", "60"))  # seconds between full reloads
+    UNIT_SEARCH_BUDGET_MS: float = float(os.getenv("UNIT_SEARCH_BUDGET_MS", "50"))
+
+    # Public page cache (seconds)
+    PAGE_CACHE_TTL: int = int(os.getenv("PAGE_CACHE_TTL", "60"))
+    PAGE_CACHE_SWR: int = int(os.getenv("PAGE_CACHE_SWR", "300"))
+
+    # Telegram webhook processing (0 workers = process inline, for serverless hosts)
+    WEBHOOK_WORKERS: int = int(os.getenv("WEBHOOK_WORKERS", "4"))  # ignored when SERVERLESS
+    WEBHOOK_QUEUE_SIZE: int = int(os.getenv("WEBHOOK_QUEUE_SIZE", "100"))  # per worker
+    WEBHOOK_DEDUPE_WINDOW: int = int(os.getenv("WEBHOOK_DEDUPE_WINDOW", "10000"))  # remembered update_ids
+    WEBHOOK_DRAIN_TIMEOUT: float = float(os.getenv("WEBHOOK_DRAIN_TIMEOUT", "10"))  # seconds on shutdown
+    TELEGRAM_WEBHOOK_SECRET: str = os.getenv("TELEGRAM_WEBHOOK_SECRET", "")
+
+    # Outbound Telegram (Bot API limits: ~30 msg/s per bot, ~1 msg/s per chat)
+    TELEGRAM_API_URL: str = os.getenv("TELEGRAM_API_URL", "https://api.telegram.org")
+    TELEGRAM_GLOBAL_RATE: float = float(os.getenv("TELEGRAM_GLOBAL_RATE", "30"))  # messages/s
+    TELEGRAM_CHAT_RATE: float = float(os.getenv("TELEGRAM_CHAT_RATE", "1"))  # messages/s per chat
+    TELEGRAM_CHAT_BURST: float = float(os.getenv("TELEGRAM_CHAT_BURST", "3"))
+    TELEGRAM_EDIT_INTERVAL: float = float(os.getenv("TELEGRAM_EDIT_INTERVAL", "1.0"))  # seconds between edits of a streamed reply
+    TELEGRAM_MAX_RETRIES: int = int(os.getenv("TELEGRAM_MAX_RETRIES", "4"))
+    TELEGRAM_BACKOFF_BASE: float = float(os.getenv("TELEGRAM_BACKOFF_BASE", "0.5"))  # seconds
+    TELEGRAM_BACKOFF_MAX: float = float(os.getenv("TELEGRAM_BACKOFF_MAX", "30"))
+    TELEGRAM_BROADCAST_RATE: float = float(os.getenv("TELEGRAM_BROADCAST_RATE", "20"))  # share of the global rate
+    TELEGRAM_BROADCAST_CONCURRENCY: int = int(os.getenv("TELEGRAM_BROADCAST_CONCURRENCY", "8"))
+    TELEGRAM_BROADCAST_QUEUE: int = int(os.getenv("TELEGRAM_BROADCAST_QUEUE", "10000"))
+
+    # Real-time chat events (WebSocket / SSE)
+    CHAT_EVENTS_HISTORY: int = int(os.getenv("CHAT_EVENTS_HISTORY", "1000"))  # events kept for replay
+    CHAT_EVENTS_QUEUE: int = int(os.getenv("CHAT_EVENTS_QUEUE", "256"))  # per-client backlog
+    CHAT_EVENTS_HEARTBEAT: float = float(os.getenv("CHAT_EVENTS_HEARTBEAT", "15"))  # seconds
+
+    # Response compression
+    COMPRESSION_MIN_SIZE: int = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))  # bytes
+    GZIP_LEVEL: int = int(os.getenv("GZIP_LEVEL", "6"))
+    BROTLI_QUALITY: int = int(os.getenv("BROTLI_QUALITY", "5"))
+
     # Admin Panel
     ADMIN_USERNAME: str = os.getenv("ADMIN_USERNAME", "admin")
     ADMIN_PASSWORD: str = os.getenv("ADMIN_PASSWORD", "")
     JWT_SECRET: str = os.getenv("JWT_SECRET", "change-this-secret-key")
     
+    # Hosting: functions are frozen once the response is sent (Vercel sets VERCEL=1)
+    SERVERLESS: bool = os.getenv("SERVERLESS", "true" if os.getenv("VERCEL") else "false").lower() == "true"
+
     # Domains
     PUBLIC_DOMAIN: str = os.getenv("PUBLIC_DOMAIN", "kayan-pro.vercel.app")
     ADMIN_DOMAIN: str = os.getenv("ADMIN_DOMAIN", "kayan-admin.vercel.app")
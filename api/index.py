@@ -1,17 +1,44 @@
-from fastapi import FastAPI, Request, UploadFile, File, HTTPException, Depends
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, Request, HTTPException, Depends, Query, WebSocket, WebSocketDisconnect
+from fastapi.responses import JSONResponse, Response, HTMLResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.staticfiles import StaticFiles
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from typing import List, Optional
+from pathlib import Path
+import asyncio
+import weakref
 import jwt
 from datetime import datetime, timedelta
 
 from .config import settings
-from .services.supabase_service import db
-from .services.image_optimizer import image_optimizer
-from .services.chat_service import chat_service
-
-app = FastAPI(title="Kayan Pro CMS API", version="2.0.0")
+from .services.database import db
+from .services.storage_backend import StorageUnavailable
+from .services.image_optimizer import image_optimizer, ImageRejected, ImageTooLarge
+from .services.image_pool import image_pool, ImagePoolBusy, ImageJobTimeout
+from .services.media_storage import media_storage, LocalStorage
+from .services.upload_spool import spool_request, SpooledUpload, UploadTooLarge, BadUpload
+from .services.chat_service import chat_service, SOURCES
+from .services.chat_events import chat_events
+from .services.update_queue import update_dispatcher, QueueFull
+from .services.telegram_sender import telegram_sender
+from .services.ai_cache import ai_cache
+from .services.groq_client import groq_client
+from .services.conversation_memory import conversation_memory
+from .services.http_client import close_http_client
+from .services.pagination import DEFAULT_LIMIT, parse_fields
+from .services.unit_search import unit_search
+from .services.page_cache import page_cache, etag_matches
+from .services.serialization import FastJSONResponse, CompressionMiddleware, dumps
+
+app = FastAPI(title="Kayan Pro CMS API", version="2.0.0", default_response_class=FastJSONResponse)
+
+# Compress large JSON/HTML responses (br or gzip, per Accept-Encoding)
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=settings.COMPRESSION_MIN_SIZE,
+    gzip_level=settings.GZIP_LEVEL,
+    brotli_quality=settings.BROTLI_QUALITY
+)
 
 # CORS Configuration
 app.add_middleware(
@@ -27,8 +54,37 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+class MediaFiles(StaticFiles):
+    """Media files are named by content hash and never change"""
+
+    def file_response(self, *args, **kwargs):
+        response = super().file_response(*args, **kwargs)
+        response.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+        return response
+
+# Files of the local media store (Cloudinary serves its own)
+if isinstance(media_storage, LocalStorage) and settings.MEDIA_URL.startswith("/"):
+    media_storage.root.mkdir(parents=True, exist_ok=True)
+    app.mount(settings.MEDIA_URL.rstrip("/"), MediaFiles(directory=media_storage.root), name="media")
+
 security = HTTPBearer()
 
+@app.exception_handler(StorageUnavailable)
+async def storage_unavailable(request: Request, exc: StorageUnavailable):
+    """A write the storage engine could not save"""
+    return JSONResponse(status_code=503, content={"detail": str(exc)})
+
+@app.on_event("shutdown")
+async def shutdown():
+    """End event streams, finish queued updates, stop image workers, save the AI cache, flush storage backend and close pooled connections"""
+    chat_events.close()
+    await update_dispatcher.close()
+    await telegram_sender.close()
+    image_pool.close()
+    ai_cache.save()
+    await db.close()
+    await close_http_client()
+
 # ==================== AUTH ====================
 
 def create_access_token(data: dict):
@@ -38,16 +94,19 @@ def create_access_token(data: dict):
     to_encode.update({"exp": expire})
     return jwt.encode(to_encode, settings.JWT_SECRET, algorithm="HS256")
 
-def verify_token(credentials: HTTPAuthorizationCredentials = Depends(security)):
-    """Verify JWT token"""
+def decode_token(token: str) -> dict:
+    """Decode a JWT, raising 401 when it is invalid or expired"""
     try:
-        payload = jwt.decode(credentials.credentials, settings.JWT_SECRET, algorithms=["HS256"])
-        return payload
+        return jwt.decode(token, settings.JWT_SECRET, algorithms=["HS256"])
     except jwt.ExpiredSignatureError:
         raise HTTPException(status_code=401, detail="Token expired")
-    except jwt.JWTError:
+    except jwt.InvalidTokenError:
         raise HTTPException(status_code=401, detail="Invalid token")
 
+def verify_token(credentials: HTTPAuthorizationCredentials = Depends(security)):
+    """Verify JWT token"""
+    return decode_token(credentials.credentials)
+
 @app.post("/api/auth/login")
 async def login(request: Request):
     """Admin login"""
@@ -61,7 +120,35 @@ async def login(request: Request):
     
     raise HTTPException(status_code=401, detail="Invalid credentials")
 
-# ==================== HEALTH CHECK ====================
+# ==================== PAGINATION ====================
+
+async def list_page(
+    key: str,
+    table: str,
+    filters: Optional[dict] = None,
+    limit: int = DEFAULT_LIMIT,
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    include_total: bool = False,
+    contains: Optional[dict] = None
+) -> dict:
+    """Keyset-paginated list response: {key: [...], 'next_cursor': ..., 'total'?}"""
+    try:
+        page = await db.paginate(
+            table,
+            filters=filters,
+            limit=limit,
+            cursor=cursor,
+            fields=parse_fields(fields),
+            with_total=include_total,
+            contains=contains
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    response = {key: page['items'], 'next_cursor': page['next_cursor']}
+    if include_total:
+        response['total'] = page['total']
+    return response
 
 # ==================== HEALTH CHECK ====================
 
@@ -104,6 +191,9 @@ async def seed_database():
             "is_published": True
         })
         
+        page_cache.invalidate(slug="home")
+        page_cache.invalidate(slug="calculator")
+
         return {"status": "success", "message": "Database seeded successfully!"}
     except Exception as e:
         return {"status": "error", "message": str(e)}
@@ -111,10 +201,15 @@ async def seed_database():
 # ==================== PROJECTS ====================
 
 @app.get("/api/projects")
-async def get_projects(status: Optional[str] = None):
-    """Get all projects"""
-    projects = await db.get_projects(status=status)
-    return {"projects": projects}
+async def get_projects(
+    status: Optional[str] = None,
+    limit: int = DEFAULT_LIMIT,
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    include_total: bool = False
+):
+    """Get projects (newest first, cursor paginated)"""
+    return await list_page("projects", "projects", {"status": status}, limit, cursor, fields, include_total)
 
 @app.get("/api/projects/{project_id}")
 async def get_project(project_id: str):
@@ -150,11 +245,41 @@ async def delete_project(project_id: str, user=Depends(verify_token)):
 async def get_units(
     project_id: Optional[str] = None,
     unit_type: Optional[str] = None,
-    status: Optional[str] = None
+    status: Optional[str] = None,
+    limit: int = DEFAULT_LIMIT,
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    include_total: bool = False
+):
+    """Get units with filters (newest first, cursor paginated)"""
+    filters = {"project_id": project_id, "unit_type": unit_type, "status": status}
+    return await list_page("units", "units", filters, limit, cursor, fields, include_total)
+
+@app.get("/api/units/search")
+async def search_units(
+    bedrooms: Optional[int] = None,
+    bathrooms: Optional[int] = None,
+    floor: Optional[int] = None,
+    unit_type: Optional[str] = None,
+    price_min: Optional[float] = None,
+    price_max: Optional[float] = None,
+    area_min: Optional[float] = None,
+    area_max: Optional[float] = None,
+    project: Optional[str] = None,
+    limit: int = Query(5, ge=1, le=50)
 ):
-    """Get units with filters"""
-    units = await db.get_units(project_id=project_id, unit_type=unit_type, status=status)
-    return {"units": units}
+    """Search available units, closest matches first"""
+    filters = {
+        "bedrooms": bedrooms,
+        "bathrooms": bathrooms,
+        "floor_number": floor,
+        "unit_type": unit_type,
+        "price_min": price_min,
+        "price_max": price_max,
+        "area_min": area_min,
+        "area_max": area_max
+    }
+    return await unit_search.search(filters, project=project, limit=limit)
 
 @app.get("/api/units/{unit_id}")
 async def get_unit(unit_id: str):
@@ -169,6 +294,7 @@ async def create_unit(request: Request, user=Depends(verify_token)):
     """Create new unit (Admin only)"""
     data = await request.json()
     unit = await db.create_unit(data)
+    unit_search.upsert(unit)
     return unit
 
 @app.put("/api/units/{unit_id}")
@@ -176,41 +302,54 @@ async def update_unit(unit_id: str, request: Request, user=Depends(verify_token)
     """Update unit (Admin only)"""
     data = await request.json()
     unit = await db.update_unit(unit_id, data)
+    unit_search.upsert(unit)
     return unit
 
 @app.delete("/api/units/{unit_id}")
 async def delete_unit(unit_id: str, user=Depends(verify_token)):
     """Delete unit (Admin only)"""
     await db.delete_unit(unit_id)
+    unit_search.remove(unit_id)
     return {"message": "Unit deleted successfully"}
 
 # ==================== PAGES ====================
 
 @app.get("/api/pages")
-async def get_pages(published_only: bool = False):
-    """Get all pages"""
-    pages = await db.get_pages(published_only=published_only)
-    return {"pages": pages}
+async def get_pages(
+    published_only: bool = False,
+    limit: int = DEFAULT_LIMIT,
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    include_total: bool = False
+):
+    """Get pages (newest first, cursor paginated)"""
+    filters = {"is_published": True if published_only else None}
+    return await list_page("pages", "pages", filters, limit, cursor, fields, include_total)
 
 @app.get("/api/pages/{slug}")
-async def get_page(slug: str):
-    """Get page by slug"""
-    page = await db.get_page(slug)
-    if not page:
+async def get_page(slug: str, request: Request):
+    """Get page by slug (cached, supports If-None-Match)"""
+    cached = await page_cache.get(slug)
+    if cached.body is None:
         raise HTTPException(status_code=404, detail="Page not found")
-    return page
+    headers = {"ETag": cached.etag, "Cache-Control": page_cache.cache_control}
+    if etag_matches(request.headers.get("if-none-match"), cached.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=cached.body, media_type="application/json", headers=headers)
 
 @app.post("/api/pages")
 async def save_page(request: Request, user=Depends(verify_token)):
     """Save page (Admin only)"""
     data = await request.json()
     page = await db.save_page(data)
+    page_cache.invalidate(slug=data.get('slug'))
     return page
 
 @app.delete("/api/pages/{page_id}")
 async def delete_page(page_id: str, user=Depends(verify_token)):
     """Delete page (Admin only)"""
     await db.delete_page(page_id)
+    page_cache.invalidate(page_id=page_id)
     return {"message": "Page deleted successfully"}
 
 # ==================== CONTENT BLOCKS ====================
@@ -231,13 +370,155 @@ async def create_content_block(request: Request, user=Depends(verify_token)):
 # ==================== CHATS ====================
 
 @app.get("/api/chats")
-async def get_chats(source: Optional[str] = None, user=Depends(verify_token)):
-    """Get all chats (Admin only)"""
+async def get_chats(
+    source: Optional[str] = None,
+    limit: int = DEFAULT_LIMIT,
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    include_total: bool = False,
+    user=Depends(verify_token)
+):
+    """Get chats (Admin only). With a source the list is cursor paginated."""
     if source:
-        chats = await db.get_chats(source=source)
-    else:
-        chats = await chat_service.get_all_active_chats()
-    return chats
+        return await list_page("chats", "chats", {"source": source}, limit, cursor, fields, include_total)
+    return await chat_service.get_all_active_chats()
+
+@app.get("/api/chats/inbox")
+async def get_inbox(
+    source: Optional[str] = None,
+    limit: int = DEFAULT_LIMIT,
+    cursor: Optional[str] = None,
+    user=Depends(verify_token)
+):
+    """
+    Chat summaries, most recent first (Admin only).
+    With a source: {items, next_cursor}. Without: the first page of each source.
+    """
+    if source and source not in SOURCES:
+        raise HTTPException(status_code=400, detail="Unknown chat source")
+    try:
+        return await chat_service.get_inbox(source, limit, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+def parse_sources(source: Optional[str]) -> Optional[List[str]]:
+    """`source=telegram,website` filter for event streams; None means all"""
+    if not source:
+        return None
+    sources = [s.strip() for s in source.split(',') if s.strip()]
+    if any(s not in SOURCES for s in sources):
+        raise HTTPException(status_code=400, detail="Unknown chat source")
+    return sources
+
+@app.websocket("/api/chats/ws")
+async def chat_events_ws(
+    websocket: WebSocket,
+    token: str = "",
+    source: Optional[str] = None,
+    since: Optional[int] = None
+):
+    """
+    Push chat events to an admin client (JWT in the `token` query parameter,
+    browsers cannot set headers on WebSockets). `since` replays missed events.
+    """
+    try:
+        decode_token(token)
+        sources = parse_sources(source)
+    except HTTPException:
+        await websocket.close(code=1008)
+        return
+    await websocket.accept()
+    subscription = chat_events.subscribe(sources, since)
+
+    async def forward():
+        while (event := await subscription.get()) is not None:
+            await websocket.send_text(dumps(event).decode())
+
+    async def drain():
+        # Clients only listen; reading detects the disconnect
+        while True:
+            await websocket.receive_text()
+
+    tasks = [asyncio.create_task(forward()), asyncio.create_task(drain())]
+    try:
+        await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        subscription.close()
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+    try:
+        await websocket.close()
+    except (RuntimeError, WebSocketDisconnect):
+        pass  # already closed by the client
+
+@app.get("/api/chats/events")
+async def chat_events_sse(
+    request: Request,
+    token: str = "",
+    source: Optional[str] = None,
+    since: Optional[int] = None
+):
+    """Server-Sent Events fallback for /api/chats/ws (EventSource resumes with Last-Event-ID)"""
+    decode_token(token)
+    sources = parse_sources(source)
+    last_event_id = request.headers.get("last-event-id")
+    if last_event_id and last_event_id.isdigit():
+        since = int(last_event_id)
+    subscription = chat_events.subscribe(sources, since)
+
+    async def stream():
+        try:
+            yield "retry: 3000\n\n"
+            while True:
+                try:
+                    event = await asyncio.wait_for(subscription.get(), settings.CHAT_EVENTS_HEARTBEAT)
+                except asyncio.TimeoutError:
+                    yield ": ping\n\n"
+                    continue
+                if event is None:
+                    break
+                data = dumps(event).decode()
+                yield f"id: {event['seq']}\nevent: {event['type']}\ndata: {data}\n\n"
+        finally:
+            subscription.close()
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.get("/api/chats/{chat_id}")
+async def get_chat(chat_id: str, user=Depends(verify_token)):
+    """Get single chat summary (Admin only)"""
+    chat = await chat_service.get_chat(chat_id)
+    if not chat:
+        raise HTTPException(status_code=404, detail="Chat not found")
+    return chat
+
+@app.get("/api/chats/{chat_id}/messages")
+async def get_chat_messages(
+    chat_id: str,
+    limit: int = DEFAULT_LIMIT,
+    cursor: Optional[str] = None,
+    user=Depends(verify_token)
+):
+    """Messages of a chat, newest page first; next_cursor pages back in time (Admin only)"""
+    try:
+        page = await chat_service.get_messages(chat_id, limit, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if page is None:
+        raise HTTPException(status_code=404, detail="Chat not found")
+    return page
+
+@app.post("/api/chats/{chat_id}/read")
+async def mark_chat_read(chat_id: str, user=Depends(verify_token)):
+    """Mark a chat as read (Admin only)"""
+    if not await chat_service.mark_as_read(chat_id):
+        raise HTTPException(status_code=404, detail="Chat not found")
+    return {"message": "Chat marked as read"}
 
 @app.post("/api/chats/send")
 async def send_chat_message(request: Request, user=Depends(verify_token)):
@@ -255,10 +536,16 @@ async def send_chat_message(request: Request, user=Depends(verify_token)):
 # ==================== LEADS ====================
 
 @app.get("/api/leads")
-async def get_leads(status: Optional[str] = None, user=Depends(verify_token)):
-    """Get leads (Admin only)"""
-    leads = await db.get_leads(status=status)
-    return {"leads": leads}
+async def get_leads(
+    status: Optional[str] = None,
+    limit: int = DEFAULT_LIMIT,
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    include_total: bool = False,
+    user=Depends(verify_token)
+):
+    """Get leads (Admin only, newest first, cursor paginated)"""
+    return await list_page("leads", "leads", {"status": status}, limit, cursor, fields, include_total)
 
 @app.post("/api/leads")
 async def create_lead(request: Request):
@@ -277,59 +564,175 @@ async def update_lead(lead_id: str, request: Request, user=Depends(verify_token)
 # ==================== MEDIA ====================
 
 @app.get("/api/media")
-async def get_media(tags: Optional[List[str]] = None, user=Depends(verify_token)):
-    """Get media files (Admin only)"""
-    media = await db.get_media(tags=tags)
-    return {"media": media}
-
-@app.post("/api/media/upload")
-async def upload_media(file: UploadFile = File(...), user=Depends(verify_token)):
-    """Upload and optimize media (Admin only)"""
+async def get_media(
+    tags: Optional[List[str]] = Query(None),
+    limit: int = DEFAULT_LIMIT,
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    include_total: bool = False,
+    user=Depends(verify_token)
+):
+    """Get media files (Admin only, newest first, cursor paginated)"""
+    contains = {"tags": tags} if tags else None
+    return await list_page("media", "media", None, limit, cursor, fields, include_total, contains)
+
+# content hash -> lock, so concurrent uploads of one file are processed once
+upload_locks: "weakref.WeakValueDictionary[str, asyncio.Lock]" = weakref.WeakValueDictionary()
+
+# The body is streamed by spool_request rather than parsed into an UploadFile
+UPLOAD_REQUEST_BODY = {
+    "required": True,
+    "content": {"multipart/form-data": {"schema": {
+        "type": "object",
+        "properties": {"file": {"type": "string", "format": "binary"}},
+        "required": ["file"]
+    }}}
+}
+
+@app.post("/api/media/upload", openapi_extra={"requestBody": UPLOAD_REQUEST_BODY})
+async def upload_media(request: Request, user=Depends(verify_token)):
+    """Upload and optimize media (Admin only). A file uploaded before returns its existing row"""
     try:
-        # Read file
-        contents = await file.read()
-        
-        # Optimize image
-        result = image_optimizer.optimize_image(contents, file.filename)
-        
-        if not result:
-            raise HTTPException(status_code=500, detail="Image optimization failed")
-        
-        # Save to database
-        media_data = {
-            'filename': file.filename,
-            'original_url': result['original_url'],
-            'optimized_url': result['optimized_url'],
-            'thumbnail_url': result['thumbnail_url'],
-            'file_type': file.content_type,
-            'file_size': result['file_size'],
-            'width': result['width'],
-            'height': result['height']
-        }
-        
-        media = await db.create_media(media_data)
-        return media
+        # Stream the `file` field to a temp file, hashing and size-checking it as it arrives
+        async with await spool_request(request) as upload:
+            lock = upload_locks.get(upload.content_hash)
+            if lock is None:
+                lock = upload_locks[upload.content_hash] = asyncio.Lock()
+            async with lock:
+                existing = await db.get_media_by_hash(upload.content_hash)
+                if existing:
+                    return existing
+                return await store_media(upload)
         
+    except BadUpload as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except UploadTooLarge:
+        raise HTTPException(status_code=413, detail=f"File larger than {settings.MEDIA_MAX_UPLOAD_SIZE / (1024 * 1024):.0f} MB")
+    except ImageTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except ImageRejected as e:
+        raise HTTPException(status_code=415, detail=str(e))
+    except ImagePoolBusy:
+        return JSONResponse(status_code=503, content={"error": "Image processing busy, retry shortly"}, headers={"Retry-After": "10"})
+    except ImageJobTimeout:
+        raise HTTPException(status_code=504, detail="Image processing timed out")
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+async def store_media(upload: SpooledUpload) -> dict:
+    """Optimize, upload and record a new file"""
+    # Check the header, then optimize from the spooled file (process pool, off the event loop)
+    result = await image_optimizer.optimize(upload.path, upload.content_hash)
+    
+    if not result:
+        raise HTTPException(status_code=500, detail="Image optimization failed")
+    
+    # Save to database
+    media_data = {
+        'filename': upload.filename,
+        'original_url': result['original_url'],
+        'optimized_url': result['optimized_url'],
+        'thumbnail_url': result['thumbnail_url'],
+        'file_type': upload.content_type,
+        'file_size': result['file_size'],
+        'width': result['width'],
+        'height': result['height'],
+        'renditions': result['renditions'],
+        'srcset': result['srcset'],
+        'content_hash': upload.content_hash
+    }
+    
+    try:
+        return await db.create_media(media_data)
+    except Exception:
+        # Another worker stored the same file first (unique content_hash);
+        # the files are identical, so its row is as good as ours
+        existing = await db.get_media_by_hash(upload.content_hash)
+        if existing:
+            return existing
+        raise
+
 @app.delete("/api/media/{media_id}")
 async def delete_media(media_id: str, user=Depends(verify_token)):
-    """Delete media (Admin only)"""
+    """Delete media and all of its stored files (Admin only)"""
+    media = await db.get_media_item(media_id)
     await db.delete_media(media_id)
+    if media:
+        await image_optimizer.delete_image(media)
     return {"message": "Media deleted successfully"}
 
 # ==================== TELEGRAM WEBHOOK ====================
 
 @app.post("/api/webhook")
 async def telegram_webhook(request: Request):
-    """Handle Telegram webhook"""
+    """
+    Handle Telegram webhook.
+    The update is queued and acknowledged immediately; workers run the bot.
+    Redelivered update_ids are acknowledged without being processed again.
+    """
+    if settings.TELEGRAM_WEBHOOK_SECRET and \
+            request.headers.get("x-telegram-bot-api-secret-token") != settings.TELEGRAM_WEBHOOK_SECRET:
+        raise HTTPException(status_code=401, detail="Invalid webhook secret")
     try:
         data = await request.json()
-        # Import bot handler
-        from .bot import process_update
-        await process_update(data)
-        return {"status": "ok"}
-    except Exception as e:
-        print(f"Webhook Error: {e}")
-        return JSONResponse(status_code=500, content={"error": str(e)})
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid JSON")
+    if not isinstance(data, dict) or not isinstance(data.get("update_id"), int):
+        raise HTTPException(status_code=400, detail="Not a Telegram update")
+    try:
+        accepted = await update_dispatcher.submit(data)
+    except QueueFull:
+        # Telegram retries non-2xx deliveries later
+        return JSONResponse(status_code=503, content={"error": "Busy"}, headers={"Retry-After": "5"})
+    return {"status": "ok" if accepted else "duplicate"}
+
+@app.get("/api/metrics")
+async def get_metrics(user=Depends(verify_token)):
+    """Runtime metrics (Admin only)"""
+    return {
+        "webhook": update_dispatcher.stats(),
+        "telegram": telegram_sender.stats(),
+        "ai_cache": ai_cache.stats(),
+        "groq": groq_client.stats(),
+        "conversations": conversation_memory.stats(),
+        "images": image_pool.stats(),
+        "media_storage": media_storage.stats()
+    }
+
+@app.post("/api/telegram/broadcast")
+async def telegram_broadcast(request: Request, user=Depends(verify_token)):
+    """
+    Queue a message to many Telegram chats (Admin only).
+    Body: {"text": ..., "chat_ids": [...]}; without chat_ids every Telegram chat is targeted.
+    On serverless hosts the messages are sent before responding.
+    """
+    data = await request.json()
+    text = (data.get("text") or "").strip()
+    if not text:
+        raise HTTPException(status_code=400, detail="text is required")
+    chat_ids = data.get("chat_ids")
+    if chat_ids is None:
+        chat_ids = [chat['user_id'] for chat in await db.get_chats(source='telegram')]
+    if settings.SERVERLESS:
+        return await telegram_sender.send_broadcast(chat_ids, text)
+    return telegram_sender.broadcast(chat_ids, text)
+
+
+# ==================== PUBLIC PAGES ====================
+
+# Client-side renderer shell, served when a page has no prerendered HTML yet
+PUBLIC_SHELL = Path(__file__).resolve().parent.parent / "public" / "index.html"
+
+@app.get("/", response_class=HTMLResponse)
+@app.get("/{slug}", response_class=HTMLResponse)
+async def serve_page(request: Request, slug: str = "home"):
+    """Serve the prerendered HTML of a published page, falling back to the client-side shell"""
+    cached = await page_cache.get(slug)
+    if cached.html is None:
+        return HTMLResponse(PUBLIC_SHELL.read_text(encoding="utf-8"), headers={"Cache-Control": "no-cache"})
+    headers = {"ETag": cached.html_etag, "Cache-Control": page_cache.cache_control}
+    if etag_matches(request.headers.get("if-none-match"), cached.html_etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=cached.html, media_type="text/html; charset=utf-8", headers=headers)
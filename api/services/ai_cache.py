@@ -0,0 +1,175 @@
+"""
+Cache for Groq AI replies.
+Customers ask the same few questions in slightly different spellings, so
+replies are keyed by persona + a normalized form of the question
+(no diacritics, unified alef/yaa/taa-marbuta, no punctuation, single spaces).
+Entries expire after AI_CACHE_TTL, the least recently used are evicted past
+AI_CACHE_SIZE, and the cache is saved to AI_CACHE_PATH on shutdown.
+SERVERLESS hosts keep it in memory only: their shutdown hook is not reliably
+run, and the filesystem does not outlive the instance.
+"""
+
+import asyncio
+import json
+import os
+import re
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+from ..config import settings
+
+# Longer messages are too specific to repeat; not worth an entry
+MAX_QUERY_CHARS = 300
+
+# Tashkeel, superscript alef and tatweel
+DIACRITICS = re.compile(r'[\u064B-\u065F\u0670\u0640]')
+PUNCTUATION = re.compile(r'[^\w\s]|_')
+LETTER_MAP = str.maketrans({
+    'أ': 'ا', 'إ': 'ا', 'آ': 'ا', 'ٱ': 'ا',
+    'ى': 'ي', 'ئ': 'ي',
+    'ة': 'ه',
+    'ؤ': 'و'
+})
+
+
+def normalize_arabic(text: str) -> str:
+    """Canonical spelling of a question, used as the cache key"""
+    text = DIACRITICS.sub('', text).translate(LETTER_MAP).lower()
+    return ' '.join(PUNCTUATION.sub(' ', text).split())
+
+
+class AIResponseCache:
+    """
+    Per-worker LRU + TTL cache of AI replies.
+    Concurrent misses for the same question share one Groq request.
+    """
+
+    def __init__(self, path: Optional[str] = None, max_entries: Optional[int] = None, ttl: Optional[float] = None):
+        if path is None:
+            path = '' if settings.SERVERLESS else settings.AI_CACHE_PATH
+        self.path = path
+        self.max_entries = max_entries or settings.AI_CACHE_SIZE
+        self.ttl = ttl or settings.AI_CACHE_TTL
+        # (persona, normalized query) -> (reply, expires_at); wall clock so it survives restarts
+        self.entries: "OrderedDict[Tuple[str, str], Tuple[str, float]]" = OrderedDict()
+        self._inflight: Dict[Tuple[str, str], asyncio.Future] = {}
+        self._loaded = False
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+
+    def key(self, persona: str, text: str) -> Optional[Tuple[str, str]]:
+        if persona not in settings.AI_CACHE_PERSONAS.split(','):
+            return None
+        query = normalize_arabic(text)
+        if not query or len(query) > MAX_QUERY_CHARS:
+            return None
+        return (persona, query)
+
+    def _get(self, key: Tuple[str, str]) -> Optional[str]:
+        self.load()
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        if entry[1] <= time.time():
+            del self.entries[key]
+            return None
+        self.entries.move_to_end(key)
+        return entry[0]
+
+    def _put(self, key: Tuple[str, str], reply: str):
+        self.load()
+        self.entries[key] = (reply, time.time() + self.ttl)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    async def get_or_create(self, persona: str, text: str, create: Callable[[], Awaitable[str]]) -> str:
+        """
+        Cached reply for the question, else the result of `create()`.
+        Exceptions from `create` propagate and nothing is cached.
+        """
+        key = self.key(persona, text)
+        if key is None:
+            return await create()
+        reply = self._get(key)
+        if reply is not None:
+            self.hits += 1
+            return reply
+        self.misses += 1
+
+        if key in self._inflight:
+            self.coalesced += 1
+            return await asyncio.shield(self._inflight[key])
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            reply = await create()
+            self._put(key, reply)
+            future.set_result(reply)
+            return reply
+        except Exception as e:
+            future.set_exception(e)
+            # Mark retrieved so an unawaited failure doesn't warn
+            future.exception()
+            raise
+        finally:
+            del self._inflight[key]
+
+    def clear(self):
+        self.entries.clear()
+
+    # ==================== PERSISTENCE ====================
+
+    def load(self):
+        """Read the saved cache once, skipping expired entries"""
+        if self._loaded:
+            return
+        self._loaded = True
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                saved = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"AI Cache Load Error: {e}")
+            return
+        now = time.time()
+        for persona, query, reply, expires_at in saved.get('entries', []):
+            if expires_at > now:
+                self.entries[(persona, query)] = (reply, expires_at)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def save(self):
+        """Write live entries (oldest first) atomically; no-op without AI_CACHE_PATH"""
+        if not self.path or not self._loaded:
+            return
+        now = time.time()
+        entries = [[persona, query, reply, expires_at]
+                   for (persona, query), (reply, expires_at) in self.entries.items() if expires_at > now]
+        tmp_path = f"{self.path}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'version': 1, 'entries': entries}, f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"AI Cache Save Error: {e}")
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self.entries),
+            'capacity': self.max_entries,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+            'coalesced': self.coalesced,
+            'evictions': self.evictions
+        }
+
+# Singleton instance
+ai_cache = AIResponseCache()
@@ -0,0 +1,116 @@
+"""
+Real-time chat events for the admin panel.
+ChatService publishes every saved message here; admin clients subscribe
+over WebSocket (/api/chats/ws) or SSE (/api/chats/events), optionally
+filtered by source and resuming from the last sequence number they saw.
+
+The hub is in-process: each API instance streams the messages it handled.
+"""
+
+import asyncio
+from collections import deque
+from typing import Deque, Dict, Iterable, Optional, Set
+
+from ..config import settings
+from .storage_backend import INBOX_FIELDS
+
+
+class Subscription:
+    """
+    One connected admin client.
+    Its queue is bounded: a client that falls behind has its backlog
+    replaced by a single 'reset' event telling it to reload over REST.
+    """
+
+    def __init__(self, hub: "ChatEventHub", sources: Optional[Set[str]], maxsize: int):
+        self.hub = hub
+        self.sources = sources
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize)
+        self.dropped = 0
+        self.closed = False
+
+    def wants(self, event: Dict) -> bool:
+        return self.sources is None or event.get('source') is None or event['source'] in self.sources
+
+    def offer(self, event: Dict):
+        """Never blocks the publisher"""
+        if self.closed or not self.wants(event):
+            return
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.dropped += self.queue.qsize()
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(self.hub.reset_event('overflow'))
+
+    async def get(self) -> Optional[Dict]:
+        """Next event, or None once the hub shuts down"""
+        return await self.queue.get()
+
+    def close(self):
+        self.hub.unsubscribe(self)
+
+
+class ChatEventHub:
+    """In-process pub/sub with a bounded replay history"""
+
+    def __init__(self, history: Optional[int] = None, queue_size: Optional[int] = None):
+        self.seq = 0
+        self.history: Deque[Dict] = deque(maxlen=history or settings.CHAT_EVENTS_HISTORY)
+        self.queue_size = queue_size or settings.CHAT_EVENTS_QUEUE
+        self.subscribers: Set[Subscription] = set()
+
+    def publish(self, chat: Dict, message: Optional[Dict] = None, event_type: str = 'message') -> Dict:
+        """Fan an event out to every matching subscriber; returns the event"""
+        self.seq += 1
+        event = {
+            'seq': self.seq,
+            'type': event_type,
+            'source': chat.get('source'),
+            'chat': {field: chat.get(field) for field in INBOX_FIELDS},
+            'message': message
+        }
+        self.history.append(event)
+        for subscription in list(self.subscribers):
+            subscription.offer(event)
+        return event
+
+    def reset_event(self, reason: str) -> Dict:
+        """Tells a client its stream has a gap and it must reload, then continue from `seq`"""
+        return {'seq': self.seq, 'type': 'reset', 'source': None, 'reason': reason}
+
+    def subscribe(self, sources: Optional[Iterable[str]] = None, since: Optional[int] = None) -> Subscription:
+        """
+        Register a client. With `since`, events after that sequence number
+        are replayed first, or a reset when they are no longer in history.
+        """
+        subscription = Subscription(self, set(sources) if sources else None, self.queue_size)
+        if since is not None and since < self.seq:
+            oldest = self.history[0]['seq'] if self.history else self.seq + 1
+            if since + 1 < oldest:
+                subscription.offer(self.reset_event('history'))
+            else:
+                for event in self.history:
+                    if event['seq'] > since:
+                        subscription.offer(event)
+        elif since is not None and since > self.seq:
+            # Sequence numbers restart with the process
+            subscription.offer(self.reset_event('restart'))
+        self.subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        subscription.closed = True
+        self.subscribers.discard(subscription)
+
+    def close(self):
+        """Wake every subscriber so open streams end on shutdown"""
+        for subscription in list(self.subscribers):
+            self.unsubscribe(subscription)
+            if subscription.queue.full():
+                subscription.queue.get_nowait()
+            subscription.queue.put_nowait(None)
+
+# Singleton instance
+chat_events = ChatEventHub()
@@ -1,6 +1,11 @@
+import asyncio
 from typing import Dict, List, Optional
-from datetime import datetime
-from .supabase_service import db
+from .chat_events import chat_events
+from .conversation_memory import conversation_memory
+from .database import db
+from .pagination import DEFAULT_LIMIT
+
+SOURCES = ('telegram', 'website')
 
 class ChatService:
     """
@@ -12,43 +17,49 @@ class ChatService:
         """
         Save a chat message
         source: 'telegram' or 'website'
+        Appends to the chat's message log, pushes it to connected admin
+        clients and the AI conversation context, and returns the updated chat summary.
         """
-        # Get existing chat or create new
-        existing_chats = await db.get_chats(source=source)
-        existing_chat = next((c for c in existing_chats if c['user_id'] == user_id), None)
-        
-        new_message = {
-            'text': message,
-            'timestamp': datetime.now().isoformat(),
-            'from_admin': is_from_admin
-        }
-        
-        if existing_chat:
-            # Append to existing messages
-            messages = existing_chat.get('messages', [])
-            messages.append(new_message)
-            
-            chat_data = {
-                'messages': messages,
-                'updated_at': datetime.now().isoformat()
-            }
-            
-            return await db.create_or_update_chat({
-                **existing_chat,
-                **chat_data
-            })
-        else:
-            # Create new chat
-            chat_data = {
-                'source': source,
-                'user_id': user_id,
-                'user_name': user_name,
-                'messages': [new_message],
-                'status': 'active'
-            }
-            
-            return await db.create_or_update_chat(chat_data)
-    
+        result = await db.append_chat_message(source, user_id, user_name, message, from_admin=is_from_admin)
+        chat_events.publish(result['chat'], result['message'])
+        conversation_memory.observe(result['chat']['id'], result['message'])
+        return result['chat']
+
+    @staticmethod
+    async def get_chat(chat_id: str) -> Optional[Dict]:
+        """Get a chat summary (messages come from get_messages)"""
+        chat = await db.get_chat(chat_id)
+        if not chat:
+            return None
+        chat = await db.migrate_chat(chat)
+        chat.pop('messages', None)
+        return chat
+
+    @staticmethod
+    async def get_messages(chat_id: str, limit: int = DEFAULT_LIMIT, cursor: Optional[str] = None) -> Optional[Dict]:
+        """
+        Page of a chat's messages, newest page first.
+        Raises ValueError for a malformed cursor.
+        """
+        if cursor is None:
+            # First page: make sure a legacy history has been moved to the log
+            chat = await db.get_chat(chat_id)
+            if not chat:
+                return None
+            await db.migrate_chat(chat)
+        return await db.get_chat_messages(chat_id, limit, cursor)
+
+    @staticmethod
+    async def get_inbox(source: Optional[str] = None, limit: int = DEFAULT_LIMIT, cursor: Optional[str] = None) -> Dict:
+        """
+        Chat summaries sorted by most recent message.
+        With a source: one page. Without: the first page of every source, fetched concurrently.
+        """
+        if source:
+            return await db.get_inbox(source, limit, cursor)
+        pages = await asyncio.gather(*(db.get_inbox(s, limit) for s in SOURCES))
+        return dict(zip(SOURCES, pages))
+
     @staticmethod
     async def get_telegram_chats() -> List[Dict]:
         """Get all Telegram chats"""
@@ -62,8 +73,10 @@ class ChatService:
     @staticmethod
     async def get_all_active_chats() -> Dict[str, List[Dict]]:
         """Get all active chats grouped by source"""
-        telegram_chats = await ChatService.get_telegram_chats()
-        website_chats = await ChatService.get_website_chats()
+        telegram_chats, website_chats = await asyncio.gather(
+            ChatService.get_telegram_chats(),
+            ChatService.get_website_chats()
+        )
         
         return {
             'telegram': telegram_chats,
@@ -72,16 +85,12 @@ class ChatService:
     
     @staticmethod
     async def mark_as_read(chat_id: str) -> bool:
-        """Mark chat as read"""
-        chat = await db.get_chat(chat_id)
-        if chat:
-            await db.create_or_update_chat({
-                **chat,
-                'status': 'read',
-                'updated_at': datetime.now().isoformat()
-            })
-            return True
-        return False
+        """Mark chat as read (resets the unread counter only)"""
+        chat = await db.mark_chat_read(chat_id)
+        if chat is None:
+            return False
+        chat_events.publish(chat, event_type='read')
+        return True
 
 # Singleton instance
 chat_service = ChatService()
@@ -0,0 +1,234 @@
+"""
+In-memory indexed collections.
+Primary-key map plus hash and sorted secondary indexes, updated incrementally on every write.
+"""
+
+import json
+import uuid
+from bisect import bisect_left, bisect_right
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple, Union
+
+from .storage_backend import new_id
+
+IndexKey = Union[str, Tuple[str, ...]]
+
+# Secondary indexes per collection
+# hash: equality lookups (a tuple means a compound key), sorted: range scans
+INDEX_SPECS: Dict[str, Dict[str, List[IndexKey]]] = {
+    'projects': {'hash': ['status']},
+    'units': {
+        'hash': ['project_id', 'status', 'unit_type', 'floor_number'],
+        'sorted': ['total_price'],
+    },
+    'pages': {'hash': ['slug', 'is_published']},
+    'content_blocks': {'hash': ['category']},
+    'chats': {'hash': ['source', ('source', 'user_id')]},
+    'chat_messages': {'hash': ['chat_id']},
+    'leads': {'hash': ['status']},
+    'media': {'hash': ['content_hash']},
+}
+
+
+# Namespace of ids derived for stored rows that have none
+LEGACY_ID_NAMESPACE = uuid.UUID('6d1f6a52-3c1e-4b8e-9a57-0c2f4f1b7d3e')
+
+
+def legacy_id(collection: str, row: Dict, occurrence: int = 0) -> str:
+    """
+    Id for a stored row that has none, derived from its content so every
+    load of the same document agrees on it (the id is saved with the row
+    on its next write). `occurrence` tells identical rows apart.
+    """
+    content = json.dumps(row, sort_keys=True, ensure_ascii=False, default=str)
+    return str(uuid.uuid5(LEGACY_ID_NAMESPACE, f"{collection}:{occurrence}:{content}"))
+
+
+class SortedIndex:
+    """Values kept in order next to their primary keys, for range scans"""
+
+    def __init__(self):
+        self.keys: List[Any] = []
+        self.pks: List[str] = []
+
+    def add(self, value: Any, pk: str):
+        i = bisect_right(self.keys, value)
+        self.keys.insert(i, value)
+        self.pks.insert(i, pk)
+
+    def remove(self, value: Any, pk: str):
+        i = bisect_left(self.keys, value)
+        while i < len(self.keys) and self.keys[i] == value:
+            if self.pks[i] == pk:
+                del self.keys[i]
+                del self.pks[i]
+                return
+            i += 1
+
+    def range(self, low: Any = None, high: Any = None) -> List[str]:
+        """Primary keys with low <= value <= high, in ascending value order"""
+        start = 0 if low is None else bisect_left(self.keys, low)
+        end = len(self.keys) if high is None else bisect_right(self.keys, high)
+        return self.pks[start:end]
+
+
+class IndexedCollection:
+    """
+    Rows of one collection keyed by primary key.
+    Rows handed out are copies, so indexes can never go stale behind our back.
+    """
+
+    def __init__(self, name: str, pk: str = 'id', hash_fields: Iterable[IndexKey] = (), sorted_fields: Iterable[str] = ()):
+        self.name = name
+        self.pk = pk
+        self.rows: Dict[str, Dict] = {}
+        # Insertion sequence, keeps index lookups in the same order as full scans
+        self._seq: Dict[str, int] = {}
+        self._next_seq = 0
+        self.hash_indexes: Dict[IndexKey, Dict[Any, Set[str]]] = {f: {} for f in hash_fields}
+        self.sorted_indexes: Dict[str, SortedIndex] = {f: SortedIndex() for f in sorted_fields}
+
+    @classmethod
+    def for_collection(cls, name: str, rows: Iterable[Dict] = ()) -> 'IndexedCollection':
+        spec = INDEX_SPECS.get(name, {})
+        collection = cls(name, hash_fields=spec.get('hash', ()), sorted_fields=spec.get('sorted', ()))
+        occurrences: Dict[str, int] = {}
+        for row in rows:
+            if row.get(collection.pk) is None:
+                base = legacy_id(name, row)
+                occurrence = occurrences[base] = occurrences.get(base, -1) + 1
+                row = {**row, collection.pk: legacy_id(name, row, occurrence) if occurrence else base}
+            collection.upsert(row)
+        return collection
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def __iter__(self) -> Iterator[Dict]:
+        return (dict(row) for row in self.rows.values())
+
+    # ==================== INDEX MAINTENANCE ====================
+
+    @staticmethod
+    def _key(row: Dict, field: IndexKey) -> Any:
+        if isinstance(field, tuple):
+            return tuple(row.get(f) for f in field)
+        return row.get(field)
+
+    def _index(self, row: Dict, pk: str):
+        for field, index in self.hash_indexes.items():
+            index.setdefault(self._key(row, field), set()).add(pk)
+        for field, index in self.sorted_indexes.items():
+            if row.get(field) is not None:
+                index.add(row[field], pk)
+
+    def _unindex(self, row: Dict, pk: str):
+        for field, index in self.hash_indexes.items():
+            key = self._key(row, field)
+            bucket = index.get(key)
+            if bucket is not None:
+                bucket.discard(pk)
+                if not bucket:
+                    del index[key]
+        for field, index in self.sorted_indexes.items():
+            if row.get(field) is not None:
+                index.remove(row[field], pk)
+
+    # ==================== WRITES ====================
+
+    def upsert(self, row: Dict) -> Dict:
+        """Insert or replace a row (assigning a primary key if missing)"""
+        row = dict(row)
+        pk = row.setdefault(self.pk, new_id())
+        old = self.rows.get(pk)
+        if old is not None:
+            self._unindex(old, pk)
+        else:
+            self._seq[pk] = self._next_seq
+            self._next_seq += 1
+        self.rows[pk] = row
+        self._index(row, pk)
+        return dict(row)
+
+    def remove(self, pk: str) -> bool:
+        row = self.rows.pop(pk, None)
+        if row is None:
+            return False
+        del self._seq[pk]
+        self._unindex(row, pk)
+        return True
+
+    # ==================== READS ====================
+
+    def get(self, pk: str) -> Optional[Dict]:
+        row = self.rows.get(pk)
+        return dict(row) if row is not None else None
+
+    def _candidates(self, filters: Dict[str, Any]) -> Optional[Set[str]]:
+        """Smallest intersection of index buckets covering the filters, None if none apply"""
+        buckets = []
+        if self.pk in filters:
+            buckets.append({filters[self.pk]} if filters[self.pk] in self.rows else set())
+        for field, index in self.hash_indexes.items():
+            fields = field if isinstance(field, tuple) else (field,)
+            if all(f in filters for f in fields):
+                key = tuple(filters[f] for f in fields) if isinstance(field, tuple) else filters[field]
+                buckets.append(index.get(key, set()))
+        if not buckets:
+            return None
+        buckets.sort(key=len)
+        result = set(buckets[0])
+        for bucket in buckets[1:]:
+            if not result:
+                break
+            result &= bucket
+        return result
+
+    def find_pks(self, filters: Optional[Dict[str, Any]] = None) -> List[str]:
+        """Primary keys matching all non-None equality filters, in insertion order"""
+        filters = {k: v for k, v in (filters or {}).items() if v is not None}
+        candidates = self._candidates(filters)
+        if candidates is None:
+            pks: Iterable[str] = self.rows.keys()
+        else:
+            pks = sorted(candidates, key=self._seq.__getitem__)
+        return [
+            pk for pk in pks
+            if all(self.rows[pk].get(k) == v for k, v in filters.items())
+        ]
+
+    def find(self, filters: Optional[Dict[str, Any]] = None) -> List[Dict]:
+        return [dict(self.rows[pk]) for pk in self.find_pks(filters)]
+
+    def find_one(self, filters: Dict[str, Any]) -> Optional[Dict]:
+        pks = self.find_pks(filters)
+        return dict(self.rows[pks[0]]) if pks else None
+
+    def range_pks(self, field: str, low: Any = None, high: Any = None) -> List[str]:
+        """Primary keys with `field` between low and high (inclusive) using a sorted index"""
+        return self.sorted_indexes[field].range(low, high)
+
+
+class CollectionStore:
+    """All collections of one document, e.g. the JSONBin bin"""
+
+    def __init__(self, document: Optional[Dict] = None):
+        document = document or {}
+        self.collections: Dict[str, IndexedCollection] = {}
+        # Keys of the document that are not row lists are kept untouched
+        self.extra: Dict[str, Any] = {}
+        for key, value in document.items():
+            if isinstance(value, list):
+                self.collections[key] = IndexedCollection.for_collection(key, value)
+            else:
+                self.extra[key] = value
+
+    def __getitem__(self, name: str) -> IndexedCollection:
+        if name not in self.collections:
+            self.collections[name] = IndexedCollection.for_collection(name)
+        return self.collections[name]
+
+    def to_document(self) -> Dict:
+        return {
+            **self.extra,
+            **{name: list(collection.rows.values()) for name, collection in self.collections.items()}
+        }
@@ -0,0 +1,150 @@
+"""
+Conversation context for AI replies.
+Each chat keeps the most recent turns that fit CONVERSATION_RECENT_TOKENS;
+older turns are folded into a compact summary capped at
+CONVERSATION_SUMMARY_TOKENS, so the prompt stays the same size however
+long the conversation runs. Contexts are cached per worker, loaded from the
+message log on first use and then updated as messages are saved.
+"""
+
+import asyncio
+import re
+from collections import OrderedDict, deque
+from typing import Deque, Dict, List, Optional
+
+from ..config import settings
+
+# Rough size of a token for Arabic/English chat text
+CHARS_PER_TOKEN = 3
+# A folded turn keeps at most this much of its text
+SUMMARY_LINE_CHARS = 160
+
+SPACES = re.compile(r'\s+')
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def clip(text: str, chars: int) -> str:
+    text = SPACES.sub(' ', text).strip()
+    return text if len(text) <= chars else text[:chars - 1] + '…'
+
+
+class Conversation:
+    """Recent turns + rolling summary of one chat"""
+
+    def __init__(self):
+        self.turns: Deque[Dict] = deque()
+        self.turn_tokens = 0
+        self.summary: Deque[str] = deque()
+        self.summary_tokens = 0
+        self.last_seq = 0
+        self.loaded: Optional[asyncio.Future] = None
+
+    def add(self, seq: int, from_admin: bool, text: str):
+        """Append a message (ignored if already seen) and fold what no longer fits"""
+        if seq <= self.last_seq or not text:
+            return
+        self.last_seq = seq
+        content = clip(text, settings.CONVERSATION_RECENT_TOKENS * CHARS_PER_TOKEN)
+        turn = {'seq': seq, 'role': 'assistant' if from_admin else 'user', 'content': content, 'tokens': estimate_tokens(content)}
+        self.turns.append(turn)
+        self.turn_tokens += turn['tokens']
+        # The newest turn always stays, even when it alone exceeds the budget
+        while self.turn_tokens > settings.CONVERSATION_RECENT_TOKENS and len(self.turns) > 1:
+            self._fold(self.turns.popleft())
+
+    def _fold(self, turn: Dict):
+        self.turn_tokens -= turn['tokens']
+        speaker = 'المساعد' if turn['role'] == 'assistant' else 'العميل'
+        line = f"{speaker}: {clip(turn['content'], SUMMARY_LINE_CHARS)}"
+        self.summary.append(line)
+        self.summary_tokens += estimate_tokens(line)
+        while self.summary_tokens > settings.CONVERSATION_SUMMARY_TOKENS and self.summary:
+            self.summary_tokens -= estimate_tokens(self.summary.popleft())
+
+    @property
+    def has_history(self) -> bool:
+        """Anything besides the message being answered"""
+        return len(self.turns) > 1 or bool(self.summary)
+
+    def messages(self, system_prompt: str) -> List[Dict]:
+        """Chat completion messages: system prompt, summary, recent turns"""
+        messages = [{"role": "system", "content": system_prompt}]
+        if self.summary:
+            messages.append({
+                "role": "system",
+                "content": "ملخص الكلام اللي فات مع العميل:\n" + "\n".join(self.summary)
+            })
+        messages.extend({"role": turn['role'], "content": turn['content']} for turn in self.turns)
+        return messages
+
+
+class ConversationMemory:
+    """Per-worker LRU of chat contexts, keyed by chat id"""
+
+    def __init__(self, max_chats: Optional[int] = None):
+        self.max_chats = max_chats or settings.CONVERSATION_CACHE_SIZE
+        self.chats: "OrderedDict[str, Conversation]" = OrderedDict()
+        self.loads = 0
+        self.hits = 0
+
+    def observe(self, chat_id: str, message: Dict):
+        """A message was saved: extend the cached context, if any"""
+        conversation = self.chats.get(chat_id)
+        if conversation is not None:
+            conversation.add(message['seq'], message.get('from_admin'), message.get('text') or '')
+
+    async def get(self, chat_id: str) -> Conversation:
+        """Context of a chat, loading its latest messages on first use"""
+        conversation = self.chats.get(chat_id)
+        if conversation is None:
+            conversation = self.chats[chat_id] = Conversation()
+            while len(self.chats) > self.max_chats:
+                self.chats.popitem(last=False)
+        self.chats.move_to_end(chat_id)
+
+        if conversation.loaded is None:
+            # Messages observed meanwhile are kept: load() only adds older ones
+            conversation.loaded = asyncio.get_running_loop().create_future()
+            try:
+                await self._load(chat_id, conversation)
+                conversation.loaded.set_result(True)
+            except Exception as e:
+                print(f"Conversation Load Error: {e}")
+                conversation.loaded.set_result(False)
+                # Try again on the next message
+                conversation.loaded = None
+            self.loads += 1
+        else:
+            await asyncio.shield(conversation.loaded)
+            self.hits += 1
+        return conversation
+
+    async def _load(self, chat_id: str, conversation: Conversation):
+        # Imported here: chat_service publishes saved messages to this module
+        from .chat_service import chat_service
+        page = await chat_service.get_messages(chat_id, limit=settings.CONVERSATION_LOAD_LIMIT)
+        observed = list(conversation.turns), conversation.last_seq
+        fresh = Conversation()
+        for message in (page or {}).get('items', []):
+            fresh.add(message['seq'], message.get('from_admin'), message.get('text') or '')
+        # Re-apply anything that arrived while the page was in flight
+        for turn in observed[0]:
+            if turn['seq'] > fresh.last_seq:
+                fresh.add(turn['seq'], turn['role'] == 'assistant', turn['content'])
+        conversation.turns, conversation.turn_tokens = fresh.turns, fresh.turn_tokens
+        conversation.summary, conversation.summary_tokens = fresh.summary, fresh.summary_tokens
+        conversation.last_seq = max(fresh.last_seq, observed[1])
+
+    def stats(self) -> Dict:
+        return {
+            'chats': len(self.chats),
+            'capacity': self.max_chats,
+            'loads': self.loads,
+            'hits': self.hits
+        }
+
+# Singleton instance
+conversation_memory = ConversationMemory()
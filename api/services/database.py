@@ -0,0 +1,36 @@
+from ..config import settings
+from .storage_backend import StorageBackend
+
+def create_storage_backend() -> StorageBackend:
+    """
+    Pick the storage engine once at startup.
+    DB_BACKEND: 'supabase', 'jsonbin', 'sqlite' or 'auto'
+    (auto = Supabase when credentials exist, JSONBin otherwise)
+    """
+    backend = settings.DB_BACKEND.lower()
+
+    if backend == "sqlite":
+        from .sqlite_service import SQLiteService
+        return SQLiteService()
+
+    if backend == "supabase":
+        from .supabase_service import SupabaseService
+        return SupabaseService()
+
+    if backend == "auto":
+        if settings.SUPABASE_URL and settings.SUPABASE_KEY:
+            try:
+                from .supabase_service import SupabaseService
+                return SupabaseService()
+            except Exception as e:
+                print(f"⚠️ Supabase init failed ({e}). Switching to JSONBin Fallback.")
+        else:
+            print("⚠️ Supabase credentials missing. Switching to JSONBin Fallback.")
+    elif backend != "jsonbin":
+        raise ValueError(f"Unknown DB_BACKEND: {settings.DB_BACKEND}")
+
+    from .jsonbin_service import JsonBinService
+    return JsonBinService()
+
+# Singleton instance
+db = create_storage_backend()
@@ -0,0 +1,263 @@
+"""
+Guarded client for the Groq chat completion API.
+Calls are capped at GROQ_MAX_CONCURRENCY, each has a GROQ_TIMEOUT deadline
+(queueing included; streamed replies get first-token and idle timeouts
+instead once they hold a slot), and a circuit breaker stops calling Groq for
+GROQ_BREAKER_COOLDOWN seconds once too many recent calls failed or were slow.
+Callers get AIUnavailable instead of waiting and answer from templates.
+"""
+
+import asyncio
+import json
+import time
+from collections import deque
+from typing import AsyncIterator, Deque, Dict, List
+
+import httpx
+
+from ..config import settings
+from .http_client import get_http_client
+from .metrics import LatencyWindow
+
+GROQ_MODEL = "llama-3.3-70b-versatile"
+
+
+class AIUnavailable(Exception):
+    """No AI reply: breaker open, too many callers waiting, deadline hit or Groq error"""
+
+    def __init__(self, reason: str):
+        super().__init__(reason)
+        self.reason = reason
+
+
+class CircuitBreaker:
+    """
+    closed -> open when at least `min_calls` of the last `window` calls were
+    seen and `failure_rate` of them failed (errors, timeouts and slow calls).
+    open -> half_open after `cooldown` seconds: a single probe call is let
+    through; its success closes the breaker, its failure reopens it.
+    """
+
+    def __init__(self, window: int, min_calls: int, failure_rate: float, cooldown: float):
+        self.outcomes: Deque[bool] = deque(maxlen=window)
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.cooldown = cooldown
+        self.state = 'closed'
+        self.opened_at = 0.0
+        self.times_opened = 0
+        self._probing = False
+
+    def allow(self) -> bool:
+        if self.state == 'closed':
+            return True
+        if self.state == 'open' and time.monotonic() - self.opened_at >= self.cooldown:
+            self.state = 'half_open'
+        if self.state == 'half_open' and not self._probing:
+            self._probing = True
+            return True
+        return False
+
+    def record(self, success: bool):
+        if self.state == 'half_open':
+            self._probing = False
+            if success:
+                self.state = 'closed'
+                self.outcomes.clear()
+            else:
+                self._open()
+            return
+        self.outcomes.append(success)
+        failures = self.outcomes.count(False)
+        if len(self.outcomes) >= self.min_calls and failures / len(self.outcomes) >= self.failure_rate:
+            self._open()
+
+    def abandon(self):
+        """The call was cancelled before an outcome: let another probe through"""
+        if self.state == 'half_open':
+            self._probing = False
+
+    def _open(self):
+        self.state = 'open'
+        self.opened_at = time.monotonic()
+        self.times_opened += 1
+        self.outcomes.clear()
+
+    def stats(self) -> Dict:
+        return {
+            'state': self.state,
+            'times_opened': self.times_opened,
+            'recent_calls': len(self.outcomes),
+            'recent_failures': self.outcomes.count(False),
+            'retry_in_s': round(max(0.0, self.opened_at + self.cooldown - time.monotonic()), 1)
+            if self.state == 'open' else 0.0
+        }
+
+
+class GroqClient:
+    """Bounded, deadline-limited Groq calls behind a circuit breaker"""
+
+    def __init__(self):
+        self.breaker = CircuitBreaker(
+            settings.GROQ_BREAKER_WINDOW,
+            settings.GROQ_BREAKER_MIN_CALLS,
+            settings.GROQ_BREAKER_FAILURE_RATE,
+            settings.GROQ_BREAKER_COOLDOWN
+        )
+        self._slots = asyncio.Semaphore(settings.GROQ_MAX_CONCURRENCY)
+        self.in_flight = 0
+        self.waiting = 0
+        # Metrics
+        self.latency = LatencyWindow()
+        self.first_token = LatencyWindow()
+        self.calls = 0
+        self.rejected: Dict[str, int] = {'open': 0, 'busy': 0}
+        self.timeouts = 0
+        self.errors = 0
+
+    async def _acquire(self) -> float:
+        """Take a concurrency slot; returns the call's deadline (monotonic)"""
+        if self._slots.locked() and self.waiting >= settings.GROQ_MAX_WAITING:
+            self.rejected['busy'] += 1
+            raise AIUnavailable('busy')
+        if not self.breaker.allow():
+            self.rejected['open'] += 1
+            raise AIUnavailable('open')
+
+        deadline = time.monotonic() + settings.GROQ_TIMEOUT
+        if self._slots.locked():
+            self.waiting += 1
+            try:
+                await asyncio.wait_for(self._slots.acquire(), settings.GROQ_TIMEOUT)
+            except asyncio.TimeoutError:
+                # Still counted: queueing this long means Groq is slow for everyone
+                self.timeouts += 1
+                self.breaker.record(False)
+                raise AIUnavailable('timeout')
+            except asyncio.CancelledError:
+                self.breaker.abandon()
+                raise
+            finally:
+                self.waiting -= 1
+        else:
+            await self._slots.acquire()
+        self.in_flight += 1
+        self.calls += 1
+        return deadline
+
+    def _release(self, started: float):
+        self.in_flight -= 1
+        self._slots.release()
+        self.latency.add(time.monotonic() - started)
+
+    def _failure(self, e: BaseException) -> AIUnavailable:
+        self.breaker.record(False)
+        if isinstance(e, asyncio.TimeoutError):
+            self.timeouts += 1
+            return AIUnavailable('timeout')
+        self.errors += 1
+        print(f"Groq Error: {e}")
+        return AIUnavailable('error')
+
+    async def complete(self, messages: List[Dict], temperature: float = 0.7) -> str:
+        """Reply text for a chat completion, or AIUnavailable"""
+        deadline = await self._acquire()
+        started = time.monotonic()
+        try:
+            reply = await asyncio.wait_for(self._request(messages, temperature), max(0.0, deadline - started))
+        except (asyncio.TimeoutError, httpx.HTTPError, KeyError, IndexError, ValueError) as e:
+            raise self._failure(e)
+        except asyncio.CancelledError:
+            self.breaker.abandon()
+            raise
+        finally:
+            self._release(started)
+
+        self.breaker.record(time.monotonic() - started < settings.GROQ_SLOW_CALL)
+        return reply
+
+    async def stream(self, messages: List[Dict], temperature: float = 0.7) -> AsyncIterator[str]:
+        """
+        Yield reply text deltas as Groq generates them (server-sent events).
+        The first token must arrive within GROQ_FIRST_TOKEN_TIMEOUT, then each
+        chunk within GROQ_STREAM_IDLE_TIMEOUT of the previous one, so a long
+        reply is not cut off by a fixed deadline. A call is slow when its first
+        token is; a stall after the first token is not held against Groq by the
+        breaker. Raises AIUnavailable, possibly after some deltas.
+        """
+        await self._acquire()
+        started = time.monotonic()
+        first_token = None
+        try:
+            async with get_http_client().stream(
+                "POST",
+                f"{settings.GROQ_API_URL}/chat/completions",
+                json={"messages": messages, "model": GROQ_MODEL, "temperature": temperature, "stream": True},
+                headers={"Authorization": f"Bearer {settings.GROQ_API_KEY}"},
+                timeout=max(settings.GROQ_FIRST_TOKEN_TIMEOUT, settings.GROQ_STREAM_IDLE_TIMEOUT)
+            ) as response:
+                response.raise_for_status()
+                lines = response.aiter_lines()
+                first_token_deadline = started + settings.GROQ_FIRST_TOKEN_TIMEOUT
+                while True:
+                    if first_token is None:
+                        timeout = max(0.0, first_token_deadline - time.monotonic())
+                    else:
+                        timeout = settings.GROQ_STREAM_IDLE_TIMEOUT
+                    try:
+                        line = await asyncio.wait_for(lines.__anext__(), timeout)
+                    except StopAsyncIteration:
+                        break
+                    if not line.startswith('data:'):
+                        continue
+                    data = line[5:].strip()
+                    if data == '[DONE]':
+                        break
+                    delta = (json.loads(data)['choices'][0].get('delta') or {}).get('content')
+                    if delta:
+                        if first_token is None:
+                            first_token = time.monotonic() - started
+                            self.first_token.add(first_token)
+                        yield delta
+        except asyncio.TimeoutError as e:
+            if first_token is None:
+                raise self._failure(e)
+            # Groq answered in time and stalled later: judge the call by its first token
+            self.timeouts += 1
+            self.breaker.record(first_token < settings.GROQ_SLOW_CALL)
+            raise AIUnavailable('timeout')
+        except (httpx.HTTPError, KeyError, IndexError, ValueError) as e:
+            raise self._failure(e)
+        except (asyncio.CancelledError, GeneratorExit):
+            self.breaker.abandon()
+            raise
+        finally:
+            self._release(started)
+
+        self.breaker.record((first_token or time.monotonic() - started) < settings.GROQ_SLOW_CALL)
+
+    async def _request(self, messages: List[Dict], temperature: float) -> str:
+        response = await get_http_client().post(
+            f"{settings.GROQ_API_URL}/chat/completions",
+            json={"messages": messages, "model": GROQ_MODEL, "temperature": temperature},
+            headers={"Authorization": f"Bearer {settings.GROQ_API_KEY}"},
+            timeout=settings.GROQ_TIMEOUT
+        )
+        response.raise_for_status()
+        return response.json()['choices'][0]['message']['content']
+
+    def stats(self) -> Dict:
+        return {
+            'breaker': self.breaker.stats(),
+            'in_flight': self.in_flight,
+            'waiting': self.waiting,
+            'calls': self.calls,
+            'timeouts': self.timeouts,
+            'errors': self.errors,
+            'rejected': dict(self.rejected),
+            'latency': self.latency.snapshot(),
+            'first_token': self.first_token.snapshot()
+        }
+
+# Singleton instance
+groq_client = GroqClient()
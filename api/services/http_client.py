@@ -0,0 +1,56 @@
+"""
+Shared outbound HTTP client (JSONBin, Telegram, Groq).
+One connection pool per worker with keep-alive, timeouts and HTTP/2 when `h2` is installed.
+"""
+
+import asyncio
+import httpx
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, Optional
+from ..config import settings
+
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+_client: Optional[httpx.AsyncClient] = None
+_executor: Optional[ThreadPoolExecutor] = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Return the pooled client, creating it on first use"""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            http2=HTTP2_AVAILABLE,
+            timeout=httpx.Timeout(settings.HTTP_TIMEOUT, connect=5.0),
+            limits=httpx.Limits(
+                max_connections=settings.HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.HTTP_MAX_KEEPALIVE,
+                keepalive_expiry=30.0
+            )
+        )
+    return _client
+
+
+async def run_blocking(func: Callable, *args, **kwargs) -> Any:
+    """Run a blocking call (sync SDKs) on the bounded thread pool instead of the event loop"""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=settings.SYNC_EXECUTOR_WORKERS, thread_name_prefix="kayan-sync")
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, partial(func, *args, **kwargs))
+
+
+async def close_http_client():
+    """Close pooled connections and the sync executor (app shutdown)"""
+    global _client, _executor
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+    if _executor is not None:
+        _executor.shutdown(wait=False)
+        _executor = None
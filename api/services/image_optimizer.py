@@ -1,119 +1,312 @@
 from PIL import Image
+import hashlib
 import io
-import cloudinary
-import cloudinary.uploader
 from ..config import settings
-from typing import Optional, Dict
+from .media_storage import media_storage
+from .image_pool import image_pool, ImagePoolBusy, ImageJobTimeout
+from .http_client import run_blocking
+from typing import Optional, Dict, List, Tuple, Union
+
+# Image source: encoded bytes or the path of a spooled upload
+Source = Union[bytes, str]
+
+# Formats accepted for upload (MPO: multi-picture JPEG from phone cameras)
+ALLOWED_FORMATS = {'JPEG', 'MPO', 'PNG', 'WEBP', 'GIF', 'TIFF', 'BMP', 'AVIF', 'HEIF'}
+
+# Rows converted at a time when resizing images that are not RGB
+BAND_ROWS = 256
+
+# Also makes Pillow refuse bombs (past twice the limit) in code that skips inspect()
+Image.MAX_IMAGE_PIXELS = settings.IMAGE_MAX_PIXELS
+
+# AVIF needs Pillow >= 11.3 or the pillow-avif-plugin package
+try:
+    import pillow_avif  # noqa: F401
+except ImportError:
+    pass
+Image.init()
+AVIF_AVAILABLE = 'AVIF' in Image.SAVE
+
+# Public id folders in the media store. Files are named by content hash,
+# so a public id never changes content and can be cached forever
+ORIGINALS = "kayan_pro/originals"
+OPTIMIZED = "kayan_pro/optimized"
+THUMBNAILS = "kayan_pro/thumbnails"
+
+
+class ImageRejected(Exception):
+    """Not an image, or a format we do not accept"""
+
+
+class ImageTooLarge(ImageRejected):
+    """More pixels than IMAGE_MAX_PIXELS (decompression bomb protection)"""
+
+
+def open_image(source: Source) -> Image.Image:
+    """Open lazily (header only) and check format and pixel count before any decode"""
+    try:
+        img = Image.open(io.BytesIO(source) if isinstance(source, bytes) else source)
+    except Image.DecompressionBombError:
+        raise ImageTooLarge(f"Image too large: over {settings.IMAGE_MAX_PIXELS:,} pixels")
+    except Image.UnidentifiedImageError:
+        raise ImageRejected("Not an image file")
+    if img.format not in ALLOWED_FORMATS:
+        raise ImageRejected(f"Unsupported image format: {img.format}")
+    width, height = img.size
+    if width * height > settings.IMAGE_MAX_PIXELS:
+        raise ImageTooLarge(f"Image too large: {width}x{height} is over {settings.IMAGE_MAX_PIXELS:,} pixels")
+    return img
+
+
+def parse_widths(value: str) -> List[int]:
+    """"1920,640,1280" -> [1920, 1280, 640]"""
+    return sorted({int(width) for width in value.split(',') if width.strip()}, reverse=True)
+
+
+def to_rgb(img: Image.Image) -> Image.Image:
+    """RGB copy, transparency composited onto white"""
+    if img.mode == 'P':
+        img = img.convert('RGBA')
+    if img.mode in ('RGBA', 'LA'):
+        background = Image.new('RGB', img.size, (255, 255, 255))
+        background.paste(img, mask=img)
+        return background
+    return img.convert('RGB')
+
+
+def resize_to_rgb(img: Image.Image, size: Tuple[int, int]) -> Image.Image:
+    """
+    RGB `img` at `size`. RGB and grayscale are resized directly (box-reduced
+    first down to 3x the target). Other modes would need a full-size RGB
+    copy next to the decoded image, so rows are converted and narrowed a band
+    at a time and only the narrow image is resized vertically: LANCZOS is
+    separable, so the result is the same.
+    """
+    if img.mode in ('RGB', 'L'):
+        if img.size != size:
+            img = img.resize(size, Image.Resampling.LANCZOS, reducing_gap=3.0)
+        return img if img.mode == 'RGB' else img.convert('RGB')
+    rows = Image.new('RGB', (size[0], img.height))
+    for top in range(0, img.height, BAND_ROWS):
+        band = to_rgb(img.crop((0, top, img.width, min(top + BAND_ROWS, img.height))))
+        rows.paste(band.resize((size[0], band.height), Image.Resampling.LANCZOS), (0, top))
+    return rows.resize(size, Image.Resampling.LANCZOS) if rows.size != size else rows
+
+
+def fit(size: Tuple[int, int], box: Tuple[int, int]) -> Tuple[int, int]:
+    """Largest size with the same aspect ratio that fits in `box` (never upscaled)"""
+    width, height = size
+    scale = min(box[0] / width, box[1] / height, 1.0)
+    return max(1, round(width * scale)), max(1, round(height * scale))
 
-# Initialize Cloudinary
-cloudinary.config(
-    cloud_name=settings.CLOUDINARY_CLOUD_NAME,
-    api_key=settings.CLOUDINARY_API_KEY,
-    api_secret=settings.CLOUDINARY_API_SECRET
-)
 
 class ImageOptimizer:
     """
     Advanced image optimization service
-    - Auto-resize to optimal dimensions
-    - Convert to WebP for better compression
-    - Generate thumbnails
-    - Upload to Cloudinary
+    - Decode once, at reduced size when the source is much larger (JPEG draft)
+    - Responsive widths for srcset, each resized from the next larger one
+    - WebP (and optionally AVIF) renditions plus a thumbnail
+    - Upload to the media store (Cloudinary or local disk), all files at once
     """
     
     MAX_WIDTH = 1920
     MAX_HEIGHT = 1080
     THUMBNAIL_SIZE = (400, 300)
     QUALITY = 85
+    THUMBNAIL_QUALITY = 80
+    AVIF_QUALITY = 60
     
     @staticmethod
-    def optimize_image(image_bytes: bytes, filename: str) -> Dict[str, str]:
+    def inspect(source: Source) -> Dict:
+        """Format and size from the header; raises ImageRejected before anything is decoded"""
+        with open_image(source) as img:
+            return {'format': img.format, 'width': img.width, 'height': img.height}
+
+    @staticmethod
+    def render(source: Source) -> Dict:
+        """
+        CPU part of the optimization: decode, resize and encode every rendition.
+        Only one full-size bitmap is alive at a time, and only until the first resize.
+        Returns: {
+            'width': int, 'height': int,                    # largest rendition
+            'original_width': int, 'original_height': int, 'original_format': str,
+            'renditions': [{'name', 'format', 'width', 'height', 'data'}, ...]
+        }
+        """
+        # Open image (reads the header only)
+        img = open_image(source)
+        original_format = img.format
+
+        # Get original dimensions
+        original_width, original_height = img.size
+        largest = fit(img.size, (ImageOptimizer.MAX_WIDTH, ImageOptimizer.MAX_HEIGHT))
+
+        # JPEG can decode at 1/2, 1/4 or 1/8 scale, never below the requested size
+        img.draft('RGB', largest)
+
+        # Convert to RGB if necessary (for WebP) while resizing to the largest size
+        current = resize_to_rgb(img, largest)
+        del img
+
+        # Cascade: each width is resized from the previous (next larger) one
+        widths = [largest[0]] + [w for w in parse_widths(settings.IMAGE_WIDTHS) if w < largest[0]]
+        formats = [('webp', 'WEBP', ImageOptimizer.QUALITY)]
+        if settings.IMAGE_AVIF and AVIF_AVAILABLE:
+            formats.append(('avif', 'AVIF', ImageOptimizer.AVIF_QUALITY))
+        thumb_size = fit(largest, ImageOptimizer.THUMBNAIL_SIZE)
+
+        renditions = []
+        for width in widths:
+            size = (width, max(1, round(largest[1] * width / largest[0])))
+            if current.size != size:
+                current = current.resize(size, Image.Resampling.LANCZOS)
+            for name, pillow_format, quality in formats:
+                renditions.append(ImageOptimizer._encode(current, f"w{width}", name, pillow_format, quality))
+            if current.width >= thumb_size[0] and current.height >= thumb_size[1]:
+                source_img = current
+
+        # Thumbnail from the smallest rendition that still covers it
+        thumb_img = source_img.resize(thumb_size, Image.Resampling.LANCZOS)
+        renditions.append(ImageOptimizer._encode(thumb_img, 'thumb', 'webp', 'WEBP', ImageOptimizer.THUMBNAIL_QUALITY))
+
+        return {
+            'width': largest[0],
+            'height': largest[1],
+            'original_width': original_width,
+            'original_height': original_height,
+            'original_format': original_format,
+            'renditions': renditions
+        }
+
+    @staticmethod
+    def _encode(img: Image.Image, name: str, format_name: str, pillow_format: str, quality: int) -> Dict:
+        buffer = io.BytesIO()
+        img.save(buffer, format=pillow_format, quality=quality, optimize=True)
+        return {'name': name, 'format': format_name, 'width': img.width, 'height': img.height, 'data': buffer.getvalue()}
+
+    @staticmethod
+    def srcset(renditions: List[Dict], format_name: str = 'webp') -> str:
+        """srcset attribute value for the uploaded renditions of one format"""
+        return ', '.join(
+            f"{r['url']} {r['width']}w"
+            for r in sorted(renditions, key=lambda r: r['width'])
+            if r['format'] == format_name and r['name'] != 'thumb'
+        )
+
+    @staticmethod
+    async def upload(source: Source, content_hash: str, rendered: Dict) -> Dict:
+        """Upload the original and every rendition concurrently, named by content hash"""
+        base_id = content_hash
+        largest = f"w{rendered['width']}"
+
+        files = [(source, f"{ORIGINALS}/{base_id}", file_extension(rendered['original_format']))]
+        for rendition in rendered['renditions']:
+            if rendition['name'] == 'thumb':
+                public_id = f"{THUMBNAILS}/{base_id}_thumb"
+            elif rendition['name'] == largest and rendition['format'] == 'webp':
+                public_id = f"{OPTIMIZED}/{base_id}_optimized"
+            else:
+                public_id = f"{OPTIMIZED}/{base_id}_{rendition['name']}_{rendition['format']}"
+            files.append((rendition['data'], public_id, rendition['format']))
+
+        original, *stored = await media_storage.put_many(files)
+        renditions = [
+            {
+                'name': rendition['name'],
+                'format': rendition['format'],
+                'width': rendition['width'],
+                'height': rendition['height'],
+                'size': len(rendition['data']),
+                'url': uploaded['url'],
+                'public_id': uploaded['public_id']
+            }
+            for rendition, uploaded in zip(rendered['renditions'], stored)
+        ]
+
+        optimized = next(r for r in renditions if r['name'] == largest and r['format'] == 'webp')
+        thumbnail = next(r for r in renditions if r['name'] == 'thumb')
+        return {
+            'original_url': original['url'],
+            'optimized_url': optimized['url'],
+            'thumbnail_url': thumbnail['url'],
+            'width': rendered['width'],
+            'height': rendered['height'],
+            'file_size': optimized['size'],
+            'renditions': renditions,
+            'srcset': ImageOptimizer.srcset(renditions)
+        }
+
+    @staticmethod
+    async def optimize(source: Source, content_hash: str) -> Optional[Dict[str, str]]:
         """
-        Optimize image and return URLs
+        Optimize an image and return its URLs, without blocking the event loop:
+        the header is checked first, rendering runs in the image process pool,
+        uploads concurrently on the sync thread pool. Pass a file path to keep
+        the upload out of memory.
+        Raises ImageRejected for bad input and ImagePoolBusy / ImageJobTimeout
+        under load; other errors return None.
         Returns: {
             'original_url': str,
             'optimized_url': str,
             'thumbnail_url': str,
             'width': int,
             'height': int,
-            'file_size': int
+            'file_size': int,
+            'renditions': [{'name', 'format', 'width', 'height', 'size', 'url', 'public_id'}, ...],
+            'srcset': str
         }
         """
         try:
-            # Open image
-            img = Image.open(io.BytesIO(image_bytes))
-            
-            # Get original dimensions
-            original_width, original_height = img.size
-            
-            # Convert to RGB if necessary (for WebP)
-            if img.mode in ('RGBA', 'LA', 'P'):
-                background = Image.new('RGB', img.size, (255, 255, 255))
-                background.paste(img, mask=img.split()[-1] if img.mode == 'RGBA' else None)
-                img = background
-            
-            # Resize if too large
-            if original_width > ImageOptimizer.MAX_WIDTH or original_height > ImageOptimizer.MAX_HEIGHT:
-                img.thumbnail((ImageOptimizer.MAX_WIDTH, ImageOptimizer.MAX_HEIGHT), Image.Resampling.LANCZOS)
-            
-            # Save optimized version to bytes
-            optimized_bytes = io.BytesIO()
-            img.save(optimized_bytes, format='WEBP', quality=ImageOptimizer.QUALITY, optimize=True)
-            optimized_bytes.seek(0)
-            
-            # Create thumbnail
-            thumb_img = img.copy()
-            thumb_img.thumbnail(ImageOptimizer.THUMBNAIL_SIZE, Image.Resampling.LANCZOS)
-            thumb_bytes = io.BytesIO()
-            thumb_img.save(thumb_bytes, format='WEBP', quality=80)
-            thumb_bytes.seek(0)
-            
-            # Upload original to Cloudinary
-            original_upload = cloudinary.uploader.upload(
-                image_bytes,
-                folder="kayan_pro/originals",
-                public_id=filename.split('.')[0],
-                resource_type="image"
-            )
-            
-            # Upload optimized version
-            optimized_upload = cloudinary.uploader.upload(
-                optimized_bytes.getvalue(),
-                folder="kayan_pro/optimized",
-                public_id=f"{filename.split('.')[0]}_optimized",
-                resource_type="image"
-            )
-            
-            # Upload thumbnail
-            thumbnail_upload = cloudinary.uploader.upload(
-                thumb_bytes.getvalue(),
-                folder="kayan_pro/thumbnails",
-                public_id=f"{filename.split('.')[0]}_thumb",
-                resource_type="image"
-            )
-            
-            return {
-                'original_url': original_upload['secure_url'],
-                'optimized_url': optimized_upload['secure_url'],
-                'thumbnail_url': thumbnail_upload['secure_url'],
-                'width': img.width,
-                'height': img.height,
-                'file_size': len(optimized_bytes.getvalue())
-            }
-            
+            await run_blocking(ImageOptimizer.inspect, source)
+            rendered = await image_pool.run(render_image, source)
+            return await ImageOptimizer.upload(source, content_hash, rendered)
+        except (ImageRejected, ImagePoolBusy, ImageJobTimeout):
+            raise
         except Exception as e:
             print(f"Image optimization error: {e}")
             return None
-    
+
     @staticmethod
-    def delete_image(public_id: str) -> bool:
-        """Delete image from Cloudinary"""
-        try:
-            cloudinary.uploader.destroy(public_id)
-            return True
-        except Exception as e:
-            print(f"Image deletion error: {e}")
-            return False
+    async def delete_image(media: Dict) -> bool:
+        """Delete the original and every rendition of a media row in one batch"""
+        return await media_storage.delete_many(media_public_ids(media))
+
+
+def content_hasher():
+    """Streaming hash of uploads: BLAKE2b-256, 64 hex digits"""
+    return hashlib.blake2b(digest_size=32)
+
+
+def hash_bytes(data: bytes) -> str:
+    hasher = content_hasher()
+    hasher.update(data)
+    return hasher.hexdigest()
+
+
+def base_public_id(media: Dict) -> str:
+    """Content hash; rows from before hashing were named after the file"""
+    return media.get('content_hash') or media['filename'].split('.')[0]
+
+
+def file_extension(pillow_format: str) -> str:
+    """'JPEG' -> 'jpg', 'PNG' -> 'png'"""
+    return {'JPEG': 'jpg', 'TIFF': 'tif'}.get(pillow_format, pillow_format.lower())
+
+
+def media_public_ids(media: Dict) -> List[str]:
+    """Public ids of every stored file of a media row"""
+    base_id = base_public_id(media)
+    public_ids = [f"{ORIGINALS}/{base_id}"]
+    public_ids += [r['public_id'] for r in media.get('renditions') or [] if r.get('public_id')]
+    if len(public_ids) == 1:
+        # Rows from before renditions were recorded
+        public_ids += [f"{OPTIMIZED}/{base_id}_optimized", f"{THUMBNAILS}/{base_id}_thumb"]
+    return public_ids
+
+
+def render_image(source: Source) -> Dict:
+    """Module-level entry point for pool workers (picklable by reference)"""
+    return ImageOptimizer.render(source)
 
 # Singleton instance
 image_optimizer = ImageOptimizer()
@@ -0,0 +1,130 @@
+"""
+Process pool for CPU-bound image work (decode, resize, encode).
+Jobs run outside the event loop and in parallel across cores: at most
+IMAGE_WORKERS run at once and IMAGE_QUEUE_SIZE more may wait; beyond that
+callers get ImagePoolBusy instead of piling up. Each job has an
+IMAGE_JOB_TIMEOUT deadline. IMAGE_WORKERS=0 runs jobs on the shared thread
+pool instead, for hosts without multiprocessing support; SERVERLESS hosts
+always do.
+"""
+
+import asyncio
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, Optional
+
+from ..config import settings
+from .http_client import run_blocking
+from .metrics import LatencyWindow
+
+
+class ImagePoolBusy(Exception):
+    """Every worker is busy and the wait queue is full; the client should retry later"""
+
+
+class ImageJobTimeout(Exception):
+    """A job ran past IMAGE_JOB_TIMEOUT"""
+
+
+class ImageWorkerPool:
+    """
+    Bounded ProcessPoolExecutor. A job counts against the queue until it
+    actually finishes, even after its caller timed out, so a stuck worker
+    turns into backpressure rather than unbounded queueing.
+    """
+
+    def __init__(self, workers: Optional[int] = None, queue_size: Optional[int] = None, timeout: Optional[float] = None):
+        if workers is None:
+            # Serverless runtimes have no /dev/shm for multiprocessing semaphores
+            workers = 0 if settings.SERVERLESS else settings.IMAGE_WORKERS
+        self.workers = workers
+        self.queue_size = settings.IMAGE_QUEUE_SIZE if queue_size is None else queue_size
+        self.timeout = timeout or settings.IMAGE_JOB_TIMEOUT
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self.pending = 0
+        # Metrics
+        self.latency = LatencyWindow()
+        self.completed = 0
+        self.rejected = 0
+        self.timeouts = 0
+        self.failed = 0
+
+    @property
+    def capacity(self) -> int:
+        """Jobs accepted at once: running plus waiting"""
+        return max(self.workers, 1) + self.queue_size
+
+    def _pool(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # spawn: forking a process that runs an event loop and threads is unsafe
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._executor
+
+    def _finished(self, job: asyncio.Future):
+        self.pending -= 1
+        if not job.cancelled() and job.exception() is None:
+            self.completed += 1
+
+    async def run(self, func: Callable, *args) -> Any:
+        """
+        Run `func(*args)` in a worker and return its result.
+        `func` and its arguments must be picklable (a module-level function).
+        Raises ImagePoolBusy when the queue is full and ImageJobTimeout past the deadline.
+        """
+        if self.pending >= self.capacity:
+            self.rejected += 1
+            raise ImagePoolBusy()
+
+        started = time.perf_counter()
+        if self.workers > 0:
+            try:
+                job = asyncio.wrap_future(self._pool().submit(func, *args))
+            except BrokenProcessPool:
+                # A worker died (e.g. killed for memory): start a fresh pool
+                self._executor = None
+                job = asyncio.wrap_future(self._pool().submit(func, *args))
+        else:
+            job = asyncio.ensure_future(run_blocking(func, *args))
+        self.pending += 1
+        job.add_done_callback(self._finished)
+
+        try:
+            return await asyncio.wait_for(asyncio.shield(job), self.timeout)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            raise ImageJobTimeout()
+        except BrokenProcessPool:
+            self.failed += 1
+            self._executor = None
+            raise
+        except Exception:
+            self.failed += 1
+            raise
+        finally:
+            self.latency.add(time.perf_counter() - started)
+
+    def close(self):
+        """Drop queued jobs and let the worker processes exit (app shutdown)"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def stats(self) -> Dict:
+        return {
+            'workers': self.workers,
+            'pending': self.pending,
+            'capacity': self.capacity,
+            'completed': self.completed,
+            'rejected': self.rejected,
+            'timeouts': self.timeouts,
+            'failed': self.failed,
+            'latency': self.latency.snapshot()
+        }
+
+# Singleton instance
+image_pool = ImageWorkerPool()
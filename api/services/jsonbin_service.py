@@ -0,0 +1,189 @@
+import asyncio
+import heapq
+import time
+from functools import partial
+from typing import Any, Dict, List, Optional
+from ..config import settings
+from . import pagination
+from .collection_store import CollectionStore, IndexedCollection
+from .http_client import get_http_client
+from .storage_backend import StorageBackend, StorageUnavailable, GENERATED_FIELDS, new_id, now_iso, unit_total_price
+
+class JsonBinService(StorageBackend):
+    """
+    Legacy JSONBin storage backend.
+    The whole database is a single JSON document keyed by collection name,
+    held in memory as indexed collections between refreshes.
+    """
+
+    name = "jsonbin"
+
+    def __init__(self):
+        super().__init__()
+        self.bin_url = f"https://api.jsonbin.io/v3/b/{settings.JSONBIN_ID}"
+        self.headers = {
+            "Content-Type": "application/json",
+            "X-Master-Key": settings.JSONBIN_KEY,
+            "X-Bin-Meta": "false"
+        }
+        # Read-through snapshot of the whole bin, None until a GET succeeds
+        self._snapshot: Optional[CollectionStore] = None
+        self._snapshot_at = 0.0
+        # Write-behind state: mutations since the last PUT
+        self._pending = 0
+        self._flush_task: Optional[asyncio.Task] = None
+        self._refresh_lock = asyncio.Lock()
+
+    # ==================== JSONBIN HELPERS ====================
+    def _is_fresh(self, write: bool = False) -> bool:
+        if self._snapshot is None:
+            return False
+        # Never refresh while writes are queued, they would be lost
+        if self._pending:
+            return True
+        # Serverless instances share the bin: each write starts from its current content
+        if write and settings.SERVERLESS:
+            return False
+        return time.monotonic() - self._snapshot_at < settings.JSONBIN_CACHE_TTL
+
+    async def _jb_read(self, write: bool = False) -> CollectionStore:
+        """
+        Return the bin snapshot, refreshed from JSONBin once the TTL expires.
+        Only a snapshot loaded by a successful GET is ever written back: when
+        the bin cannot be read, reads see an empty store and writes raise
+        StorageUnavailable instead of replacing the bin with it.
+        """
+        if self._is_fresh(write):
+            return self._snapshot
+        async with self._refresh_lock:
+            if self._is_fresh(write):
+                return self._snapshot
+            loaded = False
+            try:
+                r = await get_http_client().get(self.bin_url, headers=self.headers)
+                if r.status_code == 200 and not self._pending:
+                    self._snapshot = CollectionStore(r.json())
+                    self._snapshot_at = time.monotonic()
+                    loaded = True
+                elif r.status_code != 200:
+                    print(f"JSONBin Read Error: HTTP {r.status_code}")
+            except Exception as e: print(f"JSONBin Read Error: {e}")
+            # A stale snapshot is only reused for writes when instances don't share the bin
+            if write and not loaded and (self._snapshot is None or settings.SERVERLESS):
+                raise StorageUnavailable("JSONBin could not be read")
+        return self._snapshot if self._snapshot is not None else CollectionStore()
+
+    async def _jb_write(self, data: Dict) -> bool:
+        try:
+            r = await get_http_client().put(self.bin_url, headers=self.headers, json=data)
+            return r.status_code == 200
+        except Exception as e:
+            print(f"JSONBin Write Error: {e}")
+            return False
+
+    async def _jb_commit(self):
+        """
+        Queue the mutated snapshot; all mutations in one window share a single PUT.
+        On serverless hosts the PUT is awaited before the write returns, since
+        the instance may be frozen as soon as the response is sent.
+        """
+        self._snapshot_at = time.monotonic()
+        self._pending += 1
+        if settings.SERVERLESS:
+            if not await self.flush():
+                # Drop the unsaved mutation; the next access reads the bin again
+                self._snapshot, self._pending = None, 0
+                raise StorageUnavailable("JSONBin write failed")
+            return
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.get_running_loop().create_task(self._flush_later())
+
+    async def _flush_later(self):
+        # Mutations made during an upload are picked up by the next window
+        while self._pending:
+            await asyncio.sleep(settings.JSONBIN_FLUSH_INTERVAL)
+            if not await self.flush():
+                break
+
+    async def flush(self) -> bool:
+        """Upload the snapshot if it has pending mutations"""
+        if not self._pending:
+            return True
+        pending, self._pending = self._pending, 0
+        ok = False
+        try:
+            ok = await self._jb_write(self._snapshot.to_document())
+        finally:
+            if not ok:
+                # Keep the mutations queued for the next flush
+                self._pending += pending
+        return ok
+
+    async def _jb_collection(self, collection_name: str, write: bool = False) -> IndexedCollection:
+        return (await self._jb_read(write))[collection_name]
+
+    @staticmethod
+    def _computed(table: str, item: Dict) -> Dict:
+        """Fill columns that PostgreSQL would generate"""
+        if 'total_price' in GENERATED_FIELDS.get(table, ()):
+            item['total_price'] = unit_total_price(item)
+        return item
+
+    # ==================== ROW PRIMITIVES ====================
+
+    async def _select(self, table: str, filters: Optional[Dict[str, Any]] = None) -> List[Dict]:
+        return (await self._jb_collection(table)).find(filters)
+
+    async def _select_one(self, table: str, field: str, value: Any) -> Optional[Dict]:
+        return (await self._jb_collection(table)).find_one({field: value})
+
+    async def _insert(self, table: str, data: Dict) -> Dict:
+        item = {'id': new_id(), 'created_at': now_iso(), 'updated_at': now_iso(), **data}
+        row = (await self._jb_collection(table, write=True)).upsert(self._computed(table, item))
+        await self._jb_commit()
+        return row
+
+    async def _update(self, table: str, field: str, value: Any, data: Dict) -> Optional[Dict]:
+        collection = await self._jb_collection(table, write=True)
+        existing = collection.find_one({field: value})
+        if not existing:
+            return None
+        row = collection.upsert(self._computed(table, {**existing, **data, 'updated_at': now_iso()}))
+        await self._jb_commit()
+        return row
+
+    async def _delete(self, table: str, field: str, value: Any) -> bool:
+        collection = await self._jb_collection(table, write=True)
+        pks = collection.find_pks({field: value})
+        for pk in pks:
+            collection.remove(pk)
+        if not pks:
+            return False
+        await self._jb_commit()
+        return True
+
+    async def _select_page(self, table, filters, limit, after, fields, contains, sort=pagination.DEFAULT_SORT) -> List[Dict]:
+        collection = await self._jb_collection(table)
+        rows = [collection.rows[pk] for pk in collection.find_pks(filters)]
+        if contains:
+            rows = [
+                row for row in rows
+                if all(set(values).issubset(row.get(field) or []) for field, values in contains.items())
+            ]
+        key = partial(pagination.sort_key, sort=sort)
+        if after:
+            rows = [row for row in rows if key(row) < after]
+        rows = heapq.nlargest(limit, rows, key=key)
+        return [dict(pagination.project(row, fields)) for row in rows]
+
+    async def _count(self, table, filters, contains) -> int:
+        if not contains:
+            return len((await self._jb_collection(table)).find_pks(filters))
+        return len(await self._select_page(table, filters, 10 ** 9, None, ['id'], contains))
+
+    async def close(self):
+        """Flush queued writes on shutdown"""
+        if self._flush_task and not self._flush_task.done():
+            self._flush_task.cancel()
+            await asyncio.gather(self._flush_task, return_exceptions=True)
+        await self.flush()
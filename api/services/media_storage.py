@@ -0,0 +1,223 @@
+"""
+Where uploaded media files live.
+
+Files are addressed by public id ("kayan_pro/optimized/photo_w640_webp").
+MediaStorage uploads all files of one media item concurrently on the sync
+thread pool, retrying each with exponential backoff; if one still fails,
+the ones this upload created are deleted so no orphans are left behind.
+Public ids are content addressed, so a file that already existed may belong
+to a concurrent upload of the same image: it is never overwritten or deleted.
+Concrete stores (Cloudinary, local disk) only implement `_put` and `_delete`.
+"""
+
+import asyncio
+import os
+import random
+import shutil
+import tempfile
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Dict, Iterable, List, Tuple, Union
+
+import cloudinary
+import cloudinary.api
+import cloudinary.exceptions
+import cloudinary.uploader
+
+from ..config import settings
+from .http_client import run_blocking
+
+# File contents, or the path of a file to copy from (large originals stay on disk)
+Data = Union[bytes, str]
+
+
+class MediaStorage(ABC):
+    """
+    Base class for media file stores.
+    Selected once at startup, see create_media_storage().
+    """
+
+    name = "base"
+    # Errors a retry cannot fix (bad credentials, rejected file...)
+    permanent_errors: Tuple[type, ...] = ()
+
+    def __init__(self):
+        # Metrics
+        self.uploaded = 0
+        self.retries = 0
+        self.failed = 0
+        self.deleted = 0
+
+    async def put_many(self, files: List[Tuple[Data, str, str]]) -> List[Dict]:
+        """
+        Store (data, public_id, format) files concurrently.
+        Returns [{'url', 'public_id'}] in the same order. Raises the first
+        error if any file fails, after deleting the files this call created.
+        """
+        results = await asyncio.gather(*(self._put_retrying(*file) for file in files), return_exceptions=True)
+        errors = [result for result in results if isinstance(result, BaseException)]
+        if errors:
+            created = [result['public_id'] for result in results
+                       if not isinstance(result, BaseException) and result['created']]
+            if created:
+                await self.delete_many(created)
+            raise errors[0]
+        return [{'url': result['url'], 'public_id': result['public_id']} for result in results]
+
+    async def _put_retrying(self, data: Data, public_id: str, file_format: str) -> Dict:
+        for attempt in range(settings.MEDIA_UPLOAD_RETRIES + 1):
+            try:
+                stored = await run_blocking(self._put, data, public_id, file_format)
+                self.uploaded += 1
+                return stored
+            except self.permanent_errors:
+                self.failed += 1
+                raise
+            except Exception as e:
+                if attempt == settings.MEDIA_UPLOAD_RETRIES:
+                    self.failed += 1
+                    raise
+                self.retries += 1
+                print(f"Media upload error ({public_id}, attempt {attempt + 1}): {e}")
+                delay = settings.MEDIA_UPLOAD_BACKOFF * 2 ** attempt
+                await asyncio.sleep(delay * (0.5 + random.random() / 2))
+
+    async def delete_many(self, public_ids: Iterable[str]) -> bool:
+        """Delete files in one batch; missing ids are ignored"""
+        public_ids = list(public_ids)
+        try:
+            await run_blocking(self._delete, public_ids)
+            self.deleted += len(public_ids)
+            return True
+        except Exception as e:
+            print(f"Media deletion error: {e}")
+            return False
+
+    def stats(self) -> Dict:
+        return {
+            'backend': self.name,
+            'uploaded': self.uploaded,
+            'retries': self.retries,
+            'failed': self.failed,
+            'deleted': self.deleted
+        }
+
+    # ==================== PRIMITIVES (blocking) ====================
+
+    @abstractmethod
+    def _put(self, data: Data, public_id: str, file_format: str) -> Dict:
+        """
+        Store one file unless its public id already exists.
+        Returns {'url', 'public_id', 'created'}; `created` is False when an
+        existing file was kept.
+        """
+
+    @abstractmethod
+    def _delete(self, public_ids: List[str]):
+        """Delete files by public id"""
+
+
+class CloudinaryStorage(MediaStorage):
+    """Cloudinary CDN (the format is detected from the file itself)"""
+
+    name = "cloudinary"
+    permanent_errors = (
+        cloudinary.exceptions.BadRequest,
+        cloudinary.exceptions.AuthorizationRequired,
+        cloudinary.exceptions.NotAllowed
+    )
+    # Admin API limit per delete_resources call
+    DELETE_BATCH = 100
+
+    def __init__(self):
+        super().__init__()
+        cloudinary.config(
+            cloud_name=settings.CLOUDINARY_CLOUD_NAME,
+            api_key=settings.CLOUDINARY_API_KEY,
+            api_secret=settings.CLOUDINARY_API_SECRET
+        )
+
+    def _put(self, data: Data, public_id: str, file_format: str) -> Dict:
+        # The SDK streams a path from disk; an existing asset is returned as is
+        uploaded = cloudinary.uploader.upload(data, public_id=public_id, resource_type="image", overwrite=False)
+        return {'url': uploaded['secure_url'], 'public_id': uploaded['public_id'], 'created': not uploaded.get('existing')}
+
+    def _delete(self, public_ids: List[str]):
+        for start in range(0, len(public_ids), self.DELETE_BATCH):
+            cloudinary.api.delete_resources(public_ids[start:start + self.DELETE_BATCH], resource_type="image")
+
+
+class LocalStorage(MediaStorage):
+    """
+    Files under MEDIA_ROOT, served from MEDIA_URL (by the API itself when
+    MEDIA_URL is a path). For development, tests and self-hosting.
+    """
+
+    name = "local"
+    permanent_errors = (ValueError,)
+    # Extensions a file may be stored with, so deletes need no directory listing
+    EXTENSIONS = ('webp', 'avif', 'jpg', 'mpo', 'png', 'gif', 'tif', 'bmp', 'heif')
+
+    def __init__(self, root: str = None, base_url: str = None):
+        super().__init__()
+        self.root = Path(root or settings.MEDIA_ROOT).resolve()
+        self.base_url = (base_url if base_url is not None else settings.MEDIA_URL).rstrip('/')
+
+    def _path(self, public_id: str) -> Path:
+        path = (self.root / public_id).resolve()
+        if self.root not in path.parents:
+            raise ValueError(f"Invalid public id: {public_id}")
+        return path
+
+    def _put(self, data: Data, public_id: str, file_format: str) -> Dict:
+        if file_format not in self.EXTENSIONS:
+            raise ValueError(f"Unsupported file format: {file_format}")
+        path = self._path(public_id).with_name(f"{Path(public_id).name}.{file_format}")
+        url = f"{self.base_url}/{path.relative_to(self.root).as_posix()}"
+        if path.exists():
+            return {'url': url, 'public_id': public_id, 'created': False}
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Write then link into place, so a reader never sees a partial file and
+        # exactly one of concurrent uploads of the same id creates it
+        fd, tmp = tempfile.mkstemp(dir=path.parent, suffix='.part')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                if isinstance(data, bytes):
+                    f.write(data)
+                else:
+                    with open(data, 'rb') as src:
+                        shutil.copyfileobj(src, f)
+            try:
+                os.link(tmp, path)
+                created = True
+            except FileExistsError:
+                created = False
+        finally:
+            os.unlink(tmp)
+        return {'url': url, 'public_id': public_id, 'created': created}
+
+    def _delete(self, public_ids: List[str]):
+        for public_id in public_ids:
+            path = self._path(public_id)
+            for extension in self.EXTENSIONS:
+                path.with_name(f"{path.name}.{extension}").unlink(missing_ok=True)
+
+
+def create_media_storage() -> MediaStorage:
+    """
+    Pick the media store once at startup.
+    MEDIA_STORAGE: 'cloudinary', 'local' or 'auto'
+    (auto = Cloudinary when credentials exist, local disk otherwise)
+    """
+    backend = settings.MEDIA_STORAGE.lower()
+
+    if backend == "auto":
+        backend = "cloudinary" if settings.CLOUDINARY_CLOUD_NAME and settings.CLOUDINARY_API_KEY else "local"
+    if backend == "cloudinary":
+        return CloudinaryStorage()
+    if backend == "local":
+        return LocalStorage()
+    raise ValueError(f"Unknown MEDIA_STORAGE: {settings.MEDIA_STORAGE}")
+
+# Singleton instance
+media_storage = create_media_storage()
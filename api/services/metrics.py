@@ -0,0 +1,43 @@
+"""
+Lightweight in-process metrics, reported by /api/metrics.
+"""
+
+import math
+from collections import deque
+from typing import Deque, Dict
+
+
+class LatencyWindow:
+    """Durations of the most recent operations, for percentiles"""
+
+    def __init__(self, size: int = 1000):
+        self.samples: Deque[float] = deque(maxlen=size)
+        self.count = 0
+        self.total = 0.0
+
+    def add(self, seconds: float):
+        self.samples.append(seconds)
+        self.count += 1
+        self.total += seconds
+
+    @staticmethod
+    def _pick(ordered, p: float) -> float:
+        if not ordered:
+            return 0.0
+        return ordered[min(len(ordered) - 1, max(0, math.ceil(p / 100 * len(ordered)) - 1))]
+
+    def percentile(self, p: float) -> float:
+        """p-th percentile in seconds"""
+        return self._pick(sorted(self.samples), p)
+
+    def snapshot(self) -> Dict:
+        """Counts plus p50/p95/p99 in milliseconds over the window"""
+        ordered = sorted(self.samples)
+        return {
+            'count': self.count,
+            'avg_ms': round(self.total / self.count * 1000, 2) if self.count else 0.0,
+            'p50_ms': round(self._pick(ordered, 50) * 1000, 2),
+            'p95_ms': round(self._pick(ordered, 95) * 1000, 2),
+            'p99_ms': round(self._pick(ordered, 99) * 1000, 2),
+            'max_ms': round(ordered[-1] * 1000, 2) if ordered else 0.0
+        }
@@ -6,6 +6,21 @@ Understands natural language commands in Egyptian Arabic
 import re
 from typing import Dict, Optional, Tuple
 
+# A price: 2000000 / 2,000,000 / 2 مليون / 2.5 مليون
+PRICE = r'(\d+(?:,\d+)*(?:\.\d+)?)(\s*مليون)?'
+# "2 مليون", "2.5 مليون"
+MILLIONS = re.compile(r'(\d+(?:\.\d+)?)\s*مليون')
+
+
+def price_value(match: re.Match) -> int:
+    """Number captured by a PRICE pattern; "مليون" multiplies the number it follows"""
+    digits = match.group(1).replace(',', '')
+    value = float(digits) if '.' in digits else int(digits)
+    if match.group(2):
+        value *= 1000000
+    return round(value)
+
+
 class NLPCommandProcessor:
     def __init__(self):
         # Project name mappings
@@ -16,14 +31,26 @@ class NLPCommandProcessor:
             "ليليان": "lilian-tower",
             "lilian": "lilian-tower"
         }
-        
+
         # Number words in Arabic
         self.number_words = {
             "واحد": 1, "اتنين": 2, "ثلاثة": 3, "اربعة": 4, "خمسة": 5,
             "ستة": 6, "سبعة": 7, "ثمانية": 8, "تسعة": 9, "عشرة": 10,
             "عشر": 10, "عشرين": 20, "ثلاثين": 30, "اربعين": 40, "خمسين": 50
         }
-    
+        # Whole words only ("عشر" is not in "عشرين"), optionally joined
+        # with "و" as in "واحد وعشرين"
+        words = sorted(self.number_words, key=len, reverse=True)
+        self.number_words_pattern = re.compile(r'(?<!\w)و?(' + '|'.join(map(re.escape, words)) + r')(?!\w)')
+
+        # Customer question intents, checked in this order
+        self.intent_keywords = {
+            "price": ["سعر", "اسعار", "أسعار", "بكام", "كام", "تمن", "قسط", "تقسيط", "price"],
+            "location": ["فين", "مكان", "عنوان", "لوكيشن", "موقع", "location"],
+            "availability": ["متاح", "وحدات", "شقق", "شقة", "مساحات", "available"],
+            "greeting": ["السلام", "سلام", "اهلا", "أهلا", "مرحبا", "صباح", "مساء", "hello"]
+        }
+
     def extract_project_id(self, text: str) -> Optional[str]:
         """Extract project ID from text"""
         text_lower = text.lower()
@@ -31,22 +58,29 @@ class NLPCommandProcessor:
             if key in text_lower:
                 return project_id
         return None
-    
+
+    def detect_intent(self, text: str) -> Optional[str]:
+        """Topic of a customer question: price, location, availability, greeting or None"""
+        text_lower = text.lower()
+        for intent, keywords in self.intent_keywords.items():
+            if any(kw in text_lower for kw in keywords):
+                return intent
+        return None
+
     def extract_numbers(self, text: str) -> list:
         """Extract all numbers from text (both digits and words)"""
         numbers = []
-        
+
         # Extract digit numbers
         digit_matches = re.findall(r'\d+', text)
         numbers.extend([int(n) for n in digit_matches])
-        
+
         # Extract word numbers
-        for word, num in self.number_words.items():
-            if word in text:
-                numbers.append(num)
-        
+        for word in self.number_words_pattern.findall(text):
+            numbers.append(self.number_words[word])
+
         return numbers
-    
+
     def parse_price_update(self, text: str) -> Optional[Dict]:
         """
         Parse price update commands like:
@@ -57,40 +91,36 @@ class NLPCommandProcessor:
         price_keywords = ["غير سعر", "عدل سعر", "حدث سعر", "السعر", "price"]
         if not any(kw in text for kw in price_keywords):
             return None
-        
+
         result = {}
-        
+
         # Extract project
         result["project_id"] = self.extract_project_id(text)
-        
-        # Extract area (متر/م)
-        area_match = re.search(r'(\d+)\s*(?:م|متر)', text)
+
+        # Extract area (متر/م); a lone "م" must end the word, or "2 مليون" would read as 2 meters
+        area_match = re.search(r'(\d+)\s*(?:م(?!\w)|متر)', text)
         if area_match:
             result["area"] = int(area_match.group(1))
-        
+
         # Extract floor (دور)
         floor_match = re.search(r'(?:دور|الدور)\s*(\d+)', text)
         if floor_match:
             result["floor"] = int(floor_match.group(1))
-        
+
         # Extract price
         # Look for "لـ" or "السعر" followed by number
-        price_match = re.search(r'(?:لـ|السعر|يبقى)\s*(\d+(?:,\d+)*)', text)
+        price_match = re.search(r'(?:لـ|السعر|يبقى)\s*' + PRICE, text)
         if price_match:
-            price_str = price_match.group(1).replace(',', '')
-            result["new_price"] = int(price_str)
-        
-        # Handle "مليون" (million)
-        if "مليون" in text:
-            numbers = self.extract_numbers(text)
-            if numbers:
-                # Last number before "مليون" is likely the price
-                for i, num in enumerate(numbers):
-                    if i < len(numbers) - 1:  # Not the last number
-                        result["new_price"] = num * 1000000
-        
+            result["new_price"] = price_value(price_match)
+
+        # "ب 2 مليون": no price word, the number written right before "مليون"
+        elif "مليون" in text:
+            millions_match = MILLIONS.search(text)
+            if millions_match:
+                result["new_price"] = round(float(millions_match.group(1)) * 1000000)
+
         return result if len(result) > 1 else None
-    
+
     def parse_add_unit(self, text: str) -> Optional[Dict]:
         """
         Parse add unit commands like:
@@ -99,39 +129,39 @@ class NLPCommandProcessor:
         add_keywords = ["اضف وحدة", "وحدة جديدة", "add unit"]
         if not any(kw in text for kw in add_keywords):
             return None
-        
+
         result = {}
-        
+
         # Extract project
         result["project_id"] = self.extract_project_id(text)
-        
+
         # Extract bedrooms
         bedrooms_match = re.search(r'(\d+)\s*(?:غرفة|غرف)', text)
         if bedrooms_match:
             result["bedrooms"] = int(bedrooms_match.group(1))
-        
+
         # Extract bathrooms
         bathrooms_match = re.search(r'(\d+)\s*(?:حمام|حمامات)', text)
         if bathrooms_match:
             result["bathrooms"] = int(bathrooms_match.group(1))
-        
+
         # Extract floor
         floor_match = re.search(r'(?:دور|الدور)\s*(\d+)', text)
         if floor_match:
             result["floor_number"] = int(floor_match.group(1))
-        
+
         # Extract area
         area_match = re.search(r'(?:مساحة|المساحة)\s*(\d+)', text)
         if area_match:
             result["area_sqm"] = int(area_match.group(1))
-        
+
         # Extract price per meter
         price_match = re.search(r'(?:سعر المتر|المتر)\s*(\d+)', text)
         if price_match:
             result["price_per_meter"] = int(price_match.group(1))
-        
+
         return result if len(result) > 1 else None
-    
+
     def parse_content_update(self, text: str) -> Optional[Dict]:
         """
         Parse content update commands like:
@@ -140,33 +170,33 @@ class NLPCommandProcessor:
         - "شيل البلوك اللي فوق"
         """
         result = {}
-        
+
         # Check for text update
         if any(kw in text for kw in ["غير النص", "عدل النص", "النص"]):
             result["action"] = "update_text"
-            
+
             # Extract block ID
             if "هيرو" in text or "hero" in text:
                 result["block_id"] = "hero_text"
             elif "عنوان" in text or "title" in text:
                 result["block_id"] = "title"
-        
+
         # Check for image update
         elif any(kw in text for kw in ["حط صورة", "غير الصورة", "صورة جديدة"]):
             result["action"] = "update_image"
-            
+
             if "هيرو" in text or "hero" in text:
                 result["block_id"] = "hero_image"
-        
+
         # Check for block removal
         elif any(kw in text for kw in ["شيل", "امسح", "احذف"]):
             result["action"] = "delete_block"
-        
+
         # Extract project
         result["project_id"] = self.extract_project_id(text)
-        
+
         return result if "action" in result else None
-    
+
     def parse_search_units(self, text: str) -> Optional[Dict]:
         """
         Parse unit search commands like:
@@ -176,69 +206,63 @@ class NLPCommandProcessor:
         search_keywords = ["ابحث", "عايز", "محتاج", "search", "find"]
         if not any(kw in text for kw in search_keywords):
             return None
-        
+
         result = {"filters": {}}
-        
+
         # Extract project
         result["project_id"] = self.extract_project_id(text)
-        
+
         # Extract bedrooms
         bedrooms_match = re.search(r'(\d+)\s*(?:غرفة|غرف)', text)
         if bedrooms_match:
             result["filters"]["bedrooms"] = int(bedrooms_match.group(1))
-        
+
         # Extract bathrooms
         bathrooms_match = re.search(r'(\d+)\s*(?:حمام|حمامات)', text)
         if bathrooms_match:
             result["filters"]["bathrooms"] = int(bathrooms_match.group(1))
-        
+
         # Extract floor
         floor_match = re.search(r'(?:دور|الدور)\s*(\d+)', text)
         if floor_match:
             result["filters"]["floor_number"] = int(floor_match.group(1))
-        
-        # Extract price range
-        if "اقل من" in text or "أقل من" in text:
-            price_match = re.search(r'(?:اقل من|أقل من)\s*(\d+)', text)
-            if price_match:
-                result["filters"]["price_max"] = int(price_match.group(1))
-                if "مليون" in text:
-                    result["filters"]["price_max"] *= 1000000
-        
-        if "اكتر من" in text or "أكتر من" in text:
-            price_match = re.search(r'(?:اكتر من|أكتر من)\s*(\d+)', text)
-            if price_match:
-                result["filters"]["price_min"] = int(price_match.group(1))
-                if "مليون" in text:
-                    result["filters"]["price_min"] *= 1000000
-        
+
+        # Extract price range ("مليون" only applies to the number it follows)
+        price_match = re.search(r'(?:اقل من|أقل من)\s*' + PRICE, text)
+        if price_match:
+            result["filters"]["price_max"] = price_value(price_match)
+
+        price_match = re.search(r'(?:اكتر من|أكتر من)\s*' + PRICE, text)
+        if price_match:
+            result["filters"]["price_min"] = price_value(price_match)
+
         return result if result["filters"] else None
-    
+
     def process_command(self, text: str) -> Tuple[str, Optional[Dict]]:
         """
         Main method to process any command and return (command_type, parsed_data)
         """
         # Try to parse as different command types
-        
+
         # Price update
         price_data = self.parse_price_update(text)
         if price_data:
             return ("update_price", price_data)
-        
+
         # Add unit
         add_data = self.parse_add_unit(text)
         if add_data:
             return ("add_unit", add_data)
-        
+
         # Content update
         content_data = self.parse_content_update(text)
         if content_data:
             return ("update_content", content_data)
-        
+
         # Search units
         search_data = self.parse_search_units(text)
         if search_data:
             return ("search_units", search_data)
-        
+
         # Unknown command
         return ("unknown", None)
@@ -0,0 +1,120 @@
+"""
+Response cache for public page lookups (/api/pages/{slug} and the prerendered /{slug}).
+Pages are serialized once, tagged with a strong ETag derived from the body,
+and dropped when the page is saved or deleted.
+"""
+
+import asyncio
+import hashlib
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+from ..config import settings
+from .database import db
+from .serialization import dumps
+
+MAX_ENTRIES = 512
+
+
+@dataclass
+class CachedPage:
+    page_id: Optional[str]
+    body: Optional[bytes]  # JSON; None = page not found
+    etag: Optional[str]
+    expires_at: float
+    html: Optional[bytes] = None  # prerendered document of a published page
+    html_etag: Optional[str] = None
+
+
+def compute_etag(body: bytes) -> str:
+    return '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """RFC 7232 weak comparison, as required for If-None-Match"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    tags = [tag.strip() for tag in if_none_match.split(',')]
+    return any(tag.removeprefix('W/') == etag for tag in tags)
+
+
+class PageCache:
+    """
+    Per-worker slug -> serialized page cache.
+    Concurrent misses for the same slug share a single database read.
+    Other workers converge within PAGE_CACHE_TTL.
+    """
+
+    def __init__(self):
+        self.entries: "OrderedDict[str, CachedPage]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Future] = {}
+        # Bumped on every invalidation so reads started earlier are not cached
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def cache_control(self) -> str:
+        ttl, swr = settings.PAGE_CACHE_TTL, settings.PAGE_CACHE_SWR
+        return f"public, max-age={ttl}, s-maxage={ttl}, stale-while-revalidate={swr}"
+
+    async def get(self, slug: str) -> CachedPage:
+        entry = self.entries.get(slug)
+        if entry and entry.expires_at > time.monotonic():
+            self.hits += 1
+            self.entries.move_to_end(slug)
+            return entry
+        self.misses += 1
+
+        if slug in self._inflight:
+            return await asyncio.shield(self._inflight[slug])
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[slug] = future
+        try:
+            entry = await self._load(slug)
+            future.set_result(entry)
+            return entry
+        except Exception as e:
+            future.set_exception(e)
+            # Mark retrieved so an unawaited failure doesn't warn
+            future.exception()
+            raise
+        finally:
+            del self._inflight[slug]
+
+    async def _load(self, slug: str) -> CachedPage:
+        generation = self._generation
+        page = await db.get_page(slug)
+        expires_at = time.monotonic() + settings.PAGE_CACHE_TTL
+        if page is None:
+            entry = CachedPage(None, None, None, expires_at)
+        else:
+            rendered = page.pop('rendered_html', None)
+            body = dumps(page)
+            entry = CachedPage(page.get('id'), body, compute_etag(body), expires_at)
+            if rendered and page.get('is_published'):
+                entry.html = rendered.encode()
+                entry.html_etag = compute_etag(entry.html)
+        if generation != self._generation:
+            return entry
+        self.entries[slug] = entry
+        self.entries.move_to_end(slug)
+        while len(self.entries) > MAX_ENTRIES:
+            self.entries.popitem(last=False)
+        return entry
+
+    def invalidate(self, slug: Optional[str] = None, page_id: Optional[str] = None):
+        """Drop a page by slug, or by id when only the id is known"""
+        self._generation += 1
+        if slug is not None:
+            self.entries.pop(slug, None)
+        if page_id is not None:
+            for key in [k for k, e in self.entries.items() if e.page_id == page_id]:
+                del self.entries[key]
+
+# Singleton instance
+page_cache = PageCache()
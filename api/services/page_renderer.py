@@ -0,0 +1,130 @@
+"""
+Publish-time renderer for GrapesJS pages.
+Turns a page's content.html / content.css into a complete static HTML
+document (CSS inlined, minified and deduplicated) that is served directly
+at the page's slug, so visitors get the design without an extra API call.
+"""
+
+import html
+import re
+from typing import Dict, List
+
+_STRING = r'"(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\''
+_STRING_RE = re.compile(_STRING, re.S)
+# Strings are matched first, so comment markers inside them are left alone
+_COMMENT_RE = re.compile(r'(' + _STRING + r')|/\*.*?\*/', re.S)
+_SPACE_RE = re.compile(r'\s+')
+_SELECTOR_PUNCT_RE = re.compile(r'\s*([,>~+])\s*')
+_BODY_PUNCT_RE = re.compile(r'\s*([;:,{}])\s*')
+
+DOCUMENT = """<!DOCTYPE html>
+<html lang="ar" dir="rtl">
+<head>
+<meta charset="UTF-8">
+<meta name="viewport" content="width=device-width, initial-scale=1.0">
+<title>{title}</title>{description}
+<link rel="stylesheet" href="/css/unified-theme.css">
+<link rel="preconnect" href="https://fonts.gstatic.com" crossorigin>
+<link href="https://fonts.googleapis.com/css2?family=Cairo:wght@400;600;700&display=swap" rel="stylesheet">
+<style>{css}</style>
+</head>
+<body>
+<div id="root">{body}</div>
+</body>
+</html>"""
+
+
+def _split_rules(css: str) -> List[str]:
+    """Split a stylesheet into top-level statements (`sel{...}` blocks and `@x ...;` lines)"""
+    items, start, depth, quote, i = [], 0, 0, None, 0
+    while i < len(css):
+        ch = css[i]
+        if quote:
+            if ch == '\\':
+                i += 1
+            elif ch == quote:
+                quote = None
+        elif ch in '"\'':
+            quote = ch
+        elif ch == '{':
+            depth += 1
+        elif ch == '}':
+            depth -= 1
+            if depth == 0:
+                items.append(css[start:i + 1].strip())
+                start = i + 1
+        elif ch == ';' and depth == 0:
+            items.append(css[start:i + 1].strip())
+            start = i + 1
+        i += 1
+    tail = css[start:].strip()
+    if tail:
+        items.append(tail)
+    return [item for item in items if item]
+
+
+def _outside_strings(text: str, minify) -> str:
+    """Apply `minify` to the text between quoted strings, which are kept verbatim"""
+    parts, start = [], 0
+    for match in _STRING_RE.finditer(text):
+        parts.append(minify(text[start:match.start()]))
+        parts.append(match.group())
+        start = match.end()
+    parts.append(minify(text[start:]))
+    return ''.join(parts).strip()
+
+
+def _squeeze(text: str) -> str:
+    return _SPACE_RE.sub(' ', text)
+
+
+def _squeeze_selector(text: str) -> str:
+    return _SELECTOR_PUNCT_RE.sub(r'\1', _SPACE_RE.sub(' ', text))
+
+
+def _squeeze_body(text: str) -> str:
+    return _BODY_PUNCT_RE.sub(r'\1', _SPACE_RE.sub(' ', text))
+
+
+def _minify_rule(rule: str) -> str:
+    if '{' not in rule:
+        # @import / @charset statement
+        return _outside_strings(rule, _squeeze)
+    brace = rule.index('{')
+    selector = _outside_strings(rule[:brace], _squeeze)
+    body = rule[brace + 1:-1]
+    if selector.startswith('@'):
+        # @media / @supports / @keyframes: the body is itself a stylesheet
+        inner = minify_css(body)
+        return f"{selector}{{{inner}}}" if inner else ""
+    selector = _outside_strings(selector, _squeeze_selector)
+    body = _outside_strings(body, _squeeze_body).rstrip(';')
+    return f"{selector}{{{body}}}" if body else ""
+
+
+def minify_css(css: str) -> str:
+    """
+    Minify and deduplicate CSS.
+    Identical rules are kept only at their last position, which preserves the cascade.
+    """
+    css = _COMMENT_RE.sub(lambda match: match.group(1) or '', css or '')
+    rules = [_minify_rule(rule) for rule in _split_rules(css)]
+    seen = set()
+    kept = []
+    for rule in reversed(rules):
+        if rule and rule not in seen:
+            seen.add(rule)
+            kept.append(rule)
+    return ''.join(reversed(kept))
+
+
+def render_page(page: Dict) -> str:
+    """Render a page row into a complete HTML document"""
+    content = page.get('content') or {}
+    description = page.get('meta_description')
+    return DOCUMENT.format(
+        title=html.escape(page.get('title') or 'Kayan Pro'),
+        description=f'\n<meta name="description" content="{html.escape(description)}">' if description else '',
+        css=minify_css(content.get('css', '')).replace('</', '<\\/'),
+        body=content.get('html', '')
+    )
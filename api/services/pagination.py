@@ -0,0 +1,68 @@
+"""
+Keyset (cursor) pagination helpers shared by all storage backends.
+
+Lists are ordered newest first by the stable key (created_at, id), or
+(<sort>, id) for lists ordered by another column such as chats.last_message_at.
+A cursor is the sort key of the last row of a page, base64url encoded.
+"""
+
+import base64
+import json
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 500
+DEFAULT_SORT = 'created_at'
+
+_FIELD_RE = re.compile(r'^[a-z_][a-z0-9_]*$')
+
+
+def sort_key(row: Dict, sort: str = DEFAULT_SORT) -> Tuple[Any, str]:
+    value = row.get(sort)
+    return ('' if value is None else value, str(row.get('id') or ''))
+
+
+def encode_cursor(row: Dict, sort: str = DEFAULT_SORT) -> str:
+    raw = json.dumps(sort_key(row, sort), separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str) -> Tuple[Any, str]:
+    """Raises ValueError on a malformed cursor"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        value, row_id = json.loads(raw)
+    except Exception:
+        raise ValueError("Invalid cursor")
+    if not isinstance(value, (str, int, float)) or isinstance(value, bool):
+        raise ValueError("Invalid cursor")
+    return value, str(row_id)
+
+
+def parse_fields(fields: Optional[str]) -> Optional[List[str]]:
+    """Parse a `fields=a,b,c` projection; None means all columns"""
+    if not fields:
+        return None
+    names = [f.strip() for f in fields.split(',') if f.strip()]
+    for name in names:
+        if not _FIELD_RE.match(name):
+            raise ValueError(f"Invalid field: {name}")
+    return names
+
+
+def select_fields(fields: Optional[List[str]], sort: str = DEFAULT_SORT) -> Optional[List[str]]:
+    """Columns to fetch for a projection (the sort key is always needed for the cursor)"""
+    if fields is None:
+        return None
+    return list(dict.fromkeys([*fields, sort, 'id']))
+
+
+def project(row: Dict, fields: Optional[List[str]]) -> Dict:
+    if fields is None:
+        return row
+    return {f: row[f] for f in fields if f in row}
+
+
+def clamp_limit(limit: int) -> int:
+    return max(1, min(limit, MAX_LIMIT))
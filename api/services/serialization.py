@@ -0,0 +1,145 @@
+"""
+JSON serialization and HTTP response compression.
+
+orjson and brotli are optional: without them the API falls back to the
+standard json encoder and gzip-only compression.
+"""
+
+import gzip
+import json
+from typing import Any, Optional
+
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Only textual payloads are worth compressing
+COMPRESSIBLE_TYPES = ('application/json', 'text/', 'application/javascript', 'image/svg+xml')
+
+
+def dumps(obj: Any) -> bytes:
+    """Serialize to UTF-8 JSON bytes (non-JSON types such as Decimal become strings)"""
+    if orjson is not None:
+        return orjson.dumps(obj, default=str, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, ensure_ascii=False, separators=(',', ':'), default=str).encode()
+
+
+class FastJSONResponse(JSONResponse):
+    """Default response class: orjson when installed, compact stdlib JSON otherwise"""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+# ==================== COMPRESSION ====================
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    """Pick br or gzip from an Accept-Encoding header, honouring q-values"""
+    offered = {}
+    for part in accept_encoding.lower().split(','):
+        name, _, params = part.strip().partition(';')
+        q = 1.0
+        if params.strip().startswith('q='):
+            try:
+                q = float(params.strip()[2:])
+            except ValueError:
+                q = 0.0
+        offered[name.strip()] = q
+    wildcard = offered.get('*', 0.0)
+    candidates = (['br'] if brotli is not None else []) + ['gzip']
+    ranked = [(offered.get(enc, wildcard), -i, enc) for i, enc in enumerate(candidates)]
+    q, _, encoding = max(ranked)
+    return encoding if q > 0 else None
+
+
+def compress(body: bytes, encoding: str, gzip_level: int = 6, brotli_quality: int = 5) -> bytes:
+    if encoding == 'br':
+        return brotli.compress(body, quality=brotli_quality)
+    return gzip.compress(body, compresslevel=gzip_level, mtime=0)
+
+
+def weaken_etag(headers: list) -> list:
+    """
+    Mark a strong ETag weak: a re-encoded body is a different byte sequence,
+    so it must not share a strong validator with the identity body.
+    If-None-Match uses weak comparison, so revalidation still matches.
+    """
+    return [
+        (k, b'W/' + v if k.lower() == b'etag' and not v.startswith(b'W/') else v)
+        for k, v in headers
+    ]
+
+
+class CompressionMiddleware:
+    """
+    ASGI middleware compressing single-message responses above `minimum_size`
+    with brotli or gzip according to Accept-Encoding; their ETag is made weak.
+    Streaming responses (SSE, WebSocket upgrades) pass through untouched.
+    """
+
+    def __init__(self, app, minimum_size: int = 1024, gzip_level: int = 6, brotli_quality: int = 5):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            return await self.app(scope, receive, send)
+        headers = dict(scope.get('headers') or [])
+        encoding = choose_encoding(headers.get(b'accept-encoding', b'').decode('latin-1'))
+        if encoding is None:
+            return await self.app(scope, receive, send)
+
+        start_message = None
+
+        async def send_wrapper(message):
+            nonlocal start_message
+            if message['type'] == 'http.response.start':
+                start_message = message
+                return
+            if message['type'] != 'http.response.body' or start_message is None:
+                return await send(message)
+
+            start, start_message = start_message, None
+            body = message.get('body', b'')
+            if start['status'] == 304:
+                # Revalidation of a body this client would get re-encoded
+                await send({**start, 'headers': weaken_etag(start['headers'])})
+                return await send(message)
+            if message.get('more_body') or not self._compressible(start, body):
+                await send(start)
+                return await send(message)
+
+            compressed = compress(body, encoding, self.gzip_level, self.brotli_quality)
+            response_headers = [
+                (k, v) for k, v in weaken_etag(start['headers'])
+                if k.lower() not in (b'content-length', b'vary')
+            ]
+            vary = [v for k, v in start['headers'] if k.lower() == b'vary']
+            response_headers += [
+                (b'content-encoding', encoding.encode()),
+                (b'content-length', str(len(compressed)).encode()),
+                (b'vary', b', '.join(vary + [b'Accept-Encoding'])),
+            ]
+            await send({**start, 'headers': response_headers})
+            await send({**message, 'body': compressed})
+
+        await self.app(scope, receive, send_wrapper)
+
+    def _compressible(self, start, body: bytes) -> bool:
+        if len(body) < self.minimum_size or start['status'] in (204, 304):
+            return False
+        headers = {k.lower(): v for k, v in start['headers']}
+        if b'content-encoding' in headers:
+            return False
+        content_type = headers.get(b'content-type', b'').decode('latin-1')
+        return content_type.startswith(COMPRESSIBLE_TYPES)
@@ -0,0 +1,339 @@
+import asyncio
+import json
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+from ..config import settings
+from .storage_backend import StorageBackend, COLLECTIONS, new_id, now_iso
+
+# Mirrors database/schema.sql. JSONB columns are stored as JSON text.
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS projects (
+    id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    name_ar TEXT,
+    description TEXT,
+    description_ar TEXT,
+    location TEXT,
+    cover_image_url TEXT,
+    gallery TEXT DEFAULT '[]',
+    status TEXT DEFAULT 'active' CHECK (status IN ('active', 'completed', 'upcoming')),
+    created_at TEXT,
+    updated_at TEXT
+);
+
+CREATE TABLE IF NOT EXISTS units (
+    id TEXT PRIMARY KEY,
+    project_id TEXT REFERENCES projects(id) ON DELETE CASCADE,
+    unit_number TEXT NOT NULL,
+    unit_type TEXT NOT NULL CHECK (unit_type IN ('residential', 'commercial')),
+    floor_number INTEGER,
+    area_sqm REAL NOT NULL,
+    price_per_sqm REAL NOT NULL,
+    total_price REAL GENERATED ALWAYS AS (area_sqm * price_per_sqm) STORED,
+    bedrooms INTEGER DEFAULT 0,
+    bathrooms INTEGER DEFAULT 0,
+    kitchens INTEGER DEFAULT 0,
+    status TEXT DEFAULT 'available' CHECK (status IN ('available', 'reserved', 'sold')),
+    images TEXT DEFAULT '[]',
+    features TEXT DEFAULT '[]',
+    created_at TEXT,
+    updated_at TEXT
+);
+
+CREATE TABLE IF NOT EXISTS pages (
+    id TEXT PRIMARY KEY,
+    slug TEXT UNIQUE NOT NULL,
+    title TEXT NOT NULL DEFAULT '',
+    meta_description TEXT,
+    content TEXT NOT NULL DEFAULT '{}',
+    is_published INTEGER DEFAULT 0,
+    rendered_html TEXT,
+    created_at TEXT,
+    updated_at TEXT
+);
+
+CREATE TABLE IF NOT EXISTS content_blocks (
+    id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    category TEXT,
+    html TEXT NOT NULL,
+    css TEXT,
+    thumbnail_url TEXT,
+    created_at TEXT
+);
+
+CREATE TABLE IF NOT EXISTS chats (
+    id TEXT PRIMARY KEY,
+    source TEXT NOT NULL CHECK (source IN ('telegram', 'website')),
+    user_id TEXT NOT NULL,
+    user_name TEXT,
+    messages TEXT NOT NULL DEFAULT '[]',
+    status TEXT DEFAULT 'active' CHECK (status IN ('active', 'read', 'archived')),
+    message_count INTEGER NOT NULL DEFAULT 0,
+    unread_count INTEGER NOT NULL DEFAULT 0,
+    last_message TEXT,
+    last_message_at TEXT,
+    last_from_admin INTEGER,
+    created_at TEXT,
+    updated_at TEXT
+);
+
+CREATE TABLE IF NOT EXISTS chat_messages (
+    id TEXT PRIMARY KEY,
+    chat_id TEXT NOT NULL REFERENCES chats(id) ON DELETE CASCADE,
+    seq INTEGER NOT NULL,
+    text TEXT NOT NULL DEFAULT '',
+    from_admin INTEGER NOT NULL DEFAULT 0,
+    created_at TEXT,
+    UNIQUE (chat_id, seq)
+);
+
+CREATE TABLE IF NOT EXISTS leads (
+    id TEXT PRIMARY KEY,
+    name TEXT,
+    phone TEXT,
+    email TEXT,
+    source TEXT,
+    interested_in TEXT REFERENCES units(id) ON DELETE SET NULL,
+    notes TEXT,
+    status TEXT DEFAULT 'new' CHECK (status IN ('new', 'contacted', 'qualified', 'converted', 'lost')),
+    created_at TEXT,
+    updated_at TEXT
+);
+
+CREATE TABLE IF NOT EXISTS media (
+    id TEXT PRIMARY KEY,
+    filename TEXT NOT NULL,
+    original_url TEXT NOT NULL,
+    optimized_url TEXT,
+    thumbnail_url TEXT,
+    file_type TEXT,
+    file_size INTEGER,
+    width INTEGER,
+    height INTEGER,
+    alt_text TEXT,
+    tags TEXT DEFAULT '[]',
+    renditions TEXT DEFAULT '[]',
+    srcset TEXT,
+    content_hash TEXT,
+    created_at TEXT
+);
+
+CREATE INDEX IF NOT EXISTS idx_projects_status ON projects(status);
+CREATE INDEX IF NOT EXISTS idx_units_project ON units(project_id);
+CREATE INDEX IF NOT EXISTS idx_units_type ON units(unit_type);
+CREATE INDEX IF NOT EXISTS idx_units_status ON units(status);
+CREATE INDEX IF NOT EXISTS idx_units_floor ON units(floor_number);
+CREATE INDEX IF NOT EXISTS idx_units_price ON units(total_price);
+CREATE INDEX IF NOT EXISTS idx_pages_published ON pages(is_published);
+CREATE INDEX IF NOT EXISTS idx_blocks_category ON content_blocks(category);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_chats_identity ON chats(source, user_id);
+CREATE INDEX IF NOT EXISTS idx_leads_status ON leads(status);
+CREATE INDEX IF NOT EXISTS idx_projects_created ON projects(created_at, id);
+CREATE INDEX IF NOT EXISTS idx_units_created ON units(created_at, id);
+CREATE INDEX IF NOT EXISTS idx_pages_created ON pages(created_at, id);
+CREATE INDEX IF NOT EXISTS idx_chats_created ON chats(created_at, id);
+CREATE INDEX IF NOT EXISTS idx_leads_created ON leads(created_at, id);
+CREATE INDEX IF NOT EXISTS idx_media_created ON media(created_at, id);
+"""
+
+# Columns added after the first release: (table, column, type)
+MIGRATIONS = [
+    ('pages', 'rendered_html', 'TEXT'),
+    ('chats', 'message_count', 'INTEGER NOT NULL DEFAULT 0'),
+    ('chats', 'unread_count', 'INTEGER NOT NULL DEFAULT 0'),
+    ('chats', 'last_message', 'TEXT'),
+    ('chats', 'last_message_at', 'TEXT'),
+    ('chats', 'last_from_admin', 'INTEGER'),
+    ('media', 'renditions', "TEXT DEFAULT '[]'"),
+    ('media', 'srcset', 'TEXT'),
+    ('media', 'content_hash', 'TEXT'),
+]
+
+# Run after MIGRATIONS: indexes and backfills on migrated columns
+POST_MIGRATION = """
+CREATE INDEX IF NOT EXISTS idx_chats_inbox ON chats(source, last_message_at, id);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_media_content_hash ON media(content_hash);
+UPDATE chats SET last_message_at = COALESCE(updated_at, created_at) WHERE last_message_at IS NULL;
+"""
+
+# Per-table column metadata, used to whitelist writes and decode reads
+JSON_COLUMNS = {
+    'projects': {'gallery'},
+    'units': {'images', 'features'},
+    'pages': {'content'},
+    'chats': {'messages'},
+    'media': {'tags', 'renditions'},
+}
+BOOL_COLUMNS = {
+    'pages': {'is_published'},
+    'chats': {'last_from_admin'},
+    'chat_messages': {'from_admin'},
+}
+# Tables without an updated_at column
+NO_UPDATED_AT = {'content_blocks', 'chat_messages', 'media'}
+
+
+class SQLiteService(StorageBackend):
+    """
+    Embedded SQLite storage backend (WAL mode).
+    Zero-network store for single-node deployments and local load tests.
+    Statements run on one dedicated thread, which also serializes access to
+    the connection, so a slow disk or WAL checkpoint never blocks the event loop.
+    """
+
+    name = "sqlite"
+
+    def __init__(self, path: Optional[str] = None):
+        super().__init__()
+        self.path = path or settings.SQLITE_PATH
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="kayan-sqlite")
+        self.conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("PRAGMA foreign_keys=ON")
+        self.conn.executescript(SCHEMA)
+        self._migrate()
+        # hidden: 0 = plain column, 1 = virtual-table column, 2/3 = VIRTUAL/STORED generated column
+        xinfo = {table: self.conn.execute(f"PRAGMA table_xinfo({table})").fetchall() for table in COLLECTIONS}
+        self.columns = {table: {row['name'] for row in rows if row['hidden'] != 1} for table, rows in xinfo.items()}
+        self.generated = {table: {row['name'] for row in rows if row['hidden'] in (2, 3)} for table, rows in xinfo.items()}
+
+    def _migrate(self):
+        """Add columns introduced after a database file was created"""
+        for table, column, ddl in MIGRATIONS:
+            existing = {row['name'] for row in self.conn.execute(f"PRAGMA table_xinfo({table})")}
+            if column not in existing:
+                self.conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}")
+        self.conn.executescript(POST_MIGRATION)
+
+    # ==================== SQL HELPERS ====================
+
+    async def _run(self, func, *args) -> Any:
+        return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+
+    async def _execute(self, sql: str, params: tuple = ()) -> List[sqlite3.Row]:
+        return await self._run(lambda: self.conn.execute(sql, params).fetchall())
+
+    @staticmethod
+    def _encode_value(table: str, key: str, value: Any) -> Any:
+        if value is None:
+            return None
+        if key in JSON_COLUMNS.get(table, ()):
+            return json.dumps(value, ensure_ascii=False)
+        if key in BOOL_COLUMNS.get(table, ()):
+            return int(bool(value))
+        return value
+
+    def _encode(self, table: str, data: Dict) -> Dict:
+        """Keep known, writable columns only and serialize JSON values"""
+        return {
+            key: self._encode_value(table, key, value) for key, value in data.items()
+            if key in self.columns[table] and key not in self.generated[table]
+        }
+
+    @staticmethod
+    def _decode(table: str, row: sqlite3.Row) -> Dict:
+        item = dict(row)
+        for key in JSON_COLUMNS.get(table, ()):
+            if isinstance(item.get(key), str):
+                item[key] = json.loads(item[key])
+        for key in BOOL_COLUMNS.get(table, ()):
+            if item.get(key) is not None:
+                item[key] = bool(item[key])
+        return item
+
+    def _conditions(self, table: str, filters: Optional[Dict[str, Any]], contains: Optional[Dict[str, List]] = None):
+        """
+        WHERE clauses and parameters for equality filters and array containment.
+        Raises ValueError for an unknown column rather than ignoring the filter.
+        """
+        clauses, params = [], []
+        for col, value in (filters or {}).items():
+            if value is None:
+                continue
+            self._check_column(table, col)
+            clauses.append(f"{col} = ?")
+            params.append(self._encode_value(table, col, value))
+        for col, values in (contains or {}).items():
+            self._check_column(table, col)
+            for value in values:
+                clauses.append(f"EXISTS (SELECT 1 FROM json_each({table}.{col}) WHERE value = ?)")
+                params.append(value)
+        return clauses, params
+
+    @staticmethod
+    def _where(clauses: List[str]) -> str:
+        return f" WHERE {' AND '.join(clauses)}" if clauses else ""
+
+    def _check_column(self, table: str, field: str):
+        if field not in self.columns[table]:
+            raise ValueError(f"Unknown column {table}.{field}")
+
+    # ==================== ROW PRIMITIVES ====================
+
+    async def _select(self, table: str, filters: Optional[Dict[str, Any]] = None) -> List[Dict]:
+        clauses, params = self._conditions(table, filters)
+        rows = await self._execute(f"SELECT * FROM {table}{self._where(clauses)} ORDER BY created_at", tuple(params))
+        return [self._decode(table, row) for row in rows]
+
+    async def _select_one(self, table: str, field: str, value: Any) -> Optional[Dict]:
+        self._check_column(table, field)
+        rows = await self._execute(f"SELECT * FROM {table} WHERE {field} = ? LIMIT 1", (value,))
+        return self._decode(table, rows[0]) if rows else None
+
+    async def _insert(self, table: str, data: Dict) -> Dict:
+        item = {'id': new_id(), 'created_at': now_iso(), **data}
+        if table not in NO_UPDATED_AT:
+            item.setdefault('updated_at', item['created_at'])
+        row = self._encode(table, item)
+        cols = ", ".join(row)
+        marks = ", ".join("?" for _ in row)
+        await self._execute(f"INSERT INTO {table} ({cols}) VALUES ({marks})", tuple(row.values()))
+        return await self._select_one(table, 'id', row['id'])
+
+    async def _update(self, table: str, field: str, value: Any, data: Dict) -> Optional[Dict]:
+        self._check_column(table, field)
+        item = dict(data)
+        if table not in NO_UPDATED_AT:
+            item['updated_at'] = now_iso()
+        row = self._encode(table, item)
+        row.pop('id', None)
+        if row:
+            assignments = ", ".join(f"{col} = ?" for col in row)
+            await self._execute(
+                f"UPDATE {table} SET {assignments} WHERE {field} = ?",
+                (*row.values(), value)
+            )
+        return await self._select_one(table, field, data.get(field, value))
+
+    async def _delete(self, table: str, field: str, value: Any) -> bool:
+        self._check_column(table, field)
+        cursor = await self._run(self.conn.execute, f"DELETE FROM {table} WHERE {field} = ?", (value,))
+        return cursor.rowcount > 0
+
+    async def _select_page(self, table, filters, limit, after, fields, contains, sort='created_at') -> List[Dict]:
+        self._check_column(table, sort)
+        clauses, params = self._conditions(table, filters, contains)
+        if after:
+            clauses.append(f"({sort}, id) < (?, ?)")
+            params.extend(after)
+        cols = "*"
+        if fields is not None:
+            cols = ", ".join(f for f in fields if f in self.columns[table])
+        rows = await self._execute(
+            f"SELECT {cols} FROM {table}{self._where(clauses)} ORDER BY {sort} DESC, id DESC LIMIT ?",
+            (*params, limit)
+        )
+        return [self._decode(table, row) for row in rows]
+
+    async def _count(self, table, filters, contains) -> int:
+        clauses, params = self._conditions(table, filters, contains)
+        rows = await self._execute(f"SELECT COUNT(*) FROM {table}{self._where(clauses)}", tuple(params))
+        return rows[0][0]
+
+    async def close(self):
+        await self._run(self.conn.close)
+        self._executor.shutdown()
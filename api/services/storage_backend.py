@@ -0,0 +1,424 @@
+"""
+Storage backend interface for the CMS collections.
+
+Every collection in database/schema.sql is exposed through the public
+methods of StorageBackend. Concrete engines (Supabase, JSONBin, SQLite)
+only implement the five row primitives at the bottom of the class.
+"""
+
+import asyncio
+import uuid
+import weakref
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+from . import pagination
+from .page_renderer import render_page
+
+# Collections defined in database/schema.sql
+COLLECTIONS = ('projects', 'units', 'pages', 'content_blocks', 'chats', 'chat_messages', 'leads', 'media')
+
+# Chat summary columns returned by the inbox (never the legacy `messages` array)
+INBOX_FIELDS = [
+    'id', 'source', 'user_id', 'user_name', 'status', 'message_count', 'unread_count',
+    'last_message', 'last_message_at', 'last_from_admin', 'updated_at'
+]
+
+# Columns computed by the database and never written by the API
+GENERATED_FIELDS = {
+    'units': ('total_price',),
+}
+
+
+class StorageUnavailable(Exception):
+    """The storage engine could not be reached; the write was not saved"""
+
+
+def new_id() -> str:
+    """Generate a primary key compatible with the UUID columns"""
+    return str(uuid.uuid4())
+
+
+def now_iso() -> str:
+    return datetime.now().isoformat()
+
+
+def unit_total_price(unit: Dict) -> Optional[float]:
+    """Mirror of the generated units.total_price column"""
+    try:
+        return float(unit['area_sqm']) * float(unit['price_per_sqm'])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+def is_legacy_chat(chat: Dict) -> bool:
+    """Chat still holding its history in the pre-log `messages` array"""
+    return bool(chat.get('messages')) and not chat.get('message_count')
+
+
+def legacy_chat_log(chat: Dict) -> Tuple[List[Dict], Dict]:
+    """Split a legacy chat into chat_messages rows and the summary fields to store on the chat"""
+    rows = [
+        {
+            'id': new_id(),
+            'chat_id': chat['id'],
+            'seq': seq,
+            'text': message.get('text') or '',
+            'from_admin': bool(message.get('from_admin')),
+            'created_at': message.get('timestamp') or chat.get('created_at') or now_iso()
+        }
+        for seq, message in enumerate(chat.get('messages') or [], start=1)
+    ]
+    summary = {
+        'messages': [],
+        'message_count': len(rows),
+        'unread_count': 0 if chat.get('status') == 'read' else sum(not row['from_admin'] for row in rows),
+        'last_message_at': chat.get('updated_at') or chat.get('created_at')
+    }
+    if rows:
+        summary.update(
+            last_message=rows[-1]['text'],
+            last_message_at=rows[-1]['created_at'],
+            last_from_admin=rows[-1]['from_admin']
+        )
+    return rows, summary
+
+
+def chat_summary(chat: Dict, message: Dict) -> Dict:
+    """
+    Summary fields of `chat` after `message` was appended.
+    Unread counts customer messages since the chat was last marked read;
+    replies (from an admin or the bot, both from_admin) leave it as is.
+    legacy_chat_log() and database/schema.sql apply the same rule.
+    """
+    from_admin = message['from_admin']
+    return {
+        'message_count': message['seq'],
+        'unread_count': (chat.get('unread_count') or 0) + (0 if from_admin else 1),
+        'last_message': message['text'],
+        'last_message_at': message['created_at'],
+        'last_from_admin': from_admin,
+        # A customer writing again reopens the conversation
+        'status': (chat.get('status') or 'active') if from_admin else 'active'
+    }
+
+
+class StorageBackend(ABC):
+    """
+    Base class for all storage engines.
+    Selected once at startup, see database.create_storage_backend().
+    """
+
+    name = "base"
+
+    def __init__(self):
+        # (source, user_id) -> lock serializing appends to one chat within this process
+        self._chat_locks: "weakref.WeakValueDictionary[Tuple[str, str], asyncio.Lock]" = weakref.WeakValueDictionary()
+
+    # ==================== PROJECTS ====================
+
+    async def get_projects(self, status: Optional[str] = None) -> List[Dict]:
+        return await self._select('projects', {'status': status})
+
+    async def get_project(self, project_id: str) -> Optional[Dict]:
+        return await self._select_one('projects', 'id', project_id)
+
+    async def create_project(self, data: Dict) -> Dict:
+        return await self._insert('projects', data)
+
+    async def update_project(self, project_id: str, data: Dict) -> Optional[Dict]:
+        return await self._update('projects', 'id', project_id, data)
+
+    async def delete_project(self, project_id: str) -> bool:
+        return await self._delete('projects', 'id', project_id)
+
+    # ==================== UNITS ====================
+
+    async def get_units(
+        self,
+        project_id: Optional[str] = None,
+        unit_type: Optional[str] = None,
+        status: Optional[str] = None
+    ) -> List[Dict]:
+        return await self._select('units', {
+            'project_id': project_id,
+            'unit_type': unit_type,
+            'status': status
+        })
+
+    async def get_unit(self, unit_id: str) -> Optional[Dict]:
+        return await self._select_one('units', 'id', unit_id)
+
+    async def create_unit(self, data: Dict) -> Dict:
+        return await self._insert('units', self._writable('units', data))
+
+    async def update_unit(self, unit_id: str, data: Dict) -> Optional[Dict]:
+        return await self._update('units', 'id', unit_id, self._writable('units', data))
+
+    async def delete_unit(self, unit_id: str) -> bool:
+        return await self._delete('units', 'id', unit_id)
+
+    # ==================== PAGES ====================
+
+    async def get_pages(self, published_only: bool = False) -> List[Dict]:
+        return await self._select('pages', {'is_published': True if published_only else None})
+
+    async def get_page(self, slug: str) -> Optional[Dict]:
+        return await self._select_one('pages', 'slug', slug)
+
+    async def save_page(self, page_data: Dict) -> Dict:
+        """
+        Insert or update a page by slug.
+        Published pages are prerendered to static HTML (rendered_html).
+        """
+        existing = await self.get_page(page_data['slug'])
+        merged = {**(existing or {}), **page_data}
+        page_data = {
+            **page_data,
+            'rendered_html': render_page(merged) if merged.get('is_published') else None
+        }
+        if existing:
+            return await self._update('pages', 'slug', page_data['slug'], page_data)
+        return await self._insert('pages', page_data)
+
+    async def delete_page(self, page_id: str) -> bool:
+        return await self._delete('pages', 'id', page_id)
+
+    # ==================== CONTENT BLOCKS ====================
+
+    async def get_content_blocks(self, category: Optional[str] = None) -> List[Dict]:
+        return await self._select('content_blocks', {'category': category})
+
+    async def create_content_block(self, data: Dict) -> Dict:
+        return await self._insert('content_blocks', data)
+
+    # ==================== CHATS ====================
+
+    async def get_chats(self, source: Optional[str] = None) -> List[Dict]:
+        return await self._select('chats', {'source': source})
+
+    async def get_chat(self, chat_id: str) -> Optional[Dict]:
+        return await self._select_one('chats', 'id', chat_id)
+
+    async def get_chat_by_user(self, source: str, user_id: str) -> Optional[Dict]:
+        chats = await self._select('chats', {'source': source, 'user_id': user_id})
+        return chats[0] if chats else None
+
+    async def create_or_update_chat(self, chat_data: Dict) -> Dict:
+        chat_id = chat_data.get('id')
+        if chat_id and await self.get_chat(chat_id):
+            return await self._update('chats', 'id', chat_id, chat_data)
+        return await self._insert('chats', chat_data)
+
+    def _chat_lock(self, source: str, user_id: str) -> asyncio.Lock:
+        lock = self._chat_locks.get((source, user_id))
+        if lock is None:
+            lock = self._chat_locks[(source, user_id)] = asyncio.Lock()
+        return lock
+
+    async def append_chat_message(
+        self,
+        source: str,
+        user_id: str,
+        user_name: Optional[str],
+        text: str,
+        from_admin: bool = False
+    ) -> Dict:
+        """
+        Append one message to a chat's log, creating the chat on its first message.
+        Only the new chat_messages row and the chat summary are written.
+        Returns {'chat': summary row, 'message': message row}.
+        """
+        async with self._chat_lock(source, user_id):
+            chat = await self.get_chat_by_user(source, user_id)
+            if chat is None:
+                chat = await self._insert('chats', {
+                    'source': source,
+                    'user_id': user_id,
+                    'user_name': user_name,
+                    'status': 'active',
+                    'message_count': 0,
+                    'unread_count': 0,
+                    'last_message_at': now_iso()
+                })
+            elif is_legacy_chat(chat):
+                chat = await self._migrate_chat(chat)
+            message = await self._insert('chat_messages', {
+                'chat_id': chat['id'],
+                'seq': (chat.get('message_count') or 0) + 1,
+                'text': text,
+                'from_admin': from_admin
+            })
+            chat = await self._update('chats', 'id', chat['id'], chat_summary(chat, message))
+        return {'chat': chat, 'message': message}
+
+    async def get_inbox(
+        self,
+        source: str,
+        limit: int = pagination.DEFAULT_LIMIT,
+        cursor: Optional[str] = None
+    ) -> Dict:
+        """Chat summaries of one source, most recent conversation first"""
+        return await self.paginate(
+            'chats', {'source': source}, limit, cursor, fields=INBOX_FIELDS, sort='last_message_at'
+        )
+
+    async def get_chat_messages(
+        self,
+        chat_id: str,
+        limit: int = pagination.DEFAULT_LIMIT,
+        cursor: Optional[str] = None
+    ) -> Dict:
+        """
+        Page of a chat's message log, walking backwards from the newest message.
+        Items are oldest first; `next_cursor` fetches the older page.
+        """
+        page = await self.paginate('chat_messages', {'chat_id': chat_id}, limit, cursor, sort='seq')
+        page['items'].reverse()
+        return page
+
+    async def mark_chat_read(self, chat_id: str) -> Optional[Dict]:
+        """Reset the unread counter; the message log is untouched"""
+        return await self._update('chats', 'id', chat_id, {'status': 'read', 'unread_count': 0})
+
+    async def migrate_chat(self, chat: Dict) -> Dict:
+        """Move a legacy chat's `messages` array into the message log (no-op for migrated chats)"""
+        if not is_legacy_chat(chat):
+            return chat
+        async with self._chat_lock(chat['source'], chat['user_id']):
+            current = await self.get_chat(chat['id'])
+            return await self._migrate_chat(current) if is_legacy_chat(current) else current
+
+    async def migrate_chat_messages(self) -> int:
+        """Migrate every legacy chat; safe to re-run. Returns the number of chats migrated."""
+        migrated = 0
+        for chat in await self._select('chats'):
+            if is_legacy_chat(chat):
+                await self.migrate_chat(chat)
+                migrated += 1
+        return migrated
+
+    async def _migrate_chat(self, chat: Dict) -> Dict:
+        rows, summary = legacy_chat_log(chat)
+        # Clear rows left by an interrupted run before re-inserting
+        await self._delete('chat_messages', 'chat_id', chat['id'])
+        for row in rows:
+            await self._insert('chat_messages', row)
+        return await self._update('chats', 'id', chat['id'], summary)
+
+    # ==================== LEADS ====================
+
+    async def get_leads(self, status: Optional[str] = None) -> List[Dict]:
+        return await self._select('leads', {'status': status})
+
+    async def create_lead(self, data: Dict) -> Dict:
+        return await self._insert('leads', data)
+
+    async def update_lead(self, lead_id: str, data: Dict) -> Optional[Dict]:
+        return await self._update('leads', 'id', lead_id, data)
+
+    # ==================== MEDIA ====================
+
+    async def get_media(self, tags: Optional[List[str]] = None) -> List[Dict]:
+        media = await self._select('media')
+        if tags:
+            media = [m for m in media if set(tags).issubset(m.get('tags') or [])]
+        return media
+
+    async def get_media_item(self, media_id: str) -> Optional[Dict]:
+        return await self._select_one('media', 'id', media_id)
+
+    async def get_media_by_hash(self, content_hash: str) -> Optional[Dict]:
+        return await self._select_one('media', 'content_hash', content_hash)
+
+    async def create_media(self, data: Dict) -> Dict:
+        return await self._insert('media', data)
+
+    async def delete_media(self, media_id: str) -> bool:
+        return await self._delete('media', 'id', media_id)
+
+    # ==================== PAGINATION ====================
+
+    async def paginate(
+        self,
+        table: str,
+        filters: Optional[Dict[str, Any]] = None,
+        limit: int = pagination.DEFAULT_LIMIT,
+        cursor: Optional[str] = None,
+        fields: Optional[List[str]] = None,
+        with_total: bool = False,
+        contains: Optional[Dict[str, List]] = None,
+        sort: str = pagination.DEFAULT_SORT
+    ) -> Dict:
+        """
+        Keyset page of `table`, newest first by `sort` (then id).
+        Returns {'items', 'next_cursor'} plus 'total' when requested.
+        Raises ValueError for a malformed cursor.
+        """
+        limit = pagination.clamp_limit(limit)
+        after = pagination.decode_cursor(cursor) if cursor else None
+        rows = await self._select_page(
+            table, filters, limit + 1, after, pagination.select_fields(fields, sort), contains, sort
+        )
+        page = {
+            'items': [pagination.project(row, fields) for row in rows[:limit]],
+            'next_cursor': pagination.encode_cursor(rows[limit - 1], sort) if len(rows) > limit else None,
+        }
+        if with_total:
+            page['total'] = await self._count(table, filters, contains)
+        return page
+
+    # ==================== HELPERS ====================
+
+    @staticmethod
+    def _writable(table: str, data: Dict) -> Dict:
+        """Drop generated columns the database computes itself"""
+        generated = GENERATED_FIELDS.get(table, ())
+        return {k: v for k, v in data.items() if k not in generated}
+
+    async def close(self):
+        """Release connections and flush pending writes"""
+        return None
+
+    # ==================== ROW PRIMITIVES ====================
+
+    @abstractmethod
+    async def _select(self, table: str, filters: Optional[Dict[str, Any]] = None) -> List[Dict]:
+        """Return rows of `table` matching all non-None equality filters"""
+
+    @abstractmethod
+    async def _select_one(self, table: str, field: str, value: Any) -> Optional[Dict]:
+        """Return the first row where `field` equals `value`"""
+
+    @abstractmethod
+    async def _insert(self, table: str, data: Dict) -> Dict:
+        """Insert a row and return it as stored"""
+
+    @abstractmethod
+    async def _update(self, table: str, field: str, value: Any, data: Dict) -> Optional[Dict]:
+        """Merge `data` into the row where `field` equals `value`"""
+
+    @abstractmethod
+    async def _delete(self, table: str, field: str, value: Any) -> bool:
+        """Delete rows where `field` equals `value`"""
+
+    @abstractmethod
+    async def _select_page(
+        self,
+        table: str,
+        filters: Optional[Dict[str, Any]],
+        limit: int,
+        after: Optional[Tuple[str, str]],
+        fields: Optional[List[str]],
+        contains: Optional[Dict[str, List]],
+        sort: str = pagination.DEFAULT_SORT
+    ) -> List[Dict]:
+        """
+        Up to `limit` rows ordered by (`sort`, id) descending, strictly
+        after the `after` sort key. `contains` maps array columns to values
+        they must all include. `fields` limits the columns returned.
+        """
+
+    @abstractmethod
+    async def _count(self, table: str, filters: Optional[Dict[str, Any]], contains: Optional[Dict[str, List]]) -> int:
+        """Number of rows matching the filters"""
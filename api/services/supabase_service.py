@@ -1,103 +1,82 @@
 from supabase import create_client, Client
-from typing import List, Dict, Optional
-import requests
-import json
+from typing import Any, Dict, List, Optional
 from ..config import settings
+from .storage_backend import StorageBackend
+from .http_client import run_blocking
 
-class SupabaseService:
-    def __init__(self):
-        self.use_jsonbin = False
-        try:
-            if settings.SUPABASE_URL and settings.SUPABASE_KEY:
-                self.client: Client = create_client(
-                    settings.SUPABASE_URL,
-                    settings.SUPABASE_KEY
-                )
-            else:
-                print("⚠️ Supabase credentials missing. Switching to JSONBin Fallback.")
-                self.use_jsonbin = True
-        except:
-            self.use_jsonbin = True
-            
-        # JSONBin Config
-        self.bin_url = f"https://api.jsonbin.io/v3/b/{settings.JSONBIN_ID}"
-        self.headers = {
-            "Content-Type": "application/json",
-            "X-Master-Key": settings.JSONBIN_KEY,
-            "X-Bin-Meta": "false"
-        }
+class SupabaseService(StorageBackend):
+    """
+    Supabase (PostgreSQL) storage backend.
+    The supabase client is synchronous, so every query runs on the bounded executor.
+    """
 
-    # ==================== JSONBIN HELPERS ====================
-    def _jb_read(self) -> Dict:
-        try:
-            r = requests.get(self.bin_url, headers=self.headers)
-            return r.json() if r.status_code == 200 else {}
-        except: return {}
+    name = "supabase"
 
-    def _jb_write(self, data: Dict):
-        try:
-            requests.put(self.bin_url, headers=self.headers, json=data)
-        except Exception as e: print(f"JSONBin Write Error: {e}")
+    def __init__(self):
+        super().__init__()
+        self.client: Client = create_client(
+            settings.SUPABASE_URL,
+            settings.SUPABASE_KEY
+        )
 
-    def _jb_get_collection(self, collection_name: str) -> List[Dict]:
-        data = self._jb_read()
-        return data.get(collection_name, [])
+    @staticmethod
+    def _filtered(query, filters: Optional[Dict[str, Any]], contains: Optional[Dict[str, List]] = None):
+        for field, value in (filters or {}).items():
+            if value is not None:
+                query = query.eq(field, value)
+        for field, values in (contains or {}).items():
+            query = query.contains(field, values)
+        return query
 
-    def _jb_save_item(self, collection_name: str, item: Dict, id_field='id'):
-        data = self._jb_read()
-        if collection_name not in data: data[collection_name] = []
-        
-        # Check update or insert
-        idx = next((i for i, x in enumerate(data[collection_name]) if x.get(id_field) == item.get(id_field)), -1)
-        if idx >= 0:
-            data[collection_name][idx] = {**data[collection_name][idx], **item}
-        else:
-            data[collection_name].append(item)
-            
-        self._jb_write(data)
-        return item
+    async def append_chat_message(self, source, user_id, user_name, text, from_admin=False) -> Dict:
+        """
+        Append through the append_chat_message() SQL function (database/schema.sql),
+        so the sequence number and counters are assigned atomically across instances.
+        """
+        response = await run_blocking(self.client.rpc('append_chat_message', {
+            'p_source': source,
+            'p_user_id': user_id,
+            'p_user_name': user_name,
+            'p_text': text,
+            'p_from_admin': from_admin
+        }).execute)
+        return response.data
 
-    # ==================== PAGES ====================
-    
-    async def get_pages(self, published_only: bool = False) -> List[Dict]:
-        if self.use_jsonbin:
-            pages = self._jb_get_collection('pages')
-            if published_only:
-                pages = [p for p in pages if p.get('is_published')]
-            return pages
-            
-        query = self.client.table('pages').select('*')
-        if published_only:
-            query = query.eq('is_published', True)
-        response = query.execute()
+    async def _select(self, table: str, filters: Optional[Dict[str, Any]] = None) -> List[Dict]:
+        query = self._filtered(self.client.table(table).select('*'), filters)
+        response = await run_blocking(query.execute)
         return response.data
-    
-    async def get_page(self, slug: str) -> Optional[Dict]:
-        if self.use_jsonbin:
-            pages = self._jb_get_collection('pages')
-            return next((p for p in pages if p['slug'] == slug), None)
 
-        response = self.client.table('pages').select('*').eq('slug', slug).execute()
+    async def _select_one(self, table: str, field: str, value: Any) -> Optional[Dict]:
+        query = self.client.table(table).select('*').eq(field, value).limit(1)
+        response = await run_blocking(query.execute)
         return response.data[0] if response.data else None
-    
-    async def save_page(self, page_data: Dict) -> Dict:
-        if self.use_jsonbin:
-            return self._jb_save_item('pages', page_data, id_field='slug')
 
-        existing = await self.get_page(page_data['slug'])
-        if existing:
-            response = self.client.table('pages').update(page_data).eq('slug', page_data['slug']).execute()
-        else:
-            response = self.client.table('pages').insert(page_data).execute()
+    async def _insert(self, table: str, data: Dict) -> Dict:
+        response = await run_blocking(self.client.table(table).insert(data).execute)
         return response.data[0]
-    
-    # ==================== PROJECTS & UNITS (Fallback Support) ====================
-    async def get_units(self, status: Optional[str] = None) -> List[Dict]:
-        if self.use_jsonbin:
-            # Original JSONBin structure might be slightly different ('projects' -> 'units')
-            # But let's assume we store 'units' list for CMS consistency
-            return self._jb_get_collection('units')
-        return [] # Simplified
 
-# Singleton instance
-db = SupabaseService()
+    async def _update(self, table: str, field: str, value: Any, data: Dict) -> Optional[Dict]:
+        response = await run_blocking(self.client.table(table).update(data).eq(field, value).execute)
+        return response.data[0] if response.data else None
+
+    async def _delete(self, table: str, field: str, value: Any) -> bool:
+        response = await run_blocking(self.client.table(table).delete().eq(field, value).execute)
+        return bool(response.data)
+
+    async def _select_page(self, table, filters, limit, after, fields, contains, sort='created_at') -> List[Dict]:
+        query = self.client.table(table).select(','.join(fields) if fields else '*')
+        query = self._filtered(query, filters, contains)
+        if after:
+            value, row_id = after
+            query = query.or_(
+                f'{sort}.lt."{value}",and({sort}.eq."{value}",id.lt."{row_id}")'
+            )
+        query = query.order(sort, desc=True).order('id', desc=True).limit(limit)
+        response = await run_blocking(query.execute)
+        return response.data
+
+    async def _count(self, table, filters, contains) -> int:
+        query = self._filtered(self.client.table(table).select('id', count='exact', head=True), filters, contains)
+        response = await run_blocking(query.execute)
+        return response.count or 0
@@ -0,0 +1,334 @@
+"""
+Outbound Telegram Bot API dispatcher.
+Every call goes through a global token bucket and a per-chat token bucket
+(Telegram allows ~30 messages/s per bot and ~1/s per chat), honours 429
+`retry_after`, and retries transient failures with exponential backoff.
+Broadcasts are queued and drained in the background at a reduced rate so
+they never delay replies to live conversations (sent before responding on
+serverless hosts, where background work is frozen).
+"""
+
+import asyncio
+import random
+import time
+import weakref
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+import httpx
+
+from ..config import settings
+from .http_client import get_http_client
+
+# Bot API limit for a message text
+MAX_MESSAGE_LENGTH = 4096
+STREAM_PLACEHOLDER = "⏳"
+
+
+def split_text(text: str, limit: int = MAX_MESSAGE_LENGTH) -> List[str]:
+    """Cut text into message-sized chunks, preferring line breaks"""
+    chunks = []
+    while len(text) > limit:
+        cut = text.rfind('\n', 0, limit)
+        if cut <= 0:
+            cut = limit
+        chunks.append(text[:cut])
+        text = text[cut:].lstrip('\n')
+    chunks.append(text)
+    return chunks
+
+
+class TokenBucket:
+    """
+    Reservation-based token bucket: each caller reserves the next token and
+    sleeps until it is due, so waiters are served in arrival order.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+
+    def reserve(self) -> float:
+        """Take one token; returns how long to wait before using it"""
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        self.tokens -= 1
+        wait = 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+        return max(wait, self.paused_until - now)
+
+    def pause(self, seconds: float):
+        """Hold every reservation for `seconds` (Telegram flood control)"""
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+    async def acquire(self):
+        wait = self.reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+
+class TelegramSender:
+    """Rate-limited Bot API client with retries and a broadcast queue"""
+
+    def __init__(self):
+        self.global_bucket = TokenBucket(settings.TELEGRAM_GLOBAL_RATE, settings.TELEGRAM_GLOBAL_RATE)
+        self.broadcast_bucket = TokenBucket(settings.TELEGRAM_BROADCAST_RATE, 1)
+        self.chat_buckets: Dict[str, TokenBucket] = {}
+        # Serializes sends per chat so retries never reorder messages
+        self._chat_locks: "weakref.WeakValueDictionary[str, asyncio.Lock]" = weakref.WeakValueDictionary()
+        self._broadcast_queue: Optional[asyncio.Queue] = None
+        self._broadcast_task: Optional[asyncio.Task] = None
+        self._broadcast_sends: Set[asyncio.Task] = set()
+        # Metrics
+        self.sent = 0
+        self.failed = 0
+        self.retries = 0
+        self.throttled = 0
+
+    @property
+    def base_url(self) -> str:
+        return f"{settings.TELEGRAM_API_URL}/bot{settings.TELEGRAM_TOKEN}"
+
+    def _chat_bucket(self, chat_id: str) -> TokenBucket:
+        bucket = self.chat_buckets.get(chat_id)
+        if bucket is None:
+            if len(self.chat_buckets) > 10000:
+                # Drop buckets that are full again (idle chats)
+                now = time.monotonic()
+                self.chat_buckets = {
+                    key: b for key, b in self.chat_buckets.items()
+                    if b.tokens + (now - b.updated) * b.rate < b.capacity or b.paused_until > now
+                }
+            bucket = self.chat_buckets[chat_id] = TokenBucket(settings.TELEGRAM_CHAT_RATE, settings.TELEGRAM_CHAT_BURST)
+        return bucket
+
+    def _chat_lock(self, chat_id: str) -> asyncio.Lock:
+        lock = self._chat_locks.get(chat_id)
+        if lock is None:
+            lock = self._chat_locks[chat_id] = asyncio.Lock()
+        return lock
+
+    @staticmethod
+    def _backoff(attempt: int) -> float:
+        delay = min(settings.TELEGRAM_BACKOFF_MAX, settings.TELEGRAM_BACKOFF_BASE * 2 ** attempt)
+        return delay * (0.5 + random.random() / 2)
+
+    # ==================== SENDING ====================
+
+    async def call(self, method: str, payload: Dict[str, Any], broadcast: bool = False) -> Optional[Dict]:
+        """
+        POST a Bot API method for payload['chat_id'].
+        Returns the API `result`, or None once retries are exhausted or the
+        request is rejected (bad request, bot blocked by the user...).
+        """
+        chat_id = str(payload['chat_id'])
+        async with self._chat_lock(chat_id):
+            for attempt in range(settings.TELEGRAM_MAX_RETRIES + 1):
+                if broadcast:
+                    await self.broadcast_bucket.acquire()
+                await self._chat_bucket(chat_id).acquire()
+                await self.global_bucket.acquire()
+
+                delay = self._backoff(attempt)
+                try:
+                    response = await get_http_client().post(f"{self.base_url}/{method}", json=payload)
+                except httpx.HTTPError as e:
+                    print(f"Telegram {method} Error: {e}")
+                else:
+                    if response.status_code == 200:
+                        self.sent += 1
+                        return response.json().get('result')
+                    try:
+                        body = response.json()
+                    except ValueError:
+                        body = {}
+                    description = body.get('description', response.text)
+                    if response.status_code == 429:
+                        self.throttled += 1
+                        delay = float((body.get('parameters') or {}).get('retry_after', delay))
+                        # Flood control applies to the bot, not just this chat
+                        self._chat_bucket(chat_id).pause(delay)
+                        self.global_bucket.pause(delay)
+                    elif response.status_code == 400 and payload.get('parse_mode') and "parse entities" in description:
+                        # Generated text is not always valid Markdown: resend it as plain text
+                        payload = {k: v for k, v in payload.items() if k != 'parse_mode'}
+                        delay = 0
+                    elif response.status_code == 400 and "message is not modified" in description:
+                        # Edit with unchanged text: nothing to do
+                        return None
+                    elif response.status_code < 500:
+                        self.failed += 1
+                        print(f"Telegram {method} Rejected ({response.status_code}): {description}")
+                        return None
+                    else:
+                        print(f"Telegram {method} Error ({response.status_code}): {description}")
+
+                if attempt < settings.TELEGRAM_MAX_RETRIES:
+                    self.retries += 1
+                    await asyncio.sleep(delay)
+
+        self.failed += 1
+        print(f"Telegram {method} Failed after {settings.TELEGRAM_MAX_RETRIES + 1} attempts")
+        return None
+
+    async def send_message(self, chat_id: str, text: str, parse_mode: Optional[str] = "Markdown", **extra) -> Optional[Dict]:
+        """Send a message; returns the sent Message object or None"""
+        payload = {"chat_id": chat_id, "text": text, **extra}
+        if parse_mode:
+            payload["parse_mode"] = parse_mode
+        return await self.call("sendMessage", payload)
+
+    async def edit_message_text(self, chat_id: str, message_id: int, text: str, parse_mode: Optional[str] = None) -> Optional[Dict]:
+        """Replace the text of a sent message"""
+        payload = {"chat_id": chat_id, "message_id": message_id, "text": text}
+        if parse_mode:
+            payload["parse_mode"] = parse_mode
+        return await self.call("editMessageText", payload)
+
+    def stream(self, chat_id: str) -> "MessageStream":
+        """A reply that is shown while it is still being written"""
+        return MessageStream(self, chat_id)
+
+    # ==================== BROADCAST ====================
+
+    @staticmethod
+    def _broadcast_payloads(chat_ids: Iterable[str], text: str, parse_mode: Optional[str]) -> List[Dict]:
+        payloads = []
+        for chat_id in dict.fromkeys(str(c) for c in chat_ids):
+            payload = {"chat_id": chat_id, "text": text}
+            if parse_mode:
+                payload["parse_mode"] = parse_mode
+            payloads.append(payload)
+        return payloads
+
+    def broadcast(self, chat_ids: Iterable[str], text: str, parse_mode: Optional[str] = "Markdown") -> Dict:
+        """
+        Queue a message to many chats and return at once.
+        Returns {'queued': n, 'dropped': n}; drops happen only when the queue is full.
+        """
+        if self._broadcast_queue is None:
+            self._broadcast_queue = asyncio.Queue(settings.TELEGRAM_BROADCAST_QUEUE)
+        if self._broadcast_task is None or self._broadcast_task.done():
+            self._broadcast_task = asyncio.get_running_loop().create_task(self._drain_broadcasts())
+        queued = dropped = 0
+        for payload in self._broadcast_payloads(chat_ids, text, parse_mode):
+            try:
+                self._broadcast_queue.put_nowait(payload)
+                queued += 1
+            except asyncio.QueueFull:
+                dropped += 1
+        return {'queued': queued, 'dropped': dropped}
+
+    async def send_broadcast(self, chat_ids: Iterable[str], text: str, parse_mode: Optional[str] = "Markdown") -> Dict:
+        """
+        Send a message to many chats at the broadcast rate and wait for every send,
+        for serverless hosts where the background queue would be frozen.
+        Returns {'sent': n, 'failed': n}.
+        """
+        slots = asyncio.Semaphore(settings.TELEGRAM_BROADCAST_CONCURRENCY)
+
+        async def send(payload):
+            async with slots:
+                return await self.call("sendMessage", payload, broadcast=True)
+
+        results = await asyncio.gather(*(send(p) for p in self._broadcast_payloads(chat_ids, text, parse_mode)))
+        sent = sum(result is not None for result in results)
+        return {'sent': sent, 'failed': len(results) - sent}
+
+    async def _drain_broadcasts(self):
+        # A few sends in flight; throughput is capped by broadcast_bucket
+        slots = asyncio.Semaphore(settings.TELEGRAM_BROADCAST_CONCURRENCY)
+
+        async def send(payload):
+            try:
+                await self.call("sendMessage", payload, broadcast=True)
+            finally:
+                slots.release()
+                self._broadcast_queue.task_done()
+
+        while True:
+            payload = await self._broadcast_queue.get()
+            await slots.acquire()
+            task = asyncio.get_running_loop().create_task(send(payload))
+            self._broadcast_sends.add(task)
+            task.add_done_callback(self._broadcast_sends.discard)
+
+    async def close(self):
+        """Stop the broadcast worker (queued broadcasts are discarded)"""
+        if self._broadcast_task and not self._broadcast_task.done():
+            left = self._broadcast_queue.qsize()
+            if left:
+                print(f"Telegram shutdown: {left} broadcast messages discarded")
+            self._broadcast_task.cancel()
+            for task in self._broadcast_sends:
+                task.cancel()
+            await asyncio.gather(self._broadcast_task, *self._broadcast_sends, return_exceptions=True)
+
+    def stats(self) -> Dict:
+        return {
+            'sent': self.sent,
+            'failed': self.failed,
+            'retries': self.retries,
+            'throttled': self.throttled,
+            'broadcast_queue': self._broadcast_queue.qsize() if self._broadcast_queue else 0
+        }
+
+class MessageStream:
+    """
+    A placeholder message is sent at once and edited with the text so far,
+    at most every TELEGRAM_EDIT_INTERVAL seconds; finish() writes the final
+    text (with Markdown) and sends any overflow past 4096 chars as new messages.
+    """
+
+    def __init__(self, sender: TelegramSender, chat_id: str):
+        self.sender = sender
+        self.chat_id = str(chat_id)
+        self.text = ""
+        self.shown = STREAM_PLACEHOLDER
+        self.edits = 0
+        self._changed = asyncio.Event()
+        self._placeholder: Optional[asyncio.Task] = None
+        self._editor: Optional[asyncio.Task] = None
+
+    def start(self):
+        """Send the placeholder in the background; returns immediately"""
+        loop = asyncio.get_running_loop()
+        self._placeholder = loop.create_task(self.sender.send_message(self.chat_id, STREAM_PLACEHOLDER, parse_mode=None))
+        self._editor = loop.create_task(self._edit_loop())
+
+    def update(self, text: str):
+        self.text = text
+        self._changed.set()
+
+    async def _edit_loop(self):
+        message = await asyncio.shield(self._placeholder)
+        if not message:
+            return
+        while True:
+            await self._changed.wait()
+            self._changed.clear()
+            # Plain text: a half-written reply is rarely valid Markdown
+            text = self.text[:MAX_MESSAGE_LENGTH]
+            if text.strip() and text != self.shown:
+                await self.sender.edit_message_text(self.chat_id, message['message_id'], text)
+                self.shown = text
+                self.edits += 1
+            await asyncio.sleep(settings.TELEGRAM_EDIT_INTERVAL)
+
+    async def finish(self, text: str, parse_mode: Optional[str] = "Markdown"):
+        """Stop intermediate edits and deliver the complete text"""
+        if self._editor is None:
+            self.start()
+        self._editor.cancel()
+        await asyncio.gather(self._editor, return_exceptions=True)
+        message = await self._placeholder
+        chunks = split_text(text or STREAM_PLACEHOLDER)
+        if message:
+            await self.sender.edit_message_text(self.chat_id, message['message_id'], chunks.pop(0), parse_mode)
+        for chunk in chunks:
+            await self.sender.send_message(self.chat_id, chunk, parse_mode)
+
+# Singleton instance
+telegram_sender = TelegramSender()
@@ -0,0 +1,193 @@
+"""
+Unit search engine.
+Keeps an indexed copy of the units collection and answers filtered,
+ranked searches for the bot's `search_units` intent and /api/units/search.
+"""
+
+import asyncio
+import heapq
+import re
+import time
+from typing import Dict, List, Optional, Set
+
+from ..config import settings
+from .collection_store import IndexedCollection
+from .database import db
+
+# Exact-match filters answered from hash indexes
+EXACT_FIELDS = ('project_id', 'status', 'bedrooms', 'bathrooms', 'floor_number', 'unit_type')
+
+# How far a candidate may drift from the request before it stops being "close"
+FLOOR_WEIGHT = 0.25
+ROOM_WEIGHT = 1.0
+PRICE_WEIGHT = 4.0
+
+
+def slugify(name: str) -> str:
+    return re.sub(r'[^a-z0-9]+', '-', (name or '').lower()).strip('-')
+
+
+class UnitSearchEngine:
+    """
+    In-memory unit index with range indexes on total_price and area_sqm.
+    Reloaded from the storage backend every UNIT_SEARCH_TTL seconds and
+    updated incrementally by the unit endpoints in between.
+    """
+
+    def __init__(self):
+        self.units = self._empty()
+        self.project_aliases: Dict[str, str] = {}
+        self.projects: Dict[str, Dict] = {}
+        self._loaded_at = 0.0
+        self._lock = asyncio.Lock()
+        self._refresh_task: Optional[asyncio.Task] = None
+
+    @staticmethod
+    def _empty() -> IndexedCollection:
+        return IndexedCollection(
+            'units',
+            hash_fields=EXACT_FIELDS,
+            sorted_fields=('total_price', 'area_sqm')
+        )
+
+    # ==================== LOADING ====================
+
+    async def refresh(self, force: bool = False):
+        if not force and time.monotonic() - self._loaded_at < settings.UNIT_SEARCH_TTL:
+            return
+        async with self._lock:
+            if not force and time.monotonic() - self._loaded_at < settings.UNIT_SEARCH_TTL:
+                return
+            units, projects = await asyncio.gather(db.get_units(), db.get_projects())
+            collection = self._empty()
+            for unit in units:
+                collection.upsert(unit)
+            self.units = collection
+            self.project_aliases = {}
+            self.projects = {project['id']: project for project in projects}
+            for project in projects:
+                # NLP resolves project names to slugs ("hamad-tower"), the API uses ids
+                self.project_aliases[project['id']] = project['id']
+                self.project_aliases[slugify(project.get('name'))] = project['id']
+            self._loaded_at = time.monotonic()
+
+    async def _ensure_loaded(self):
+        """First load blocks; later reloads run in the background while the stale index keeps serving"""
+        if not self._loaded_at:
+            await self.refresh()
+        elif time.monotonic() - self._loaded_at >= settings.UNIT_SEARCH_TTL and not self._lock.locked():
+            self._refresh_task = asyncio.get_running_loop().create_task(self.refresh())
+
+    def upsert(self, unit: Optional[Dict]):
+        if unit and unit.get('id'):
+            self.units.upsert(unit)
+
+    def remove(self, unit_id: str):
+        self.units.remove(unit_id)
+
+    # ==================== SEARCH ====================
+
+    def _range(self, field: str, low: Optional[float], high: Optional[float]) -> Optional[Set[str]]:
+        if low is None and high is None:
+            return None
+        return set(self.units.range_pks(field, low, high))
+
+    def _candidates(self, filters: Dict, exact: Dict) -> Set[str]:
+        """Intersect hash-index lookups with price and area range scans"""
+        sets = [set(self.units.find_pks(exact))]
+        for field, low, high in (
+            ('total_price', filters.get('price_min'), filters.get('price_max')),
+            ('area_sqm', filters.get('area_min'), filters.get('area_max')),
+        ):
+            matched = self._range(field, low, high)
+            if matched is not None:
+                sets.append(matched)
+        sets.sort(key=len)
+        result = sets[0]
+        for other in sets[1:]:
+            result = result & other
+        return result
+
+    @staticmethod
+    def _distance(unit: Dict, filters: Dict) -> float:
+        """How far a unit is from the request (0 = exact match)"""
+        score = 0.0
+        for field, weight in (('bedrooms', ROOM_WEIGHT), ('bathrooms', ROOM_WEIGHT), ('floor_number', FLOOR_WEIGHT)):
+            wanted = filters.get(field)
+            if wanted is not None:
+                score += weight * abs((unit.get(field) or 0) - wanted)
+        price = unit.get('total_price') or 0
+        low, high = filters.get('price_min'), filters.get('price_max')
+        if high is not None and price > high:
+            score += PRICE_WEIGHT * (price - high) / max(high, 1)
+        if low is not None and price < low:
+            score += PRICE_WEIGHT * (low - price) / max(low, 1)
+        return score
+
+    def _rank(self, pks, filters: Dict, limit: int, deadline: float) -> List[Dict]:
+        """Top `limit` units by closeness, cheapest first on ties; stops at the deadline"""
+        scored = []
+        for i, pk in enumerate(pks):
+            if i % 1024 == 0 and i and time.perf_counter() > deadline:
+                break
+            unit = self.units.rows[pk]
+            scored.append((self._distance(unit, filters), unit.get('total_price') or 0, pk))
+        return [self.units.get(pk) for _, _, pk in heapq.nsmallest(limit, scored)]
+
+    async def search(self, filters: Dict, project: Optional[str] = None, limit: int = 5) -> Dict:
+        """
+        Search units.
+        filters: bedrooms, bathrooms, floor_number, unit_type, status,
+                 price_min, price_max, area_min, area_max
+        Returns {'total': exact matches, 'exact': bool, 'units': top matches}.
+        When nothing matches exactly, the closest units of the same project
+        and status are returned instead (exact=False).
+        """
+        deadline = time.perf_counter() + settings.UNIT_SEARCH_BUDGET_MS / 1000
+        await self._ensure_loaded()
+
+        filters = {k: v for k, v in filters.items() if v is not None}
+        scope = {'status': filters.get('status', 'available')}
+        if project:
+            project_id = self.project_aliases.get(project) or self.project_aliases.get(slugify(project), project)
+            scope['project_id'] = project_id
+        exact = {**scope, **{f: filters[f] for f in EXACT_FIELDS if f in filters}}
+
+        matches = self._candidates(filters, exact)
+        if matches:
+            return {
+                'total': len(matches),
+                'exact': True,
+                'units': self._rank(matches, filters, limit, deadline)
+            }
+        nearby = self.units.find_pks(scope)
+        return {
+            'total': 0,
+            'exact': False,
+            'units': self._rank(nearby, filters, limit, deadline)
+        }
+
+    async def overview(self, project: Optional[str] = None) -> Dict:
+        """
+        Available stock at a glance, for replies that don't need the AI.
+        Returns {'available', 'price_min', 'price_max', 'bedrooms', 'projects'}.
+        """
+        await self._ensure_loaded()
+        scope = {'status': 'available'}
+        projects = list(self.projects.values())
+        if project:
+            project_id = self.project_aliases.get(project) or self.project_aliases.get(slugify(project), project)
+            scope['project_id'] = project_id
+            projects = [p for p in projects if p['id'] == project_id] or projects
+        units = [self.units.rows[pk] for pk in self.units.find_pks(scope)]
+        prices = [unit['total_price'] for unit in units if unit.get('total_price')]
+        return {
+            'available': len(units),
+            'price_min': min(prices, default=None),
+            'price_max': max(prices, default=None),
+            'bedrooms': sorted({unit['bedrooms'] for unit in units if unit.get('bedrooms')}),
+            'projects': projects
+        }
+
+# Singleton instance
+unit_search = UnitSearchEngine()
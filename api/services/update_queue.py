@@ -0,0 +1,169 @@
+"""
+Background processing of Telegram webhook updates.
+The webhook validates and enqueues an update, then answers Telegram right
+away; a bounded pool of workers runs the bot logic (DB, NLP, Groq, replies).
+"""
+
+import asyncio
+import time
+import zlib
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from ..config import settings
+from .metrics import LatencyWindow
+
+Handler = Callable[[Dict[str, Any]], Awaitable[None]]
+
+# Update kinds that carry the chat they belong to
+CHAT_KEYS = ('message', 'edited_message', 'channel_post', 'edited_channel_post')
+
+
+class QueueFull(Exception):
+    """Every worker queue is at capacity; Telegram should redeliver later"""
+
+
+def chat_key(update: Dict[str, Any]) -> str:
+    """Ordering key: updates of the same chat are processed one after another"""
+    for kind in CHAT_KEYS:
+        if isinstance(update.get(kind), dict):
+            chat = update[kind].get('chat') or {}
+            if 'id' in chat:
+                return str(chat['id'])
+    callback = update.get('callback_query')
+    if isinstance(callback, dict) and 'from' in callback:
+        return str(callback['from'].get('id'))
+    return str(update.get('update_id'))
+
+
+class UpdateDispatcher:
+    """
+    Fixed pool of workers, each draining its own bounded queue.
+    An update is routed to a worker by hashing its chat id, which keeps
+    per-chat ordering while different chats are processed in parallel.
+    Recently accepted update_ids are remembered so redeliveries are dropped.
+    """
+
+    def __init__(self, handler: Handler, workers: Optional[int] = None, queue_size: Optional[int] = None):
+        self.handler = handler
+        if workers is None:
+            # Background tasks would be frozen with the function on serverless hosts
+            workers = 0 if settings.SERVERLESS else settings.WEBHOOK_WORKERS
+        self.worker_count = workers
+        self.queue_size = queue_size or settings.WEBHOOK_QUEUE_SIZE
+        self.queues: List[asyncio.Queue] = []
+        self.tasks: List[asyncio.Task] = []
+        self.seen: "OrderedDict[int, None]" = OrderedDict()
+        # Metrics
+        self.processing = LatencyWindow()
+        self.waiting = LatencyWindow()
+        self.accepted = 0
+        self.duplicates = 0
+        self.rejected = 0
+        self.failed = 0
+
+    @property
+    def inline(self) -> bool:
+        """No workers: process during the request (serverless platforms freeze background tasks)"""
+        return self.worker_count <= 0
+
+    def _ensure_started(self):
+        if self.tasks:
+            return
+        loop = asyncio.get_running_loop()
+        self.queues = [asyncio.Queue(self.queue_size) for _ in range(self.worker_count)]
+        self.tasks = [loop.create_task(self._worker(queue)) for queue in self.queues]
+
+    def _remember(self, update_id: int):
+        self.seen[update_id] = None
+        while len(self.seen) > settings.WEBHOOK_DEDUPE_WINDOW:
+            self.seen.popitem(last=False)
+
+    async def submit(self, update: Dict[str, Any]) -> bool:
+        """
+        Accept an update for processing.
+        Returns False for a duplicate update_id, raises QueueFull under backpressure.
+        """
+        update_id = update['update_id']
+        if update_id in self.seen:
+            self.duplicates += 1
+            return False
+        if self.inline:
+            self._remember(update_id)
+            self.accepted += 1
+            await self._process(update, time.perf_counter())
+            return True
+
+        self._ensure_started()
+        queue = self.queues[zlib.crc32(chat_key(update).encode()) % len(self.queues)]
+        try:
+            queue.put_nowait((update, time.perf_counter()))
+        except asyncio.QueueFull:
+            self.rejected += 1
+            raise QueueFull()
+        self._remember(update_id)
+        self.accepted += 1
+        return True
+
+    async def _worker(self, queue: asyncio.Queue):
+        while True:
+            update, enqueued_at = await queue.get()
+            try:
+                await self._process(update, enqueued_at)
+            finally:
+                queue.task_done()
+
+    async def _process(self, update: Dict[str, Any], enqueued_at: float):
+        started = time.perf_counter()
+        self.waiting.add(started - enqueued_at)
+        try:
+            await self.handler(update)
+        except Exception as e:
+            self.failed += 1
+            print(f"Update {update.get('update_id')} Error: {e}")
+        finally:
+            self.processing.add(time.perf_counter() - started)
+
+    async def close(self, timeout: Optional[float] = None):
+        """Finish queued updates (up to `timeout` seconds), then stop the workers"""
+        if not self.tasks:
+            return
+        try:
+            await asyncio.wait_for(
+                asyncio.gather(*(queue.join() for queue in self.queues)),
+                timeout if timeout is not None else settings.WEBHOOK_DRAIN_TIMEOUT
+            )
+        except asyncio.TimeoutError:
+            print(f"Webhook shutdown: {self.depth} updates left unprocessed")
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.tasks = []
+        self.queues = []
+
+    @property
+    def depth(self) -> int:
+        return sum(queue.qsize() for queue in self.queues)
+
+    def stats(self) -> Dict:
+        return {
+            'workers': self.worker_count,
+            'queue_depth': self.depth,
+            'queue_capacity': self.queue_size * max(self.worker_count, 0),
+            'busiest_queue': max((queue.qsize() for queue in self.queues), default=0),
+            'accepted': self.accepted,
+            'duplicates': self.duplicates,
+            'rejected': self.rejected,
+            'failed': self.failed,
+            'queue_wait': self.waiting.snapshot(),
+            'processing': self.processing.snapshot()
+        }
+
+
+async def _process_update(update: Dict[str, Any]):
+    # The bot module loads the NLP processor; import it only once updates arrive
+    from ..bot import process_update
+    await process_update(update)
+
+# Singleton instance
+update_dispatcher = UpdateDispatcher(_process_update)
@@ -0,0 +1,179 @@
+"""
+Uploads streamed from the request body to disk.
+
+The multipart body is parsed as it arrives and the file part is written
+to a temporary file, hashed on the way, so an upload is never held in
+memory whole nor copied to disk twice (as a Starlette UploadFile would
+be); image workers then read it from the path. A body declaring more than
+MEDIA_MAX_UPLOAD_SIZE is refused before it is read, and one that turns
+out larger is cut off with UploadTooLarge as soon as it crosses the limit.
+"""
+
+import os
+import tempfile
+from typing import Dict, List, Optional
+
+try:
+    from python_multipart.multipart import MultipartParser, parse_options_header
+except ImportError:  # python-multipart < 0.0.13
+    from multipart.multipart import MultipartParser, parse_options_header
+
+from ..config import settings
+from .http_client import run_blocking
+from .image_optimizer import content_hasher
+
+# Bytes buffered before a write to the temporary file
+CHUNK_SIZE = 1024 * 1024
+# Body bytes allowed beyond the file itself: boundaries, part headers, small fields
+MULTIPART_OVERHEAD = 64 * 1024
+
+
+class UploadTooLarge(Exception):
+    """The upload is larger than MEDIA_MAX_UPLOAD_SIZE"""
+
+
+class BadUpload(Exception):
+    """The body is not multipart/form-data with the expected file field"""
+
+
+class SpooledUpload:
+    """A spooled upload; the temporary file is deleted on leaving `async with`"""
+
+    __slots__ = ('path', 'size', 'content_hash', 'filename', 'content_type')
+
+    def __init__(self, path: str, size: int, content_hash: str,
+                 filename: Optional[str] = None, content_type: Optional[str] = None):
+        self.path = path
+        self.size = size
+        self.content_hash = content_hash
+        self.filename = filename
+        self.content_type = content_type
+
+    async def __aenter__(self) -> 'SpooledUpload':
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.discard()
+
+    def discard(self):
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+
+
+def _write(out, hasher, chunk: bytes):
+    # hashlib releases the GIL on large buffers, so both run off the event loop
+    hasher.update(chunk)
+    out.write(chunk)
+
+
+class _FilePart:
+    """Parser callbacks that collect the data of one file field"""
+
+    def __init__(self, field: str):
+        self.field = field
+        self.chunks: List[bytes] = []
+        self.buffered = 0
+        self.size = 0
+        self.found = False
+        self.filename: Optional[str] = None
+        self.content_type: Optional[str] = None
+        self._headers: Dict[bytes, bytes] = {}
+        self._name = b''
+        self._value = b''
+        self._active = False
+
+    def callbacks(self) -> Dict:
+        return {
+            'on_part_begin': self._part_begin,
+            'on_header_field': self._header_field,
+            'on_header_value': self._header_value,
+            'on_header_end': self._header_end,
+            'on_headers_finished': self._headers_finished,
+            'on_part_data': self._part_data,
+            'on_part_end': self._part_end,
+        }
+
+    def _part_begin(self):
+        self._headers = {}
+
+    def _header_field(self, data: bytes, start: int, end: int):
+        self._name += data[start:end]
+
+    def _header_value(self, data: bytes, start: int, end: int):
+        self._value += data[start:end]
+
+    def _header_end(self):
+        self._headers[self._name.lower()] = self._value
+        self._name = self._value = b''
+
+    def _headers_finished(self):
+        _, options = parse_options_header(self._headers.get(b'content-disposition'))
+        # Only the first part of the field is kept
+        self._active = options.get(b'name') == self.field.encode() and b'filename' in options and not self.found
+        if self._active:
+            self.found = True
+            self.filename = options[b'filename'].decode('utf-8', 'replace')
+            self.content_type = self._headers.get(b'content-type', b'').decode('latin-1') or None
+
+    def _part_data(self, data: bytes, start: int, end: int):
+        if self._active:
+            self.chunks.append(data[start:end])
+            self.buffered += end - start
+            self.size += end - start
+
+    def _part_end(self):
+        self._active = False
+
+    def take(self) -> bytes:
+        chunk, self.chunks, self.buffered = b''.join(self.chunks), [], 0
+        return chunk
+
+
+def _parse(method, *args):
+    try:
+        method(*args)
+    except ValueError as e:  # python-multipart's parse errors
+        raise BadUpload(f"Malformed multipart body: {e}")
+
+
+async def spool_request(request, field: str = 'file', max_size: Optional[int] = None) -> SpooledUpload:
+    """
+    Stream the `field` file of a multipart/form-data request to a temporary file.
+    Raises UploadTooLarge without reading further once `max_size` is crossed,
+    and BadUpload for a body that is not multipart or has no such file.
+    """
+    max_size = settings.MEDIA_MAX_UPLOAD_SIZE if max_size is None else max_size
+    content_type, options = parse_options_header(request.headers.get('content-type'))
+    if content_type != b'multipart/form-data' or not options.get(b'boundary'):
+        raise BadUpload("Expected a multipart/form-data upload")
+    declared = request.headers.get('content-length')
+    if declared and declared.isdigit() and int(declared) > max_size + MULTIPART_OVERHEAD:
+        raise UploadTooLarge()
+
+    part = _FilePart(field)
+    parser = MultipartParser(options[b'boundary'], part.callbacks())
+    hasher = content_hasher()
+    fd, path = tempfile.mkstemp(prefix='upload-', dir=settings.MEDIA_SPOOL_DIR or None)
+    received = 0
+    try:
+        with os.fdopen(fd, 'wb') as out:
+            async for body in request.stream():
+                received += len(body)
+                if received > max_size + MULTIPART_OVERHEAD:
+                    raise UploadTooLarge()
+                _parse(parser.write, body)
+                if part.size > max_size:
+                    raise UploadTooLarge()
+                if part.buffered >= CHUNK_SIZE:
+                    await run_blocking(_write, out, hasher, part.take())
+            _parse(parser.finalize)
+            if part.buffered:
+                await run_blocking(_write, out, hasher, part.take())
+        if not part.found:
+            raise BadUpload(f"Missing file field '{field}'")
+    except BaseException:
+        os.unlink(path)
+        raise
+    return SpooledUpload(path, part.size, hasher.hexdigest(), part.filename, part.content_type)
@@ -0,0 +1,138 @@
+"""
+Image rendition benchmark: CPU time and peak RSS per upload.
+
+Renders a synthetic camera-sized JPEG three ways:
+  - legacy: the previous render (one 1920x1080 WebP plus a thumbnail)
+  - naive:  the current set of srcset widths, each resized from a full-size decode
+  - current: ImageOptimizer.render (draft decode, cascading resizes)
+Each measurement runs in a fresh process so peak RSS is not shared between
+them; the numbers are net of a child that only imports the modules.
+
+Run from the repository root:
+    python -m benchmarks.bench_images [--avif]
+"""
+
+import io
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+from PIL import Image
+
+ROUNDS = 3
+SOURCE_SIZE = (5472, 3648)  # 20 MP, a typical phone or DSLR photo
+
+
+def make_source(path: str):
+    """Noisy gradient: compresses like a photo, unlike a flat colour"""
+    noise = Image.effect_noise(SOURCE_SIZE, 40).convert('RGB')
+    gradient = Image.linear_gradient('L').resize(SOURCE_SIZE).convert('RGB')
+    Image.blend(noise, gradient, 0.5).save(path, format='JPEG', quality=90)
+
+
+def legacy_render(image_bytes: bytes) -> dict:
+    """The render before srcset renditions, for comparison"""
+    img = Image.open(io.BytesIO(image_bytes))
+    if img.mode in ('RGBA', 'LA', 'P'):
+        background = Image.new('RGB', img.size, (255, 255, 255))
+        background.paste(img, mask=img.split()[-1] if img.mode == 'RGBA' else None)
+        img = background
+    img.thumbnail((1920, 1080), Image.Resampling.LANCZOS)
+    optimized = io.BytesIO()
+    img.save(optimized, format='WEBP', quality=85, optimize=True)
+    thumb_img = img.copy()
+    thumb_img.thumbnail((400, 300), Image.Resampling.LANCZOS)
+    thumb = io.BytesIO()
+    thumb_img.save(thumb, format='WEBP', quality=80)
+    return {'renditions': [optimized.getvalue(), thumb.getvalue()]}
+
+
+def naive_render(image_bytes: bytes) -> dict:
+    """Same renditions as the current render, without draft decode or the resize chain"""
+    from api.services.image_optimizer import ImageOptimizer, fit, parse_widths
+    from api.config import settings
+    img = Image.open(io.BytesIO(image_bytes)).convert('RGB')
+    largest = fit(img.size, (ImageOptimizer.MAX_WIDTH, ImageOptimizer.MAX_HEIGHT))
+    renditions = []
+    for width in [largest[0]] + [w for w in parse_widths(settings.IMAGE_WIDTHS) if w < largest[0]]:
+        size = (width, round(largest[1] * width / largest[0]))
+        renditions.append(ImageOptimizer._encode(img.resize(size, Image.Resampling.LANCZOS), f"w{width}", 'webp', 'WEBP', 85))
+    thumb = img.resize(fit(img.size, ImageOptimizer.THUMBNAIL_SIZE), Image.Resampling.LANCZOS)
+    renditions.append(ImageOptimizer._encode(thumb, 'thumb', 'webp', 'WEBP', 80))
+    return {'renditions': renditions}
+
+
+def current_render(image_bytes: bytes) -> dict:
+    from api.services.image_optimizer import ImageOptimizer
+    return ImageOptimizer.render(image_bytes)
+
+
+RENDERERS = {'legacy': legacy_render, 'naive': naive_render, 'current': current_render}
+
+
+def peak_rss_kb() -> int:
+    """Peak RSS of this process. ru_maxrss also counts the parent's peak from
+    before exec, so prefer VmHWM, which starts over with the new program"""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def child(name: str, path: str):
+    """Runs in the subprocess: one render, report CPU seconds and peak RSS"""
+    import api.services.image_optimizer  # noqa: F401  (imports are part of the baseline)
+    with open(path, 'rb') as f:
+        image_bytes = f.read()
+    start = time.process_time()
+    result = RENDERERS[name](image_bytes) if name != 'baseline' else {'renditions': []}
+    cpu = time.process_time() - start
+    renditions = result['renditions']
+    print(json.dumps({
+        'cpu': cpu,
+        'rss_kb': peak_rss_kb(),
+        'count': len(renditions),
+        'bytes': sum(len(r['data']) if isinstance(r, dict) else len(r) for r in renditions),
+        'formats': sorted({r['format'] for r in renditions if isinstance(r, dict)})
+    }))
+
+
+def measure(name: str, path: str, env: dict) -> dict:
+    out = subprocess.run([sys.executable, '-m', 'benchmarks.bench_images', '--one', name, path],
+                         capture_output=True, text=True, env=env, check=True).stdout
+    return json.loads(out.splitlines()[-1])
+
+
+def main():
+    if '--one' in sys.argv:
+        i = sys.argv.index('--one')
+        child(sys.argv[i + 1], sys.argv[i + 2])
+        return
+
+    env = dict(os.environ, IMAGE_AVIF='true' if '--avif' in sys.argv else 'false')
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'source.jpg')
+        make_source(path)
+        print(f"source: {SOURCE_SIZE[0]}x{SOURCE_SIZE[1]} JPEG, {os.path.getsize(path) / 1e6:.1f} MB; "
+              f"IMAGE_WIDTHS={env.get('IMAGE_WIDTHS', '320,640,960,1280,1920')} IMAGE_AVIF={env['IMAGE_AVIF']}\n")
+
+        baseline_kb = min(measure('baseline', path, env)['rss_kb'] for _ in range(ROUNDS))
+        print(f"{'':<10}{'renditions':>11}{'output KB':>11}{'CPU s':>8}{'peak RSS MB':>13}")
+        for name in RENDERERS:
+            runs = [measure(name, path, env) for _ in range(ROUNDS)]
+            best = min(runs, key=lambda r: r['cpu'])
+            rss_mb = (min(r['rss_kb'] for r in runs) - baseline_kb) / 1024
+            formats = f"  ({', '.join(best['formats'])})" if best['formats'] else ''
+            print(f"{name:<10}{best['count']:>11}{best['bytes'] / 1024:>11.0f}{best['cpu']:>8.2f}{rss_mb:>13.0f}{formats}")
+
+
+if __name__ == '__main__':
+    main()
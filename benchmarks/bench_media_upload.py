@@ -0,0 +1,79 @@
+"""
+Media upload benchmark: sequential vs concurrent rendition uploads.
+
+Renders a photo with ImageOptimizer.render, then stores the original and
+every rendition in a local media store whose uploads take a simulated
+network round trip (RTT seconds each), the way Cloudinary uploads do:
+  - sequential: one file after another, as uploads used to run
+  - concurrent: MediaStorage.put_many
+End-to-end time includes the render. Runs offline.
+
+Run from the repository root:
+    python -m benchmarks.bench_media_upload
+"""
+
+import asyncio
+import io
+import tempfile
+import time
+
+from PIL import Image
+
+from api.services.image_optimizer import ImageOptimizer, file_extension
+from api.services.media_storage import LocalStorage
+
+ROUNDS = 3
+RTT = 0.25  # seconds per upload
+SOURCE_SIZE = (3000, 2000)
+
+
+class SlowStorage(LocalStorage):
+    """Local store with a fixed upload latency"""
+
+    def _put(self, data: bytes, public_id: str, file_format: str):
+        time.sleep(RTT)
+        return super()._put(data, public_id, file_format)
+
+
+def make_source() -> bytes:
+    noise = Image.effect_noise(SOURCE_SIZE, 40).convert('RGB')
+    buffer = io.BytesIO()
+    noise.save(buffer, format='JPEG', quality=90)
+    return buffer.getvalue()
+
+
+async def sequential(storage, files):
+    return [await storage._put_retrying(*file) for file in files]
+
+
+async def concurrent(storage, files):
+    return await storage.put_many(files)
+
+
+async def main():
+    image_bytes = make_source()
+    with tempfile.TemporaryDirectory() as root:
+        storage = SlowStorage(root, "/media")
+        best = {}
+        for _ in range(ROUNDS):
+            for name, upload in (('sequential', sequential), ('concurrent', concurrent)):
+                start = time.perf_counter()
+                rendered = ImageOptimizer.render(image_bytes)
+                rendered_at = time.perf_counter()
+                files = [(image_bytes, "bench/original", file_extension(rendered['original_format']))]
+                files += [(r['data'], f"bench/{r['name']}_{r['format']}", r['format']) for r in rendered['renditions']]
+                await upload(storage, files)
+                done = time.perf_counter()
+                previous = best.get(name, (float('inf'), 0, 0))
+                if done - start < previous[0]:
+                    best[name] = (done - start, done - rendered_at, len(files))
+
+    print(f"{SOURCE_SIZE[0]}x{SOURCE_SIZE[1]} JPEG, {RTT * 1000:.0f} ms per upload\n")
+    print(f"{'':<12}{'files':>6}{'upload s':>10}{'end-to-end s':>14}")
+    for name, (total, upload, count) in best.items():
+        print(f"{name:<12}{count:>6}{upload:>10.2f}{total:>14.2f}")
+    print(f"\nspeedup: {best['sequential'][0] / best['concurrent'][0]:.1f}x end to end")
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,120 @@
+"""
+Serialization / compression benchmark.
+
+Compares FastAPI's default encoding (stdlib json, uncompressed) with the
+API's response path (orjson + gzip/brotli) on realistic payloads:
+a GrapesJS landing page and a /api/chats listing with long histories.
+
+Run from the repository root:
+    python -m benchmarks.bench_serialization
+"""
+
+import gzip
+import json
+import random
+import time
+from datetime import datetime, timedelta
+
+from api.services import serialization
+from api.services.serialization import compress, dumps
+
+ROUNDS = 50
+
+ARABIC_LINES = [
+    "السلام عليكم، عايز شقة 3 غرف في برج حمد",
+    "الدور الخامس متاح؟ وايه السعر النهائي بعد الخصم؟",
+    "ممكن تفاصيل التقسيط على 7 سنين",
+    "أهلاً بحضرتك، الوحدة متاحة والمساحة 145 متر",
+    "تمام، ابعتلي اللوكيشن ومواعيد المعاينة",
+]
+
+
+def page_fixture() -> dict:
+    """A published landing page as GrapesJS stores it (html + css + components)"""
+    sections, css = [], []
+    for i in range(40):
+        sections.append(
+            f'<section id="s{i}" class="section hero-{i % 4}"><div class="container">'
+            f'<h2 class="title">{ARABIC_LINES[i % 5]}</h2>'
+            f'<p class="lead">{" ".join(ARABIC_LINES)}</p>'
+            f'<a class="btn btn-primary" href="#contact">احجز الآن</a></div></section>'
+        )
+        css.append(
+            f'#s{i} {{ padding: 64px 0; background: linear-gradient(180deg, #0d1b2a 0%, #1b263b 100%); }}\n'
+            f'#s{i} .title {{ font-family: Cairo, sans-serif; font-size: 32px; color: #e0e1dd; }}\n'
+        )
+    html = ''.join(sections)
+    return {
+        'id': 'b4d7c3e2-1f0a-4c55-9e61-2b8f7a9c0d11',
+        'slug': 'hamad-tower',
+        'title': 'برج حمد - كيان برو',
+        'meta_description': ARABIC_LINES[0],
+        'is_published': True,
+        'content': {
+            'html': html,
+            'css': ''.join(css),
+            'components': [{'type': 'section', 'attributes': {'id': f's{i}'}, 'content': html[:400]} for i in range(40)],
+            'styles': [{'selectors': [f'#s{i}'], 'style': {'padding': '64px 0'}} for i in range(40)],
+        },
+        'created_at': '2025-01-10T09:00:00+00:00',
+        'updated_at': '2025-03-02T18:45:12+00:00',
+    }
+
+
+def chats_fixture(chats: int = 100, messages: int = 60) -> dict:
+    """A /api/chats listing: every chat with its full message history"""
+    rng = random.Random(9)
+    start = datetime(2025, 3, 1, 9, 0)
+    items = []
+    for c in range(chats):
+        items.append({
+            'id': f'chat-{c:05d}',
+            'source': 'telegram' if c % 2 else 'website',
+            'user_id': str(100000000 + c),
+            'user_name': f'عميل {c}',
+            'messages': [
+                {
+                    'text': rng.choice(ARABIC_LINES),
+                    'is_from_admin': bool(m % 2),
+                    'timestamp': (start + timedelta(minutes=c * 7 + m)).isoformat(),
+                }
+                for m in range(messages)
+            ],
+            'is_read': bool(c % 3),
+            'created_at': start.isoformat(),
+            'updated_at': (start + timedelta(hours=c)).isoformat(),
+        })
+    return {'telegram': items[1::2], 'website': items[::2]}
+
+
+def fastapi_default(obj) -> bytes:
+    """What starlette's JSONResponse renders"""
+    return json.dumps(obj, ensure_ascii=False, allow_nan=False, indent=None, separators=(',', ':')).encode()
+
+
+def timed(func, *args) -> float:
+    """Mean wall time in ms over ROUNDS"""
+    started = time.perf_counter()
+    for _ in range(ROUNDS):
+        func(*args)
+    return (time.perf_counter() - started) / ROUNDS * 1000
+
+
+def report(name: str, payload):
+    baseline = fastapi_default(payload)
+    fast = dumps(payload)
+    print(f"\n{name}")
+    print(f"  {'variant':<28}{'bytes':>12}{'ms':>10}")
+    print(f"  {'json (FastAPI default)':<28}{len(baseline):>12,}{timed(fastapi_default, payload):>10.2f}")
+    label = 'orjson' if serialization.orjson else 'json compact (no orjson)'
+    print(f"  {label:<28}{len(fast):>12,}{timed(dumps, payload):>10.2f}")
+    gz = gzip.compress(fast, compresslevel=6, mtime=0)
+    print(f"  {'  + gzip -6':<28}{len(gz):>12,}{timed(compress, fast, 'gzip'):>10.2f}")
+    if serialization.brotli:
+        br = compress(fast, 'br')
+        print(f"  {'  + brotli q5':<28}{len(br):>12,}{timed(compress, fast, 'br'):>10.2f}")
+
+
+if __name__ == '__main__':
+    report('Page (/api/pages/{slug})', page_fixture())
+    report('Chats (/api/chats, 100 x 60 messages)', chats_fixture())
@@ -0,0 +1,133 @@
+"""
+Streamed vs. buffered AI replies, end to end against local fakes.
+
+Starts one local server that plays both Groq (an OpenAI-style SSE stream,
+TOKEN_DELAY between tokens) and the Telegram Bot API (records every
+sendMessage / editMessageText), points GROQ_API_URL and TELEGRAM_API_URL at
+it, then runs the bot's reply path for a few customers with streaming on
+and off. Reports time until the customer first sees reply text and until
+the full reply is shown.
+
+Run from the repository root:
+    python -m benchmarks.bench_streaming
+"""
+
+import asyncio
+import json
+import os
+import shutil
+import socket
+import tempfile
+import time
+
+CUSTOMERS = 5
+TOKENS = 60
+TOKEN_DELAY = 0.04  # seconds between tokens (~25 tok/s)
+REPLY = "أهلاً بحضرتك يا فندم، الوحدات المتاحة في برج حمد تبدأ من مليون ونص، تحب أبعتلك التفاصيل؟ "
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+PORT = free_port()
+DB_FILE = os.path.join(tempfile.mkdtemp(), "bench_streaming.db")
+os.environ.update({
+    "DB_BACKEND": "sqlite",
+    "SQLITE_PATH": DB_FILE,
+    "GROQ_API_KEY": "bench",
+    "GROQ_API_URL": f"http://127.0.0.1:{PORT}/groq",
+    "TELEGRAM_API_URL": f"http://127.0.0.1:{PORT}/telegram",
+    "TELEGRAM_TOKEN": "bench",
+    "AI_CACHE_PATH": "",
+    "GROQ_MAX_CONCURRENCY": str(CUSTOMERS),
+})
+
+import uvicorn  # noqa: E402
+from fastapi import FastAPI, Request  # noqa: E402
+from fastapi.responses import StreamingResponse  # noqa: E402
+
+from api import bot  # noqa: E402
+from api.config import settings  # noqa: E402
+from api.services.ai_cache import ai_cache  # noqa: E402
+from api.services.chat_service import chat_service  # noqa: E402
+from api.services.database import db  # noqa: E402
+from api.services.http_client import close_http_client  # noqa: E402
+
+fake = FastAPI()
+# chat_id -> [(monotonic time, method, text)]
+received = {}
+message_ids = iter(range(1, 10 ** 6))
+
+
+@fake.post("/groq/chat/completions")
+async def fake_groq(request: Request):
+    body = await request.json()
+    words = (REPLY * 10).split()[:TOKENS]
+
+    async def events():
+        for word in words:
+            await asyncio.sleep(TOKEN_DELAY)
+            chunk = {"choices": [{"delta": {"content": word + " "}}]}
+            yield f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n"
+        yield "data: [DONE]\n\n"
+
+    if body.get("stream"):
+        return StreamingResponse(events(), media_type="text/event-stream")
+    await asyncio.sleep(TOKEN_DELAY * len(words))
+    return {"choices": [{"message": {"content": " ".join(words) + " "}}]}
+
+
+@fake.post("/telegram/botbench/{method}")
+async def fake_telegram(method: str, request: Request):
+    body = await request.json()
+    received.setdefault(str(body["chat_id"]), []).append((time.monotonic(), method, body["text"]))
+    return {"ok": True, "result": {"message_id": body.get("message_id") or next(message_ids)}}
+
+
+async def customer(i: int):
+    user_id, question = str(1000 + i), f"سؤال رقم {i} عن الأسعار"
+    chat = await chat_service.save_message(source="telegram", user_id=user_id, user_name="Bench", message=question)
+    await bot.reply_with_ai(user_id, chat["id"], user_id, question, "sales_agent")
+
+
+async def run(streaming: bool):
+    settings.GROQ_STREAMING = streaming
+    ai_cache.clear()
+    received.clear()
+    started = time.monotonic()
+    await asyncio.gather(*(customer(i) for i in range(CUSTOMERS)))
+    first, full, edits = [], [], []
+    for calls in received.values():
+        texts = [(t, text) for t, _, text in calls if text.strip() not in ("", "⏳")]
+        first.append(texts[0][0] - started)
+        full.append(calls[-1][0] - started)
+        edits.append(sum(1 for _, method, _ in calls if method == "editMessageText"))
+    label = "streamed" if streaming else "buffered"
+    print(f"{label:<10} first text {sum(first) / len(first) * 1000:7.0f} ms   "
+          f"full reply {sum(full) / len(full) * 1000:7.0f} ms   "
+          f"edits/reply {sum(edits) / len(edits):4.1f}")
+
+
+async def main():
+    server = uvicorn.Server(uvicorn.Config(fake, host="127.0.0.1", port=PORT, log_level="warning"))
+    serve = asyncio.get_running_loop().create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.01)
+    print(f"{CUSTOMERS} customers, {TOKENS} tokens at {1 / TOKEN_DELAY:.0f} tok/s, "
+          f"edits every {settings.TELEGRAM_EDIT_INTERVAL}s\n")
+    try:
+        await run(streaming=False)
+        await run(streaming=True)
+    finally:
+        server.should_exit = True
+        await serve
+        await db.close()
+        await close_http_client()
+        shutil.rmtree(os.path.dirname(DB_FILE))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,166 @@
+"""
+Upload memory check: peak RSS per upload must stay under a ceiling.
+
+Each case runs the media upload path (minus the database) in a fresh
+process with IMAGE_WORKERS=0, so the render happens in the measured
+process, and a local media store:
+  - spooled:   the multipart body, streamed in 64 KB messages, through
+               spool_request -> ImageOptimizer.optimize(path), as the API does
+  - in-memory: file.read() -> ImageOptimizer.optimize(bytes), as it used to
+Inputs: a 24 MP photo, a 20 MP RGBA PNG, a PNG whose header claims
+30000x30000 pixels (decompression bomb) and a file over
+MEDIA_MAX_UPLOAD_SIZE (sent without Content-Length, so it is cut off
+while streaming). The bomb and the oversize file must be rejected.
+Peak RSS is net of a child that only imports the modules.
+Exits 1 if a spooled upload goes over the ceiling or a bad file gets through.
+
+Run from the repository root:
+    python -m benchmarks.bench_upload_memory [--ceiling MB]
+"""
+
+import asyncio
+import io
+import itertools
+import json
+import os
+import struct
+import subprocess
+import sys
+import tempfile
+import zlib
+
+from PIL import Image
+
+CEILING_MB = 128
+MAX_UPLOAD_SIZE = 25 * 1024 * 1024
+
+
+def make_photo(path: str, size=(6000, 4000)):
+    noise = Image.effect_noise(size, 30).convert('RGB')
+    gradient = Image.linear_gradient('L').resize(size).convert('RGB')
+    Image.blend(noise, gradient, 0.5).save(path, format='JPEG', quality=90)
+
+
+def make_png(path: str, size=(5000, 4000)):
+    gradient = Image.linear_gradient('L').resize(size)
+    Image.merge('RGBA', (gradient, gradient.transpose(Image.Transpose.ROTATE_180), gradient, gradient)).save(path, format='PNG')
+
+
+def make_bomb(path: str, size=(30000, 30000)):
+    """Small PNG whose IHDR claims a huge image: a decoder would allocate 2.7 GB"""
+    buffer = io.BytesIO()
+    Image.new('RGB', (1, 1)).save(buffer, format='PNG')
+    data = bytearray(buffer.getvalue())
+    ihdr = struct.pack('>II', *size) + bytes(data[24:29])
+    data[16:33] = ihdr + struct.pack('>I', zlib.crc32(b'IHDR' + ihdr))
+    with open(path, 'wb') as f:
+        f.write(data)
+
+
+def make_oversize(path: str):
+    with open(path, 'wb') as f:
+        f.write(b'\xff\xd8\xff' + os.urandom(MAX_UPLOAD_SIZE))
+
+
+def peak_rss_kb() -> int:
+    """Peak RSS of this process (VmHWM starts over at exec, unlike ru_maxrss)"""
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith('VmHWM:'):
+                return int(line.split()[1])
+    return 0
+
+
+def multipart_request(f, filename: str):
+    """Request whose multipart body is read from the open file 64 KB at a time"""
+    from starlette.requests import Request
+    boundary = 'bench-boundary'
+    head = (f'--{boundary}\r\nContent-Disposition: form-data; name="file"; filename="{filename}"\r\n'
+            'Content-Type: application/octet-stream\r\n\r\n').encode()
+    messages = itertools.chain([head], iter(lambda: f.read(64 * 1024), b''), [f'\r\n--{boundary}--\r\n'.encode()])
+
+    async def receive():
+        body = next(messages, None)
+        return {'type': 'http.request', 'body': body or b'', 'more_body': body is not None}
+
+    headers = [(b'content-type', f'multipart/form-data; boundary={boundary}'.encode())]
+    return Request({'type': 'http', 'method': 'POST', 'path': '/', 'headers': headers, 'query_string': b''}, receive)
+
+
+async def upload(mode: str, path: str) -> str:
+    from starlette.datastructures import UploadFile
+    from api.services.image_optimizer import ImageOptimizer, ImageRejected, hash_bytes
+    from api.services.upload_spool import spool_request, UploadTooLarge
+
+    with open(path, 'rb') as f:
+        try:
+            if mode == 'spooled':
+                async with await spool_request(multipart_request(f, os.path.basename(path))) as spooled:
+                    result = await ImageOptimizer.optimize(spooled.path, spooled.content_hash)
+            else:
+                file = UploadFile(f, filename=os.path.basename(path))
+                contents = await file.read()
+                if len(contents) > MAX_UPLOAD_SIZE:
+                    raise UploadTooLarge()
+                result = await ImageOptimizer.optimize(contents, hash_bytes(contents))
+        except (UploadTooLarge, ImageRejected) as e:
+            return f"rejected ({type(e).__name__})"
+    return f"{len(result['renditions'])} renditions" if result else "failed"
+
+
+def child(mode: str, path: str):
+    import api.services.upload_spool  # noqa: F401  (imports are part of the baseline)
+    outcome = asyncio.run(upload(mode, path)) if mode != 'baseline' else ''
+    print(json.dumps({'rss_kb': peak_rss_kb(), 'outcome': outcome}))
+
+
+def measure(mode: str, path: str, env: dict) -> dict:
+    out = subprocess.run([sys.executable, '-m', 'benchmarks.bench_upload_memory', '--one', mode, path],
+                         capture_output=True, text=True, env=env, check=True).stdout
+    return json.loads(out.splitlines()[-1])
+
+
+def main():
+    if '--one' in sys.argv:
+        i = sys.argv.index('--one')
+        child(sys.argv[i + 1], sys.argv[i + 2])
+        return
+    ceiling = float(sys.argv[sys.argv.index('--ceiling') + 1]) if '--ceiling' in sys.argv else CEILING_MB
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(
+            os.environ, IMAGE_WORKERS='0', MEDIA_STORAGE='local', MEDIA_ROOT=os.path.join(tmp, 'media'),
+            MEDIA_SPOOL_DIR=tmp, MEDIA_MAX_UPLOAD_SIZE=str(MAX_UPLOAD_SIZE), IMAGE_MAX_PIXELS='50000000'
+        )
+        cases = [
+            ('24 MP JPEG', 'photo.jpg', make_photo, False),
+            ('20 MP RGBA PNG', 'alpha.png', make_png, False),
+            ('bomb PNG', 'bomb.png', make_bomb, True),
+            ('26 MB file', 'oversize.jpg', make_oversize, True),
+        ]
+        for _, filename, make, _ in cases:
+            make(os.path.join(tmp, filename))
+
+        baseline_kb = measure('baseline', os.devnull, env)['rss_kb']
+        print(f"ceiling {ceiling:.0f} MB per spooled upload\n")
+        print(f"{'':<16}{'size MB':>8}{'in-memory MB':>14}{'spooled MB':>12}  outcome")
+        failures = []
+        for label, filename, _, must_reject in cases:
+            path = os.path.join(tmp, filename)
+            old, new = (measure(mode, path, env) for mode in ('in-memory', 'spooled'))
+            old_mb, new_mb = ((r['rss_kb'] - baseline_kb) / 1024 for r in (old, new))
+            print(f"{label:<16}{os.path.getsize(path) / 1e6:>8.1f}{old_mb:>14.0f}{new_mb:>12.0f}  {new['outcome']}")
+            if new_mb > ceiling:
+                failures.append(f"{label}: {new_mb:.0f} MB over the {ceiling:.0f} MB ceiling")
+            if must_reject != new['outcome'].startswith('rejected'):
+                failures.append(f"{label}: {new['outcome']}")
+
+    print()
+    for failure in failures:
+        print(f"FAIL {failure}")
+    print("FAILED" if failures else "OK")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
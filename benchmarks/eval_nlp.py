@@ -0,0 +1,149 @@
+"""
+Accuracy and throughput of the Arabic command parser on the golden corpus.
+
+Runs api/services/nlp_service.py over benchmarks/nlp_corpus.json and reports:
+  - precision / recall per command type (process_command)
+  - precision / recall per customer intent (detect_intent)
+  - exact matches of the parsed data and of extract_numbers
+  - messages per second
+Cases the parser gets wrong are listed; the exit status is 1 if any of
+them is not a documented known gap. tests/test_nlp_corpus.py enforces the
+same in the test suite.
+
+Run from the repository root:
+    python -m benchmarks.eval_nlp [--verbose]
+"""
+
+import json
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+from api.services.nlp_service import NLPCommandProcessor
+
+CORPUS = Path(__file__).with_name("nlp_corpus.json")
+THROUGHPUT_MESSAGES = 20000
+ROUNDS = 5
+
+
+def load_corpus() -> Dict:
+    with open(CORPUS, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def is_known_gap(case: Dict) -> bool:
+    """Cases documenting a limitation the parser is known to fail"""
+    return (case.get("note") or "").startswith("known gap")
+
+
+def run_case(processor, case: Dict) -> Dict:
+    """What the parser returns for a case, and which expectations it meets"""
+    command, data = processor.process_command(case["text"])
+    got = {"command": command, "data": data}
+    checks = {"command": command == case["command"], "data": command == case["command"] and data == case["data"]}
+    if case["role"] == "customer":
+        got["intent"] = processor.detect_intent(case["text"])
+        checks["intent"] = got["intent"] == case.get("intent")
+    if "numbers" in case:
+        got["numbers"] = processor.extract_numbers(case["text"])
+        checks["numbers"] = got["numbers"] == case["numbers"]
+    return {"got": got, "checks": checks, "passed": all(checks.values())}
+
+
+def precision_recall(pairs: List[Tuple[str, str]]) -> Dict[str, Tuple[float, float, int]]:
+    """label -> (precision, recall, support) from (expected, predicted) pairs"""
+    expected, predicted = Counter(e for e, _ in pairs), Counter(p for _, p in pairs)
+    correct = Counter(e for e, p in pairs if e == p)
+    return {
+        label: (
+            correct[label] / predicted[label] if predicted[label] else 1.0,
+            correct[label] / expected[label] if expected[label] else 1.0,
+            expected[label]
+        )
+        for label in sorted(set(expected) | set(predicted))
+    }
+
+
+def throughput(processors: list, texts: List[str]) -> List[float]:
+    """Best msg/s of each parser, alternating rounds so both see the same machine load"""
+    messages = (texts * (THROUGHPUT_MESSAGES // len(texts) + 1))[:THROUGHPUT_MESSAGES]
+    best = [float("inf")] * len(processors)
+    for _ in range(ROUNDS):
+        for i, processor in enumerate(processors):
+            start = time.perf_counter()
+            for text in messages:
+                processor.process_command(text)
+            best[i] = min(best[i], time.perf_counter() - start)
+    return [len(messages) / elapsed for elapsed in best]
+
+
+def print_scores(title: str, scores: Dict[str, Dict[str, Tuple[float, float, int]]]):
+    names = list(scores)
+    print(f"{title:<18}{'support':>8}" + "".join(f"{name + ' P':>14}{name + ' R':>12}" for name in names))
+    for label in sorted(set().union(*(s.keys() for s in scores.values()))):
+        support = max(s.get(label, (0, 0, 0))[2] for s in scores.values())
+        row = f"{label:<18}{support:>8}"
+        for name in names:
+            precision, recall, _ = scores[name].get(label, (1.0, 1.0, 0))
+            row += f"{precision:>14.2f}{recall:>12.2f}"
+        print(row)
+    print()
+
+
+def main():
+    verbose = "--verbose" in sys.argv
+    corpus = load_corpus()
+    cases = corpus["cases"]
+    parsers = {"parser": NLPCommandProcessor()}
+    results = {name: [run_case(processor, case) for case in cases] for name, processor in parsers.items()}
+    print(f"corpus v{corpus['version']}: {len(cases)} cases "
+          f"({sum(c['role'] == 'admin' for c in cases)} admin, {sum(c['role'] == 'customer' for c in cases)} customer)\n")
+
+    print_scores("command", {
+        name: precision_recall([(case["command"], r["got"]["command"]) for case, r in zip(cases, runs)])
+        for name, runs in results.items()
+    })
+    print_scores("customer intent", {
+        name: precision_recall([
+            (case.get("intent") or "none", r["got"]["intent"] or "none")
+            for case, r in zip(cases, runs) if case["role"] == "customer"
+        ])
+        for name, runs in results.items()
+    })
+
+    rates = throughput(list(parsers.values()), [case["text"] for case in cases])
+    print(f"{'':<18}" + "".join(f"{name:>14}" for name in parsers))
+    for check in ("command", "data", "intent", "numbers"):
+        row = f"{check + ' exact':<18}"
+        for runs in results.values():
+            outcomes = [r["checks"][check] for r in runs if check in r["checks"]]
+            row += f"{sum(outcomes):>8}/{len(outcomes):<5}"
+        print(row)
+    print(f"{'all checks':<18}" + "".join(f"{sum(r['passed'] for r in runs):>8}/{len(runs):<5}" for runs in results.values()))
+    print(f"{'msg/s':<18}" + "".join(f"{rate:>14,.0f}" for rate in rates))
+    print()
+
+    regressions = []
+    for case, result in zip(cases, results["parser"]):
+        if result["passed"]:
+            continue
+        regression = not is_known_gap(case)
+        if regression:
+            regressions.append(case["id"])
+        if verbose or regression:
+            print(f"{'REGRESSION' if regression else 'KNOWN GAP':<10} {case['id']}: {case['text']}")
+            expected = {key: case.get(key) for key in result["got"]}
+            print(f"{'':<10} expected {json.dumps(expected, ensure_ascii=False)}")
+            print(f"{'':<10} got      {json.dumps(result['got'], ensure_ascii=False)}")
+            if case.get("note"):
+                print(f"{'':<10} note     {case['note']}")
+    failed = sum(not r["passed"] for r in results["parser"])
+    print(f"{failed} case(s) failed, {len(regressions)} of them not known gaps"
+          + ("" if verbose or not failed else "; --verbose lists them"))
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
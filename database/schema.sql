@@ -47,6 +47,7 @@ CREATE TABLE pages (
     meta_description TEXT,
     content JSONB NOT NULL DEFAULT '{}'::jsonb,
     is_published BOOLEAN DEFAULT false,
+    rendered_html TEXT, -- static HTML prerendered on publish
     created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
     updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
 );
@@ -68,12 +69,29 @@ CREATE TABLE chats (
     source VARCHAR(50) NOT NULL CHECK (source IN ('telegram', 'website')),
     user_id VARCHAR(255) NOT NULL,
     user_name VARCHAR(255),
-    messages JSONB NOT NULL DEFAULT '[]'::jsonb,
+    messages JSONB NOT NULL DEFAULT '[]'::jsonb, -- legacy, history now lives in chat_messages
     status VARCHAR(50) DEFAULT 'active' CHECK (status IN ('active', 'read', 'archived')),
+    message_count INTEGER NOT NULL DEFAULT 0,
+    unread_count INTEGER NOT NULL DEFAULT 0,
+    last_message TEXT,
+    last_message_at TIMESTAMP WITH TIME ZONE,
+    last_from_admin BOOLEAN,
     created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
     updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
 );
 
+-- ==================== CHAT MESSAGES TABLE ====================
+-- Append-only log, one row per message; seq numbers messages within a chat
+CREATE TABLE IF NOT EXISTS chat_messages (
+    id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+    chat_id UUID NOT NULL REFERENCES chats(id) ON DELETE CASCADE,
+    seq INTEGER NOT NULL,
+    text TEXT NOT NULL DEFAULT '',
+    from_admin BOOLEAN NOT NULL DEFAULT false,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    UNIQUE (chat_id, seq)
+);
+
 -- ==================== LEADS TABLE ====================
 CREATE TABLE leads (
     id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
@@ -101,6 +119,9 @@ CREATE TABLE media (
     height INTEGER,
     alt_text VARCHAR(255),
     tags JSONB DEFAULT '[]'::jsonb,
+    renditions JSONB DEFAULT '[]'::jsonb, -- [{name, format, width, height, size, url, public_id}]
+    srcset TEXT,
+    content_hash VARCHAR(64), -- BLAKE2b-256 of the uploaded file, also its public id
     created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
 );
 
@@ -108,10 +129,33 @@ CREATE TABLE media (
 CREATE INDEX idx_units_project ON units(project_id);
 CREATE INDEX idx_units_type ON units(unit_type);
 CREATE INDEX idx_units_status ON units(status);
+CREATE INDEX idx_units_floor ON units(floor_number);
+CREATE INDEX idx_units_price ON units(total_price);
 CREATE INDEX idx_chats_source ON chats(source);
 CREATE INDEX idx_chats_user ON chats(user_id);
+CREATE UNIQUE INDEX idx_chats_identity ON chats(source, user_id);
+CREATE INDEX idx_chats_inbox ON chats(source, last_message_at DESC, id DESC);
 CREATE INDEX idx_leads_status ON leads(status);
 CREATE INDEX idx_pages_slug ON pages(slug);
+CREATE UNIQUE INDEX idx_media_content_hash ON media(content_hash);
+
+-- ==================== MIGRATIONS ====================
+-- For databases created before these columns existed
+ALTER TABLE pages ADD COLUMN IF NOT EXISTS rendered_html TEXT;
+ALTER TABLE chats ADD COLUMN IF NOT EXISTS message_count INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE chats ADD COLUMN IF NOT EXISTS unread_count INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE chats ADD COLUMN IF NOT EXISTS last_message TEXT;
+ALTER TABLE chats ADD COLUMN IF NOT EXISTS last_message_at TIMESTAMP WITH TIME ZONE;
+ALTER TABLE chats ADD COLUMN IF NOT EXISTS last_from_admin BOOLEAN;
+ALTER TABLE media ADD COLUMN IF NOT EXISTS renditions JSONB DEFAULT '[]'::jsonb;
+ALTER TABLE media ADD COLUMN IF NOT EXISTS srcset TEXT;
+ALTER TABLE media ADD COLUMN IF NOT EXISTS content_hash VARCHAR(64);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_media_content_hash ON media(content_hash);
+-- Appends upsert on (source, user_id); fails if duplicate chats exist, merge them first
+CREATE UNIQUE INDEX IF NOT EXISTS idx_chats_identity ON chats(source, user_id);
+CREATE INDEX IF NOT EXISTS idx_chats_inbox ON chats(source, last_message_at DESC, id DESC);
+UPDATE chats SET last_message_at = COALESCE(updated_at, created_at) WHERE last_message_at IS NULL;
+-- Also run the CHAT MESSAGES TABLE statement above, then the CHAT MESSAGE LOG section below
 
 -- ==================== TRIGGERS FOR UPDATED_AT ====================
 CREATE OR REPLACE FUNCTION update_updated_at_column()
@@ -137,6 +181,84 @@ CREATE TRIGGER update_chats_updated_at BEFORE UPDATE ON chats
 CREATE TRIGGER update_leads_updated_at BEFORE UPDATE ON leads
     FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
 
+-- ==================== CHAT MESSAGE LOG ====================
+-- Atomic append: one upsert of the chat summary (row lock orders concurrent
+-- appends to the same chat) plus one insert into chat_messages.
+-- A legacy chat (history still in chats.messages, message_count = 0) is moved
+-- into chat_messages first, so the new message is numbered after its history.
+-- Deploy order: run the legacy migration at the end of this section (or
+-- `python migrate_chats.py`) before creating this function, so no chat
+-- is migrated on the hot path.
+CREATE OR REPLACE FUNCTION append_chat_message(
+    p_source VARCHAR,
+    p_user_id VARCHAR,
+    p_user_name VARCHAR,
+    p_text TEXT,
+    p_from_admin BOOLEAN DEFAULT false
+)
+RETURNS JSONB AS $$
+DECLARE
+    v_chat chats;
+    v_message chat_messages;
+BEGIN
+    SELECT * INTO v_chat FROM chats WHERE source = p_source AND user_id = p_user_id FOR UPDATE;
+    IF FOUND AND v_chat.message_count = 0 AND jsonb_array_length(COALESCE(v_chat.messages, '[]'::jsonb)) > 0 THEN
+        INSERT INTO chat_messages (chat_id, seq, text, from_admin, created_at)
+        SELECT v_chat.id, m.seq, COALESCE(m.msg->>'text', ''), COALESCE((m.msg->>'from_admin')::boolean, false),
+               COALESCE((m.msg->>'timestamp')::timestamptz, v_chat.created_at)
+        FROM jsonb_array_elements(v_chat.messages) WITH ORDINALITY AS m(msg, seq)
+        ON CONFLICT (chat_id, seq) DO NOTHING;
+
+        -- Unread: customer messages since the chat was last marked read (replies don't reset it)
+        UPDATE chats SET
+            message_count = jsonb_array_length(v_chat.messages),
+            unread_count = CASE WHEN v_chat.status = 'read' THEN 0 ELSE (
+                SELECT COUNT(*) FROM chat_messages cm WHERE cm.chat_id = v_chat.id AND NOT cm.from_admin
+            ) END,
+            messages = '[]'::jsonb
+        WHERE id = v_chat.id;
+    END IF;
+
+    INSERT INTO chats (source, user_id, user_name, message_count, unread_count, last_message, last_message_at, last_from_admin)
+    VALUES (p_source, p_user_id, p_user_name, 1, CASE WHEN p_from_admin THEN 0 ELSE 1 END, p_text, NOW(), p_from_admin)
+    ON CONFLICT (source, user_id) DO UPDATE SET
+        message_count = chats.message_count + 1,
+        unread_count = chats.unread_count + CASE WHEN p_from_admin THEN 0 ELSE 1 END,
+        status = CASE WHEN p_from_admin THEN chats.status ELSE 'active' END,
+        last_message = EXCLUDED.last_message,
+        last_message_at = EXCLUDED.last_message_at,
+        last_from_admin = EXCLUDED.last_from_admin
+    RETURNING * INTO v_chat;
+
+    INSERT INTO chat_messages (chat_id, seq, text, from_admin)
+    VALUES (v_chat.id, v_chat.message_count, p_text, p_from_admin)
+    RETURNING * INTO v_message;
+
+    RETURN jsonb_build_object('chat', to_jsonb(v_chat) - 'messages', 'message', to_jsonb(v_message));
+END;
+$$ LANGUAGE plpgsql;
+
+-- Move legacy chats.messages arrays into chat_messages (safe to re-run)
+INSERT INTO chat_messages (chat_id, seq, text, from_admin, created_at)
+SELECT c.id, m.seq, COALESCE(m.msg->>'text', ''), COALESCE((m.msg->>'from_admin')::boolean, false),
+       COALESCE((m.msg->>'timestamp')::timestamptz, c.created_at)
+FROM chats c
+CROSS JOIN LATERAL jsonb_array_elements(c.messages) WITH ORDINALITY AS m(msg, seq)
+WHERE c.message_count = 0 AND jsonb_array_length(c.messages) > 0
+ON CONFLICT (chat_id, seq) DO NOTHING;
+
+UPDATE chats c SET
+    message_count = jsonb_array_length(c.messages),
+    last_message = c.messages->-1->>'text',
+    last_message_at = COALESCE((c.messages->-1->>'timestamp')::timestamptz, c.updated_at),
+    last_from_admin = COALESCE((c.messages->-1->>'from_admin')::boolean, false),
+    -- Unread: customer messages since the chat was last marked read (replies don't reset it)
+    unread_count = CASE WHEN c.status = 'read' THEN 0 ELSE (
+        SELECT COUNT(*) FROM chat_messages cm WHERE cm.chat_id = c.id AND NOT cm.from_admin
+    ) END,
+    messages = '[]'::jsonb
+WHERE c.message_count = 0 AND jsonb_array_length(c.messages) > 0;
+
 -- ==================== SAMPLE DATA ====================
 -- Insert sample projects
 INSERT INTO projects (name, name_ar, description, description_ar, location, status) VALUES
@@ -158,6 +280,7 @@ ALTER TABLE units ENABLE ROW LEVEL SECURITY;
 ALTER TABLE pages ENABLE ROW LEVEL SECURITY;
 ALTER TABLE content_blocks ENABLE ROW LEVEL SECURITY;
 ALTER TABLE chats ENABLE ROW LEVEL SECURITY;
+ALTER TABLE chat_messages ENABLE ROW LEVEL SECURITY;
 ALTER TABLE leads ENABLE ROW LEVEL SECURITY;
 ALTER TABLE media ENABLE ROW LEVEL SECURITY;
 
@@ -188,6 +311,9 @@ CREATE POLICY "Allow all for authenticated users" ON content_blocks
 CREATE POLICY "Allow all for authenticated users" ON chats
     FOR ALL USING (true);
 
+CREATE POLICY "Allow all for authenticated users" ON chat_messages
+    FOR ALL USING (true);
+
 CREATE POLICY "Allow all for authenticated users" ON leads
     FOR ALL USING (true);
 
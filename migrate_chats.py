@@ -0,0 +1,18 @@
+import asyncio
+from api.services.database import db
+from api.services.http_client import close_http_client
+
+async def migrate():
+    print(f"💬 Migrating chat histories to the message log ({db.name})...")
+
+    migrated = await db.migrate_chat_messages()
+    print(f"   Migrated {migrated} chats")
+
+    # Flush any queued writes before exiting
+    await db.close()
+    await close_http_client()
+    print("✅ Migration Complete!")
+
+if __name__ == "__main__":
+    loop = asyncio.get_event_loop()
+    loop.run_until_complete(migrate())
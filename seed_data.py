@@ -1,6 +1,7 @@
 import asyncio
 import os
-from api.services.supabase_service import db
+from api.services.database import db
+from api.services.http_client import close_http_client
 
 # Minimal GrapesJS-compatible HTML for Home
 HOME_HTML = """
@@ -55,6 +56,9 @@ async def seed():
         "is_published": True
     })
     
+    # Flush any queued writes before exiting
+    await db.close()
+    await close_http_client()
     print("✅ Seeding Complete!")
 
 if __name__ == "__main__":
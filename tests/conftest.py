@@ -0,0 +1,23 @@
+"""
+Settings are read when `api` is first imported, so the test environment is
+set here, before any test module imports it: SQLite in a temporary
+directory, local media storage and in-process image work.
+"""
+
+import os
+import tempfile
+
+_tmp = tempfile.mkdtemp(prefix='kayan-tests-')
+
+os.environ.update({
+    'DB_BACKEND': 'sqlite',
+    'SQLITE_PATH': os.path.join(_tmp, 'kayan_pro.db'),
+    'MEDIA_STORAGE': 'local',
+    'MEDIA_ROOT': os.path.join(_tmp, 'media'),
+    'MEDIA_SPOOL_DIR': _tmp,
+    'IMAGE_WORKERS': '0',
+    'AI_CACHE_PATH': '',
+    'GROQ_API_KEY': '',
+    'TELEGRAM_TOKEN': '',
+    'JWT_SECRET': 'test-secret-at-least-32-bytes-long',
+})
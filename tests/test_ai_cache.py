@@ -0,0 +1,122 @@
+import asyncio
+import json
+
+import pytest
+
+from api.config import settings
+from api.services import ai_cache as ai_cache_module
+from api.services.ai_cache import AIResponseCache, normalize_arabic
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('أسعار الشقق؟', 'اسعار الشقق'),
+    ('إسعار   الشُّقَق', 'اسعار الشقق'),
+    ('كم سعر الشقة في آخر طابق', 'كم سعر الشقه في اخر طابق'),
+    ('مبنى الإدارة', 'مبني الاداره'),
+    ('مسـاحـة_الشقة!!', 'مساحه الشقه'),
+    ('Price  OF Unit?', 'price of unit'),
+    ('؟!', ''),
+])
+def test_normalize_arabic(text, expected):
+    assert normalize_arabic(text) == expected
+
+
+def ask(cache, text, reply='answer', persona='sales_agent'):
+    calls = []
+
+    async def create():
+        calls.append(text)
+        return reply
+
+    result = asyncio.run(cache.get_or_create(persona, text, create))
+    return result, len(calls)
+
+
+def test_spelling_variants_share_an_entry():
+    cache = AIResponseCache(path='', max_entries=10, ttl=60)
+    assert ask(cache, 'أسعار الشقق؟', 'first') == ('first', 1)
+    assert ask(cache, 'اسعار الشُّقق', 'second') == ('first', 0)
+    assert (cache.hits, cache.misses) == (1, 1)
+    # Other personas are not cached
+    assert ask(cache, 'اسعار الشقق', 'free', persona='support') == ('free', 1)
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = AIResponseCache(path='', max_entries=2, ttl=60)
+    ask(cache, 'a')
+    ask(cache, 'b')
+    ask(cache, 'a')  # now most recent
+    ask(cache, 'c')
+    assert [query for _, query in cache.entries] == ['a', 'c']
+    assert cache.evictions == 1
+    assert ask(cache, 'b')[1] == 1
+
+
+def test_expired_entry_is_recreated(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(ai_cache_module.time, 'time', lambda: now[0])
+    cache = AIResponseCache(path='', max_entries=10, ttl=60)
+    ask(cache, 'q', 'old')
+    now[0] += 59
+    assert ask(cache, 'q', 'new') == ('old', 0)
+    now[0] += 2
+    assert ask(cache, 'q', 'new') == ('new', 1)
+
+
+def test_concurrent_misses_share_one_request():
+    cache = AIResponseCache(path='', max_entries=10, ttl=60)
+    calls = []
+
+    async def create():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return 'shared'
+
+    async def scenario():
+        return await asyncio.gather(*(cache.get_or_create('sales_agent', 'q', create) for _ in range(5)))
+
+    assert asyncio.run(scenario()) == ['shared'] * 5
+    assert (len(calls), cache.coalesced) == (1, 4)
+
+
+def test_failures_are_not_cached():
+    cache = AIResponseCache(path='', max_entries=10, ttl=60)
+
+    async def fail():
+        raise RuntimeError('groq down')
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(cache.get_or_create('sales_agent', 'q', fail))
+    assert ask(cache, 'q', 'recovered') == ('recovered', 1)
+
+
+def test_saved_entries_are_reloaded_without_expired_ones(tmp_path, monkeypatch):
+    path = str(tmp_path / 'ai_cache.json')
+    now = [1000.0]
+    monkeypatch.setattr(ai_cache_module.time, 'time', lambda: now[0])
+    cache = AIResponseCache(path=path, max_entries=10, ttl=60)
+    ask(cache, 'short lived', 'gone')
+    now[0] += 30
+    ask(cache, 'kept', 'saved')
+    cache.save()
+    assert len(json.load(open(path, encoding='utf-8'))['entries']) == 2
+
+    now[0] += 45
+    restored = AIResponseCache(path=path, max_entries=10, ttl=60)
+    assert ask(restored, 'kept') == ('saved', 0)
+    assert list(restored.entries) == [('sales_agent', 'kept')]
+
+
+def test_unreadable_file_starts_empty(tmp_path):
+    path = tmp_path / 'ai_cache.json'
+    path.write_text('{not json', encoding='utf-8')
+    cache = AIResponseCache(path=str(path), max_entries=10, ttl=60)
+    assert ask(cache, 'q') == ('answer', 1)
+
+
+def test_serverless_cache_is_memory_only(monkeypatch):
+    monkeypatch.setattr(settings, 'AI_CACHE_PATH', 'ai_cache.json')
+    monkeypatch.setattr(settings, 'SERVERLESS', True)
+    assert AIResponseCache().path == ''
+    monkeypatch.setattr(settings, 'SERVERLESS', False)
+    assert AIResponseCache().path == 'ai_cache.json'
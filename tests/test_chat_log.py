@@ -0,0 +1,92 @@
+import asyncio
+
+import pytest
+
+from api.services.sqlite_service import SQLiteService
+
+
+@pytest.fixture
+def db(tmp_path):
+    service = SQLiteService(str(tmp_path / 'test.db'))
+    yield service
+    asyncio.run(service.close())
+
+
+def legacy_chat(status='active'):
+    return {
+        'source': 'telegram',
+        'user_id': '7',
+        'user_name': 'Legacy',
+        'status': status,
+        'messages': [
+            {'text': 'hi', 'from_admin': False, 'timestamp': '2024-01-01T10:00:00'},
+            {'text': 'bot answer', 'from_admin': True, 'timestamp': '2024-01-01T10:00:01'},
+            {'text': 'price?', 'from_admin': False, 'timestamp': '2024-01-01T10:01:00'},
+            {'text': 'bot answer', 'from_admin': True, 'timestamp': '2024-01-01T10:01:01'},
+        ]
+    }
+
+
+def test_appends_are_numbered_in_order(db):
+    async def scenario():
+        for i in range(3):
+            await db.append_chat_message('website', 'u1', 'Visitor', f'm{i}')
+        # Concurrent appends to the same chat still get distinct, gapless numbers
+        await asyncio.gather(*(db.append_chat_message('website', 'u1', 'Visitor', f'c{i}') for i in range(10)))
+        chat = await db.get_chat_by_user('website', 'u1')
+        page = await db.get_chat_messages(chat['id'], limit=100)
+        return chat, page['items']
+
+    chat, messages = asyncio.run(scenario())
+    assert [m['seq'] for m in messages] == list(range(1, 14))
+    assert [m['text'] for m in messages[:3]] == ['m0', 'm1', 'm2']
+    assert chat['message_count'] == 13
+    assert chat['last_message'] == messages[-1]['text']
+
+
+def test_replies_do_not_clear_unread_but_marking_read_does(db):
+    async def scenario():
+        counts = []
+        for text, from_admin in [('a', False), ('b', False), ('c', False), ('reply', True)]:
+            result = await db.append_chat_message('telegram', '1', 'Customer', text, from_admin=from_admin)
+            counts.append(result['chat']['unread_count'])
+        chat = await db.mark_chat_read(result['chat']['id'])
+        counts.append(chat['unread_count'])
+        result = await db.append_chat_message('telegram', '1', 'Customer', 'again')
+        return counts, result['chat']
+
+    counts, chat = asyncio.run(scenario())
+    assert counts == [1, 2, 3, 3, 0]
+    assert chat['unread_count'] == 1 and chat['status'] == 'active'
+
+
+def test_legacy_chat_is_migrated_before_the_first_append(db):
+    async def scenario():
+        chat = await db._insert('chats', legacy_chat())
+        result = await db.append_chat_message('telegram', '7', 'Legacy', 'new question')
+        page = await db.get_chat_messages(chat['id'], limit=100)
+        return result, page['items']
+
+    result, messages = asyncio.run(scenario())
+    assert [(m['seq'], m['text']) for m in messages] == [
+        (1, 'hi'), (2, 'bot answer'), (3, 'price?'), (4, 'bot answer'), (5, 'new question')
+    ]
+    chat = result['chat']
+    assert chat['message_count'] == 5
+    # Bot replies do not clear unread: both legacy questions plus the new one
+    assert chat['unread_count'] == 3
+    assert chat['messages'] == []
+
+
+def test_migration_matches_the_live_rule_and_is_rerunnable(db):
+    async def scenario():
+        active = await db._insert('chats', legacy_chat())
+        read = await db._insert('chats', dict(legacy_chat(status='read'), user_id='8'))
+        first = await db.migrate_chat_messages()
+        again = await db.migrate_chat_messages()
+        return first, again, await db.get_chat(active['id']), await db.get_chat(read['id'])
+
+    first, again, active, read = asyncio.run(scenario())
+    assert (first, again) == (2, 0)
+    assert (active['message_count'], active['unread_count'], active['last_message']) == (4, 2, 'bot answer')
+    assert (read['message_count'], read['unread_count']) == (4, 0)
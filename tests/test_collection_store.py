@@ -0,0 +1,36 @@
+from api.services.collection_store import CollectionStore
+
+DOCUMENT = {
+    'leads': [
+        {'id': 'kept', 'name': 'Mona', 'status': 'new'},
+        {'name': 'Ali', 'status': 'new'},
+        {'name': 'Sara', 'status': 'contacted'},
+        {'name': 'Ali', 'status': 'new'},
+    ],
+    'settings_version': 3,
+}
+
+
+def ids(store: CollectionStore) -> list:
+    return [row['id'] for row in store['leads']]
+
+
+def test_rows_without_id_get_the_same_id_on_every_load():
+    first, second = ids(CollectionStore(DOCUMENT)), ids(CollectionStore(DOCUMENT))
+    assert first == second
+    assert first[0] == 'kept'
+    # Identical rows are still told apart
+    assert len(set(first)) == 4
+
+
+def test_legacy_id_does_not_depend_on_position():
+    reordered = {'leads': [DOCUMENT['leads'][2], DOCUMENT['leads'][0]]}
+    sara = ids(CollectionStore(DOCUMENT))[2]
+    assert ids(CollectionStore(reordered))[0] == sara
+
+
+def test_assigned_ids_are_saved_with_the_document():
+    document = CollectionStore(DOCUMENT).to_document()
+    assert all(row.get('id') for row in document['leads'])
+    assert ids(CollectionStore(document)) == ids(CollectionStore(DOCUMENT))
+    assert document['settings_version'] == 3
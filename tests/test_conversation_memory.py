@@ -0,0 +1,152 @@
+import asyncio
+
+import pytest
+
+from api.config import settings
+from api.services.chat_service import chat_service
+from api.services.conversation_memory import CHARS_PER_TOKEN, Conversation, ConversationMemory, estimate_tokens
+
+
+@pytest.fixture(autouse=True)
+def budget(monkeypatch):
+    # Each 8-character message below is 3 tokens: 3 fit in the recent budget
+    monkeypatch.setattr(settings, 'CONVERSATION_RECENT_TOKENS', 10)
+    monkeypatch.setattr(settings, 'CONVERSATION_SUMMARY_TOKENS', 30)
+
+
+def message(seq, from_admin=False):
+    return {'seq': seq, 'from_admin': from_admin, 'text': f'msg {seq:04d}'}
+
+
+def contents(conversation):
+    return [turn['content'] for turn in conversation.turns]
+
+
+def test_older_turns_are_folded_into_the_summary():
+    conversation = Conversation()
+    for seq in range(1, 6):
+        conversation.add(seq, seq % 2 == 0, f'msg {seq:04d}')
+    assert contents(conversation) == ['msg 0003', 'msg 0004', 'msg 0005']
+    assert conversation.turn_tokens == 9 <= settings.CONVERSATION_RECENT_TOKENS
+    assert list(conversation.summary) == ['العميل: msg 0001', 'المساعد: msg 0002']
+
+
+def test_summary_drops_its_oldest_lines_past_its_budget():
+    conversation = Conversation()
+    for seq in range(1, 21):
+        conversation.add(seq, False, f'msg {seq:04d}')
+    assert conversation.summary_tokens <= settings.CONVERSATION_SUMMARY_TOKENS
+    assert conversation.summary_tokens == sum(map(estimate_tokens, conversation.summary))
+    # The most recent folded turn is kept, the oldest ones are gone
+    assert conversation.summary[-1] == 'العميل: msg 0017'
+    assert 'العميل: msg 0001' not in conversation.summary
+
+
+def test_summary_lines_are_clipped():
+    conversation = Conversation()
+    conversation.add(1, False, 'سعر   الشقة\n' * 40)
+    conversation.add(2, False, 'ok')
+    line = conversation.summary[0]
+    assert line.startswith('العميل: سعر الشقة سعر') and line.endswith('…')
+    assert '\n' not in line
+
+
+def test_newest_turn_stays_even_over_budget():
+    conversation = Conversation()
+    conversation.add(1, False, 'short')
+    conversation.add(2, False, 'x' * 1000)
+    assert len(conversation.turns) == 1
+    # Clipped to the recent budget
+    assert len(conversation.turns[0]['content']) == settings.CONVERSATION_RECENT_TOKENS * CHARS_PER_TOKEN
+    assert conversation.has_history
+
+
+def test_seen_and_empty_messages_are_ignored():
+    conversation = Conversation()
+    conversation.add(2, False, 'msg 0002')
+    conversation.add(2, False, 'again')
+    conversation.add(1, False, 'older')
+    conversation.add(3, False, '')
+    assert contents(conversation) == ['msg 0002']
+    assert not conversation.has_history
+
+
+def test_messages_put_the_summary_between_prompt_and_turns():
+    conversation = Conversation()
+    for seq in range(1, 5):
+        conversation.add(seq, seq == 4, f'msg {seq:04d}')
+    messages = conversation.messages('prompt')
+    assert messages[0] == {'role': 'system', 'content': 'prompt'}
+    assert messages[1]['role'] == 'system' and messages[1]['content'].endswith('العميل: msg 0001')
+    assert messages[2:] == [
+        {'role': 'user', 'content': 'msg 0002'},
+        {'role': 'user', 'content': 'msg 0003'},
+        {'role': 'assistant', 'content': 'msg 0004'},
+    ]
+
+
+def test_first_use_loads_the_log_and_keeps_observed_messages(monkeypatch):
+    memory = ConversationMemory(max_chats=10)
+    loading = asyncio.Event()
+    release = asyncio.Event()
+
+    async def get_messages(chat_id, limit):
+        loading.set()
+        await release.wait()
+        return {'items': [message(seq) for seq in (1, 2)]}
+
+    monkeypatch.setattr(chat_service, 'get_messages', get_messages)
+
+    async def scenario():
+        first = asyncio.ensure_future(memory.get('c1'))
+        await loading.wait()
+        # Saved while the page was in flight, and a concurrent reader
+        memory.observe('c1', message(3, from_admin=True))
+        second = asyncio.ensure_future(memory.get('c1'))
+        release.set()
+        return await first, await second
+
+    first, second = asyncio.run(scenario())
+    assert first is second
+    assert contents(first) == ['msg 0001', 'msg 0002', 'msg 0003']
+    assert first.turns[-1]['role'] == 'assistant' and first.last_seq == 3
+    assert (memory.loads, memory.hits) == (1, 1)
+
+
+def test_failed_load_is_retried(monkeypatch):
+    memory = ConversationMemory(max_chats=10)
+    pages = iter([RuntimeError('db down'), {'items': [message(1)]}])
+
+    async def get_messages(chat_id, limit):
+        page = next(pages)
+        if isinstance(page, Exception):
+            raise page
+        return page
+
+    monkeypatch.setattr(chat_service, 'get_messages', get_messages)
+
+    async def scenario():
+        empty = await memory.get('c1')
+        return contents(empty), contents(await memory.get('c1'))
+
+    assert asyncio.run(scenario()) == ([], ['msg 0001'])
+    assert memory.loads == 2
+
+
+def test_least_recently_used_chat_is_evicted(monkeypatch):
+    memory = ConversationMemory(max_chats=2)
+
+    async def get_messages(chat_id, limit):
+        return {'items': []}
+
+    monkeypatch.setattr(chat_service, 'get_messages', get_messages)
+
+    async def scenario():
+        for chat_id in ['a', 'b', 'a', 'c']:
+            await memory.get(chat_id)
+
+    asyncio.run(scenario())
+    assert list(memory.chats) == ['a', 'c']
+    # Messages for uncached chats are not kept
+    memory.observe('b', message(1))
+    assert 'b' not in memory.chats
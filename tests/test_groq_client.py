@@ -0,0 +1,153 @@
+import asyncio
+
+import httpx
+import pytest
+
+from api.config import settings
+from api.services import groq_client as groq_module
+from api.services.groq_client import AIUnavailable, CircuitBreaker, GroqClient
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(groq_module.time, 'monotonic', lambda: now[0])
+    return now
+
+
+def breaker():
+    return CircuitBreaker(window=4, min_calls=3, failure_rate=0.5, cooldown=30)
+
+
+def test_opens_once_enough_calls_fail(clock):
+    b = breaker()
+    b.record(False)
+    b.record(False)
+    # Below min_calls the failure rate is not judged yet
+    assert b.state == 'closed' and b.allow()
+    b.record(True)
+    assert b.state == 'open' and b.times_opened == 1
+    assert not b.allow()
+
+
+def test_failures_outside_the_window_are_forgotten(clock):
+    b = breaker()
+    for success in [False, True, True, True, True, False]:
+        b.record(success)
+    # Window of 4: [True, True, True, False]
+    assert b.state == 'closed'
+
+
+def test_half_open_lets_one_probe_through_and_closes_on_success(clock):
+    b = breaker()
+    for _ in range(3):
+        b.record(False)
+    clock[0] += 29
+    assert not b.allow()
+    clock[0] += 1
+    assert b.allow() and b.state == 'half_open'
+    # A second caller waits for the probe's outcome
+    assert not b.allow()
+    b.record(True)
+    assert b.state == 'closed' and b.allow()
+    assert len(b.outcomes) == 0
+
+
+def test_failed_probe_reopens_for_another_cooldown(clock):
+    b = breaker()
+    for _ in range(3):
+        b.record(False)
+    clock[0] += 30
+    assert b.allow()
+    b.record(False)
+    assert b.state == 'open' and b.times_opened == 2
+    assert b.stats()['retry_in_s'] == 30
+    clock[0] += 29
+    assert not b.allow()
+
+
+def test_abandoned_probe_lets_another_through(clock):
+    b = breaker()
+    for _ in range(3):
+        b.record(False)
+    clock[0] += 30
+    assert b.allow()
+    b.abandon()
+    assert b.state == 'half_open' and b.allow()
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(settings, 'GROQ_MAX_CONCURRENCY', 2)
+    monkeypatch.setattr(settings, 'GROQ_MAX_WAITING', 1)
+    monkeypatch.setattr(settings, 'GROQ_TIMEOUT', 0.5)
+    return GroqClient()
+
+
+def test_concurrency_limit_queues_then_rejects(client, monkeypatch):
+    release = asyncio.Event()
+    peak = []
+
+    async def request(messages, temperature):
+        peak.append(client.in_flight)
+        await release.wait()
+        return 'ok'
+
+    monkeypatch.setattr(client, '_request', request)
+
+    async def scenario():
+        calls = [asyncio.ensure_future(client.complete([])) for _ in range(3)]
+        await asyncio.sleep(0.01)
+        assert (client.in_flight, client.waiting) == (2, 1)
+        # Both slots busy and the queue full: turned away at once
+        with pytest.raises(AIUnavailable) as rejected:
+            await client.complete([])
+        release.set()
+        return rejected.value.reason, await asyncio.gather(*calls)
+
+    reason, replies = asyncio.run(scenario())
+    assert reason == 'busy' and client.rejected['busy'] == 1
+    assert replies == ['ok'] * 3
+    assert max(peak) == 2
+    assert (client.in_flight, client.waiting) == (0, 0)
+
+
+def test_queueing_past_the_deadline_counts_as_a_failure(client, monkeypatch):
+    async def request(messages, temperature):
+        await asyncio.sleep(1)
+        return 'late'
+
+    monkeypatch.setattr(client, '_request', request)
+
+    async def scenario():
+        calls = [client.complete([]) for _ in range(3)]
+        return await asyncio.gather(*calls, return_exceptions=True)
+
+    results = asyncio.run(scenario())
+    assert all(isinstance(r, AIUnavailable) and r.reason == 'timeout' for r in results)
+    assert client.timeouts == 3
+    assert list(client.breaker.outcomes) == [False] * 3
+
+
+def test_open_breaker_rejects_without_calling_groq(client, monkeypatch):
+    calls = []
+
+    async def request(messages, temperature):
+        calls.append(1)
+        raise httpx.ConnectError('down')
+
+    monkeypatch.setattr(client, '_request', request)
+
+    async def scenario():
+        reasons = []
+        for _ in range(settings.GROQ_BREAKER_MIN_CALLS + 2):
+            try:
+                await client.complete([])
+            except AIUnavailable as e:
+                reasons.append(e.reason)
+        return reasons
+
+    reasons = asyncio.run(scenario())
+    assert reasons == ['error'] * settings.GROQ_BREAKER_MIN_CALLS + ['open'] * 2
+    assert len(calls) == settings.GROQ_BREAKER_MIN_CALLS
+    assert client.stats()['breaker']['state'] == 'open'
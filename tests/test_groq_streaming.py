@@ -0,0 +1,150 @@
+import asyncio
+import json
+from contextlib import asynccontextmanager
+
+import pytest
+
+from api import bot
+from api.config import settings
+from api.services.groq_client import AIUnavailable, GroqClient
+from api.services.http_client import close_http_client
+from api.services.telegram_sender import telegram_sender
+
+STALL = 30  # seconds: longer than any timeout below
+
+
+@asynccontextmanager
+async def fake_groq(script):
+    """
+    Local server answering /chat/completions with server-sent events.
+    `script` is a list of (delay, text): each text is sent as one delta
+    after `delay` seconds, then the stream ends with [DONE].
+    """
+    handlers = set()
+
+    async def handle(reader, writer):
+        handlers.add(asyncio.current_task())
+        head = await reader.readuntil(b"\r\n\r\n")
+        length = next(int(line.split(b":")[1]) for line in head.split(b"\r\n") if line.lower().startswith(b"content-length"))
+        await reader.readexactly(length)
+        writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\nConnection: close\r\n\r\n")
+        for delay, text in script:
+            await asyncio.sleep(delay)
+            event = {'choices': [{'delta': {'content': text}}]}
+            writer.write(f"data: {json.dumps(event)}\n\n".encode())
+            await writer.drain()
+        writer.write(b"data: [DONE]\n\n")
+        writer.close()
+
+    server = await asyncio.start_server(handle, '127.0.0.1', 0)
+    port = server.sockets[0].getsockname()[1]
+    try:
+        yield f"http://127.0.0.1:{port}"
+    finally:
+        server.close()
+        for task in handlers:
+            task.cancel()
+        await asyncio.gather(*handlers, return_exceptions=True)
+        await close_http_client()
+
+
+@pytest.fixture
+def groq(monkeypatch):
+    monkeypatch.setattr(settings, 'GROQ_API_KEY', 'test')
+    monkeypatch.setattr(settings, 'GROQ_API_URL', settings.GROQ_API_URL)  # set per test to the fake server
+    monkeypatch.setattr(settings, 'GROQ_TIMEOUT', 0.3)
+    monkeypatch.setattr(settings, 'GROQ_FIRST_TOKEN_TIMEOUT', 0.5)
+    monkeypatch.setattr(settings, 'GROQ_STREAM_IDLE_TIMEOUT', 0.2)
+    client = GroqClient()
+    monkeypatch.setattr(bot, 'groq_client', client)
+    return client
+
+
+async def collect(client, script):
+    deltas = []
+    async with fake_groq(script) as url:
+        settings.GROQ_API_URL = url
+        try:
+            async for delta in client.stream([{'role': 'user', 'content': 'hi'}]):
+                deltas.append(delta)
+        except AIUnavailable as e:
+            return deltas, e.reason
+    return deltas, None
+
+
+def test_long_stream_outlives_the_call_deadline(groq):
+    # 0.5 s in total, past GROQ_TIMEOUT, but no gap reaches the idle timeout
+    script = [(0.1, f"{i} ") for i in range(5)]
+    assert asyncio.run(collect(groq, script)) == (["0 ", "1 ", "2 ", "3 ", "4 "], None)
+    assert list(groq.breaker.outcomes) == [True]
+
+
+def test_no_first_token_is_a_breaker_failure(groq):
+    assert asyncio.run(collect(groq, [(STALL, "late")])) == ([], 'timeout')
+    assert list(groq.breaker.outcomes) == [False]
+    assert groq.timeouts == 1
+
+
+def test_stall_after_first_token_is_not_a_breaker_failure(groq):
+    assert asyncio.run(collect(groq, [(0, "Hello"), (STALL, "late")])) == (["Hello"], 'timeout')
+    assert list(groq.breaker.outcomes) == [True]
+    assert groq.timeouts == 1
+    assert groq.in_flight == 0
+
+
+@pytest.fixture
+def telegram(monkeypatch):
+    """Records (text, parse_mode) of each edit of the placeholder; the final edit uses Markdown"""
+    edits = []
+
+    async def send_message(chat_id, text, parse_mode=None, **extra):
+        return {'message_id': 1}
+
+    async def edit_message_text(chat_id, message_id, text, parse_mode=None):
+        edits.append((text, parse_mode))
+        return {'message_id': message_id}
+
+    async def no_conversation(conversation_id):
+        return None
+
+    async def save_message(**kwargs):
+        return {}
+
+    monkeypatch.setattr(settings, 'GROQ_STREAMING', True)
+    monkeypatch.setattr(settings, 'TELEGRAM_EDIT_INTERVAL', 0.01)
+    monkeypatch.setattr(telegram_sender, 'send_message', send_message)
+    monkeypatch.setattr(telegram_sender, 'edit_message_text', edit_message_text)
+    monkeypatch.setattr(bot.conversation_memory, 'get', no_conversation)
+    monkeypatch.setattr(bot.chat_service, 'save_message', save_message)
+    return edits
+
+
+def test_streamed_reply_keeps_text_shown_before_a_stall(groq, telegram):
+    async def scenario():
+        async with fake_groq([(0, "Hello"), (0.05, " there"), (STALL, "late")]) as url:
+            settings.GROQ_API_URL = url
+            await bot.reply_with_ai('1', 'chat', '1', 'hi', persona='admin_assistant')
+
+    asyncio.run(scenario())
+    assert telegram[-1] == ("Hello there", "Markdown")
+
+
+def test_streamed_reply_falls_back_when_no_token_arrives(groq, telegram):
+    async def scenario():
+        async with fake_groq([(STALL, "late")]) as url:
+            settings.GROQ_API_URL = url
+            await bot.reply_with_ai('1', 'chat', '1', 'hi', persona='admin_assistant')
+
+    asyncio.run(scenario())
+    assert telegram[-1] == ("عذراً، في مشكلة في الاتصال بالذكاء الاصطناعي.", "Markdown")
+
+
+def test_unexpected_error_still_finalizes_the_placeholder(groq, telegram, monkeypatch):
+    async def broken(text, persona, on_text, conversation):
+        on_text("Partial")
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr(bot, 'ask_groq_ai', broken)
+    with pytest.raises(RuntimeError):
+        asyncio.run(bot.reply_with_ai('1', 'chat', '1', 'hi', persona='admin_assistant'))
+    assert telegram[-1] == ("Partial", "Markdown")
@@ -0,0 +1,70 @@
+import asyncio
+import time
+
+import pytest
+
+from api.config import settings
+from api.services.image_pool import ImageJobTimeout, ImagePoolBusy, ImageWorkerPool
+
+
+def test_thread_mode_runs_jobs():
+    pool = ImageWorkerPool(workers=0, queue_size=1, timeout=5)
+    assert asyncio.run(pool.run(pow, 2, 10)) == 1024
+    assert pool.completed == 1 and pool.pending == 0
+
+
+def test_full_queue_rejects_until_a_job_finishes():
+    async def scenario():
+        pool = ImageWorkerPool(workers=0, queue_size=1, timeout=5)
+        jobs = [asyncio.ensure_future(pool.run(time.sleep, 0.3)) for _ in range(pool.capacity)]
+        await asyncio.sleep(0.05)
+        with pytest.raises(ImagePoolBusy):
+            await pool.run(pow, 2, 10)
+        await asyncio.gather(*jobs)
+        return pool, await pool.run(pow, 2, 10)
+
+    pool, result = asyncio.run(scenario())
+    assert result == 1024
+    assert pool.rejected == 1 and pool.completed == 3 and pool.pending == 0
+
+
+def test_timed_out_job_still_holds_its_slot():
+    async def scenario():
+        pool = ImageWorkerPool(workers=0, queue_size=0, timeout=0.1)
+        with pytest.raises(ImageJobTimeout):
+            await pool.run(time.sleep, 0.5)
+        # The caller gave up, the worker has not: no room for another job yet
+        with pytest.raises(ImagePoolBusy):
+            await pool.run(pow, 2, 10)
+        await asyncio.sleep(0.6)
+        return pool, await pool.run(pow, 2, 10)
+
+    pool, result = asyncio.run(scenario())
+    assert result == 1024
+    assert pool.timeouts == 1 and pool.rejected == 1 and pool.pending == 0
+
+
+def test_process_mode_timeout_and_backpressure():
+    async def scenario():
+        pool = ImageWorkerPool(workers=1, queue_size=0, timeout=5)
+        try:
+            # Also starts the worker process
+            assert await pool.run(pow, 2, 10) == 1024
+            pool.timeout = 0.2
+            with pytest.raises(ImageJobTimeout):
+                await pool.run(time.sleep, 1)
+            with pytest.raises(ImagePoolBusy):
+                await pool.run(pow, 2, 10)
+        finally:
+            pool.close()
+        return pool
+
+    pool = asyncio.run(scenario())
+    assert pool.stats()['timeouts'] == 1 and pool.stats()['rejected'] == 1
+
+
+def test_serverless_defaults_to_thread_mode(monkeypatch):
+    monkeypatch.setattr(settings, 'SERVERLESS', True)
+    monkeypatch.setattr(settings, 'IMAGE_WORKERS', 4)
+    assert ImageWorkerPool().workers == 0
+    assert ImageWorkerPool(workers=2).workers == 2
@@ -0,0 +1,146 @@
+import asyncio
+import copy
+
+import pytest
+
+from api.config import settings
+from api.services import jsonbin_service
+from api.services.jsonbin_service import JsonBinService
+from api.services.storage_backend import StorageUnavailable
+
+BIN = {
+    'pages': [{'id': 'p1', 'slug': 'home', 'title': 'Home', 'is_published': True}],
+    'leads': [{'id': f'l{i}', 'name': f'Lead {i}', 'status': 'new'} for i in range(3)],
+}
+
+
+class Response:
+    def __init__(self, status_code, data=None):
+        self.status_code = status_code
+        self._data = data
+
+    def json(self):
+        return copy.deepcopy(self._data)
+
+
+class FakeBin:
+    """JSONBin stand-in: GET answers with `statuses` in turn (then 200), PUT replaces the document"""
+
+    def __init__(self, document, statuses=()):
+        self.document = copy.deepcopy(document)
+        self.statuses = list(statuses)
+        self.gets = 0
+        self.puts = 0
+
+    async def get(self, url, headers=None):
+        self.gets += 1
+        status = self.statuses.pop(0) if self.statuses else 200
+        return Response(status, self.document if status == 200 else None)
+
+    async def put(self, url, headers=None, json=None):
+        self.puts += 1
+        self.document = copy.deepcopy(json)
+        return Response(200)
+
+
+@pytest.fixture
+def fake_bin(monkeypatch):
+    def install(document=BIN, statuses=()):
+        remote = FakeBin(document, statuses)
+        monkeypatch.setattr(jsonbin_service, 'get_http_client', lambda: remote)
+        return remote
+    monkeypatch.setattr(settings, 'SERVERLESS', False)
+    monkeypatch.setattr(settings, 'JSONBIN_FLUSH_INTERVAL', 0.05)
+    return install
+
+
+def test_unreadable_bin_is_never_overwritten(fake_bin):
+    remote = fake_bin(statuses=[503, 503])
+
+    async def scenario():
+        service = JsonBinService()
+        assert await service.get_leads() == []
+        with pytest.raises(StorageUnavailable):
+            await service.create_lead({'name': 'New'})
+        await service.close()
+        return remote.puts
+
+    assert asyncio.run(scenario()) == 0
+    assert remote.document == BIN
+
+
+def test_write_after_a_failed_read_recovers_the_bin(fake_bin):
+    remote = fake_bin(statuses=[503])
+
+    async def scenario():
+        service = JsonBinService()
+        await service.get_pages()
+        await service.create_lead({'name': 'New'})
+        await service.close()
+
+    asyncio.run(scenario())
+    assert len(remote.document['leads']) == 4
+    assert remote.document['pages'] == BIN['pages']
+
+
+def test_burst_of_saves_costs_one_put(fake_bin):
+    remote = fake_bin()
+
+    async def scenario():
+        service = JsonBinService()
+        for i in range(10):
+            await service.create_lead({'name': f'Burst {i}'})
+        await asyncio.sleep(settings.JSONBIN_FLUSH_INTERVAL * 3)
+        puts = remote.puts
+        await service.close()
+        return puts
+
+    assert asyncio.run(scenario()) == 1
+    assert remote.gets == 1
+    assert len(remote.document['leads']) == 13
+
+
+def test_close_flushes_pending_writes(fake_bin, monkeypatch):
+    monkeypatch.setattr(settings, 'JSONBIN_FLUSH_INTERVAL', 60)
+    remote = fake_bin()
+
+    async def scenario():
+        service = JsonBinService()
+        await service.create_lead({'name': 'Late'})
+        assert remote.puts == 0
+        await service.close()
+
+    asyncio.run(scenario())
+    assert remote.puts == 1
+    assert [lead['name'] for lead in remote.document['leads']][-1] == 'Late'
+
+
+def test_serverless_write_is_saved_before_it_returns(fake_bin, monkeypatch):
+    monkeypatch.setattr(settings, 'SERVERLESS', True)
+    remote = fake_bin()
+
+    async def scenario():
+        service = JsonBinService()
+        await service.get_leads()
+        # Another instance adds a lead behind this one's snapshot
+        remote.document['leads'].append({'id': 'other', 'name': 'Other instance'})
+        await service.create_lead({'name': 'Mine'})
+        return remote.puts
+
+    assert asyncio.run(scenario()) == 1
+    assert {lead['name'] for lead in remote.document['leads']} >= {'Other instance', 'Mine'}
+
+
+def test_serverless_write_fails_when_the_bin_cannot_be_read(fake_bin, monkeypatch):
+    monkeypatch.setattr(settings, 'SERVERLESS', True)
+    remote = fake_bin()
+
+    async def scenario():
+        service = JsonBinService()
+        await service.get_leads()
+        remote.statuses = [503]
+        with pytest.raises(StorageUnavailable):
+            await service.create_lead({'name': 'Stale'})
+
+    asyncio.run(scenario())
+    assert remote.puts == 0
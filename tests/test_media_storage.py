@@ -0,0 +1,66 @@
+import asyncio
+
+import pytest
+
+from api.services.image_optimizer import ALLOWED_FORMATS, file_extension
+from api.services.media_storage import LocalStorage
+
+
+@pytest.fixture
+def storage(tmp_path):
+    return LocalStorage(str(tmp_path), "/media")
+
+
+def test_every_upload_format_can_be_stored():
+    formats = {file_extension(f) for f in ALLOWED_FORMATS} | {'webp', 'avif'}
+    assert formats <= set(LocalStorage.EXTENSIONS)
+
+
+def test_put_and_delete(storage, tmp_path):
+    files = [
+        (b'original', 'originals/abc', 'jpg'),
+        (b'webp', 'optimized/abc_w640_webp', 'webp'),
+        (b'avif', 'optimized/abc_w640_avif', 'avif'),
+        (b'other', 'originals/abcd', 'png'),
+    ]
+    stored = asyncio.run(storage.put_many(files))
+    assert stored[0] == {'url': '/media/originals/abc.jpg', 'public_id': 'originals/abc'}
+    (tmp_path / 'originals' / 'abc.jpg.part').write_bytes(b'upload in progress')
+
+    assert asyncio.run(storage.delete_many(['originals/abc', 'optimized/abc_w640_webp', 'optimized/abc_w640_avif']))
+    assert sorted(p.name for p in tmp_path.rglob('*') if p.is_file()) == ['abc.jpg.part', 'abcd.png']
+
+
+def test_unknown_format_is_refused(storage):
+    with pytest.raises(ValueError):
+        asyncio.run(storage.put_many([(b'x', 'originals/abc', 'exe')]))
+    assert storage.retries == 0
+
+
+def test_public_id_cannot_leave_the_root(storage):
+    with pytest.raises(ValueError):
+        asyncio.run(storage.put_many([(b'x', '../outside', 'png')]))
+
+
+def test_failed_upload_only_deletes_the_files_it_created(storage, tmp_path):
+    # Stored meanwhile by another upload of the same content
+    asyncio.run(storage.put_many([(b'original', 'originals/abc', 'jpg')]))
+    files = [
+        (b'original', 'originals/abc', 'jpg'),
+        (b'webp', 'optimized/abc_w640_webp', 'webp'),
+        (b'x', 'optimized/abc_bad', 'exe'),
+    ]
+    with pytest.raises(ValueError):
+        asyncio.run(storage.put_many(files))
+    assert [p.relative_to(tmp_path).as_posix() for p in tmp_path.rglob('*') if p.is_file()] == ['originals/abc.jpg']
+
+
+def test_existing_file_is_kept_and_created_once(storage, tmp_path):
+    async def scenario():
+        return await asyncio.gather(*(storage.put_many([(b'same', 'originals/abc', 'png')]) for _ in range(5)))
+
+    results = asyncio.run(scenario())
+    assert all(result == [{'url': '/media/originals/abc.png', 'public_id': 'originals/abc'}] for result in results)
+    assert storage._put(b'other', 'originals/abc', 'png')['created'] is False
+    assert (tmp_path / 'originals' / 'abc.png').read_bytes() == b'same'
+    assert not list(tmp_path.rglob('*.part'))
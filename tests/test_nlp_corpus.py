@@ -0,0 +1,21 @@
+import pytest
+
+from api.services.nlp_service import NLPCommandProcessor
+from benchmarks.eval_nlp import is_known_gap, load_corpus, run_case
+
+CASES = load_corpus()["cases"]
+
+
+def test_known_gaps_are_the_documented_two():
+    assert sum(map(is_known_gap, CASES)) == 2
+
+
+@pytest.mark.parametrize("case", [
+    pytest.param(case, id=case["id"], marks=pytest.mark.xfail(reason=case["note"], strict=True))
+    if is_known_gap(case) else pytest.param(case, id=case["id"])
+    for case in CASES
+])
+def test_corpus_case(case):
+    result = run_case(NLPCommandProcessor(), case)
+    expected = {key: case.get(key) for key in result["got"]}
+    assert result["got"] == expected
@@ -0,0 +1,102 @@
+import asyncio
+
+import pytest
+from starlette.testclient import TestClient
+
+from api.config import settings
+from api.services import page_cache as page_cache_module
+from api.services.page_cache import PageCache, etag_matches
+
+
+@pytest.fixture
+def client():
+    from api.index import app, create_access_token
+    client = TestClient(app)
+    client.headers['Authorization'] = f"Bearer {create_access_token({'sub': settings.ADMIN_USERNAME})}"
+    return client
+
+
+def page(slug, title, published=True):
+    return {'slug': slug, 'title': title, 'is_published': published,
+            'content': {'html': f'<h1>{title}</h1>', 'css': ''}}
+
+
+@pytest.mark.parametrize('header, expected', [
+    ('"abc"', True),
+    ('W/"abc"', True),
+    ('"other", W/"abc"', True),
+    ('*', True),
+    ('"other"', False),
+    (None, False),
+])
+def test_etag_matches_uses_weak_comparison(header, expected):
+    assert etag_matches(header, '"abc"') is expected
+
+
+def test_unchanged_page_revalidates_with_304(client):
+    client.post('/api/pages', json=page('cache-304', 'First'))
+    first = client.get('/api/pages/cache-304')
+    assert first.status_code == 200 and first.json()['title'] == 'First'
+    etag = first.headers['etag']
+    assert 'max-age' in first.headers['cache-control']
+
+    again = client.get('/api/pages/cache-304', headers={'If-None-Match': etag})
+    assert again.status_code == 304 and again.content == b''
+    # Weak when an encoding was negotiated; the opaque tag is the same
+    assert again.headers['etag'].removeprefix('W/') == etag.removeprefix('W/')
+
+
+def test_saving_a_page_invalidates_its_cache_entry(client):
+    client.post('/api/pages', json=page('cache-save', 'Before'))
+    before = client.get('/api/pages/cache-save')
+    client.post('/api/pages', json=page('cache-save', 'After'))
+
+    after = client.get('/api/pages/cache-save', headers={'If-None-Match': before.headers['etag']})
+    assert after.status_code == 200
+    assert after.json()['title'] == 'After'
+    assert after.headers['etag'] != before.headers['etag']
+
+
+def test_deleting_a_page_invalidates_it_by_id(client):
+    saved = client.post('/api/pages', json=page('cache-delete', 'Doomed')).json()
+    assert client.get('/api/pages/cache-delete').status_code == 200
+    client.delete(f"/api/pages/{saved['id']}")
+    assert client.get('/api/pages/cache-delete').status_code == 404
+
+
+def test_prerendered_page_revalidates_with_304(client):
+    client.post('/api/pages', json=page('cache-html', 'Static'))
+    first = client.get('/cache-html')
+    assert first.status_code == 200 and '<h1>Static</h1>' in first.text
+    again = client.get('/cache-html', headers={'If-None-Match': first.headers['etag']})
+    assert again.status_code == 304
+
+    client.post('/api/pages', json=page('cache-html', 'Restyled'))
+    changed = client.get('/cache-html', headers={'If-None-Match': first.headers['etag']})
+    assert changed.status_code == 200 and '<h1>Restyled</h1>' in changed.text
+
+
+def test_read_started_before_an_invalidation_is_not_cached(monkeypatch):
+    release = asyncio.Event()
+    versions = iter(['old', 'new'])
+
+    async def get_page(slug):
+        title = next(versions)
+        if title == 'old':
+            await release.wait()
+        return {'id': '1', 'slug': slug, 'title': title}
+
+    monkeypatch.setattr(page_cache_module.db, 'get_page', get_page)
+
+    async def scenario():
+        cache = PageCache()
+        stale = asyncio.ensure_future(cache.get('race'))
+        await asyncio.sleep(0)
+        cache.invalidate(slug='race')
+        release.set()
+        await stale
+        return await cache.get('race'), cache
+
+    entry, cache = asyncio.run(scenario())
+    assert b'"new"' in entry.body
+    assert cache.misses == 2
@@ -0,0 +1,30 @@
+from api.services.page_renderer import minify_css
+
+
+def test_minifies_whitespace_and_drops_duplicate_rules():
+    css = """
+    .a ,  .b > p {  color : red ;  margin : 0 auto ; }
+    /* note */
+    @media (max-width: 600px) {  .a { color : blue ; }  }
+    .a ,  .b > p {  color : red ;  margin : 0 auto ; }
+    """
+    assert minify_css(css) == "@media (max-width: 600px){.a{color:blue}}.a,.b>p{color:red;margin:0 auto}"
+
+
+def test_quoted_values_are_kept_verbatim():
+    css = """
+    .tag::before { content: "a : b" ; }
+    .quote::after { content: 'x ,  y  ; z' }
+    [title="x y"] , a[href$=' .pdf'] { font-family: "Open  Sans" , serif; }
+    .note::before { content: "/* not a comment */"; }
+    """
+    assert minify_css(css) == (
+        '.tag::before{content:"a : b"}'
+        ".quote::after{content:'x ,  y  ; z'}"
+        '[title="x y"],a[href$=\' .pdf\']{font-family:"Open  Sans",serif}'
+        '.note::before{content:"/* not a comment */"}'
+    )
+
+
+def test_escaped_quotes_stay_inside_the_string():
+    assert minify_css(r'.q::before { content: "say \"hi , there\"" ; }') == r'.q::before{content:"say \"hi , there\""}'
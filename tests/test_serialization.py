@@ -0,0 +1,92 @@
+import gzip
+
+import brotli
+import pytest
+from starlette.applications import Starlette
+from starlette.responses import Response
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from api.services.serialization import CompressionMiddleware, choose_encoding
+
+ETAG = '"abc123"'
+LARGE = b'{"items":[' + b','.join(b'{"id":%d,"name":"unit"}' % i for i in range(200)) + b']}'
+SMALL = b'{"ok":true}'
+
+
+async def large(request):
+    if request.headers.get('if-none-match'):
+        return Response(status_code=304, headers={'ETag': ETAG})
+    return Response(LARGE, media_type='application/json', headers={'ETag': ETAG})
+
+
+async def small(request):
+    return Response(SMALL, media_type='application/json', headers={'ETag': ETAG})
+
+
+async def binary(request):
+    return Response(b'\x89PNG' + bytes(4096), media_type='image/png')
+
+
+@pytest.fixture
+def client():
+    app = Starlette(routes=[Route('/large', large), Route('/small', small), Route('/binary', binary)])
+    app.add_middleware(CompressionMiddleware, minimum_size=1024)
+    return TestClient(app)
+
+
+@pytest.mark.parametrize('header, expected', [
+    ('gzip, deflate, br', 'br'),
+    ('gzip', 'gzip'),
+    ('br;q=0.5, gzip;q=0.8', 'gzip'),
+    ('br;q=0, gzip;q=0', None),
+    ('*', 'br'),
+    ('identity', None),
+    ('', None),
+])
+def test_choose_encoding(header, expected):
+    assert choose_encoding(header) == expected
+
+
+def raw_body(client, path, headers) -> bytes:
+    """Body as sent, before the test client decodes Content-Encoding"""
+    with client.stream('GET', path, headers=headers) as response:
+        return b''.join(response.iter_raw())
+
+
+@pytest.mark.parametrize('encoding, decode', [('br', brotli.decompress), ('gzip', gzip.decompress)])
+def test_large_body_is_compressed_with_a_weak_etag(client, encoding, decode):
+    headers = {'Accept-Encoding': encoding}
+    response = client.get('/large', headers=headers)
+    assert response.headers['content-encoding'] == encoding
+    assert response.headers['vary'] == 'Accept-Encoding'
+    assert response.headers['etag'] == 'W/' + ETAG
+    raw = raw_body(client, '/large', headers)
+    assert int(response.headers['content-length']) == len(raw) < len(LARGE)
+    assert decode(raw) == LARGE
+
+
+def test_identity_body_keeps_the_strong_etag(client):
+    response = client.get('/large', headers={'Accept-Encoding': 'identity'})
+    assert 'content-encoding' not in response.headers
+    assert response.headers['etag'] == ETAG
+    assert response.content == LARGE
+
+
+def test_body_below_the_threshold_is_not_compressed(client):
+    response = client.get('/small', headers={'Accept-Encoding': 'br, gzip'})
+    assert 'content-encoding' not in response.headers
+    assert response.headers['etag'] == ETAG
+    assert response.content == SMALL
+
+
+def test_binary_types_are_not_compressed(client):
+    response = client.get('/binary', headers={'Accept-Encoding': 'gzip'})
+    assert 'content-encoding' not in response.headers
+
+
+def test_not_modified_carries_the_weak_etag_of_the_encoded_body(client):
+    response = client.get('/large', headers={'Accept-Encoding': 'gzip', 'If-None-Match': 'W/' + ETAG})
+    assert response.status_code == 304
+    assert response.headers['etag'] == 'W/' + ETAG
+    assert 'content-encoding' not in response.headers
@@ -0,0 +1,51 @@
+import asyncio
+
+import pytest
+
+from api.services.sqlite_service import SQLiteService
+
+UNIT = {'unit_number': '101', 'unit_type': 'residential', 'area_sqm': 120, 'price_per_sqm': 500}
+
+
+@pytest.fixture
+def db(tmp_path):
+    service = SQLiteService(str(tmp_path / 'test.db'))
+    yield service
+    asyncio.run(service.close())
+
+
+def test_generated_column_is_selectable(db):
+    async def scenario():
+        project = await db.create_project({'name': 'Tower'})
+        await db.create_unit(dict(UNIT, project_id=project['id']))
+        await db.create_unit(dict(UNIT, project_id=project['id'], unit_number='102', price_per_sqm=800))
+        return await db.paginate('units', fields=['unit_number', 'total_price'], sort='total_price')
+
+    page = asyncio.run(scenario())
+    assert page['items'] == [
+        {'unit_number': '102', 'total_price': 96000.0},
+        {'unit_number': '101', 'total_price': 60000.0},
+    ]
+
+
+def test_generated_column_is_not_written(db):
+    async def scenario():
+        unit = await db._insert('units', dict(UNIT, total_price=1))
+        return await db._update('units', 'id', unit['id'], {'total_price': 2, 'area_sqm': 100})
+
+    assert asyncio.run(scenario())['total_price'] == 50000.0
+
+
+def test_unknown_filter_column_is_an_error(db):
+    async def scenario():
+        await db.create_project({'name': 'Tower', 'status': 'active'})
+        with pytest.raises(ValueError, match='projects.stauts'):
+            await db._select('projects', {'stauts': 'archived'})
+        with pytest.raises(ValueError):
+            await db.paginate('projects', {'stauts': 'archived'})
+        # Generated columns can be filtered on even though they are never written
+        unit = await db._insert('units', UNIT)
+        return await db._select('units', {'total_price': 60000.0}), unit
+
+    rows, unit = asyncio.run(scenario())
+    assert [row['id'] for row in rows] == [unit['id']]
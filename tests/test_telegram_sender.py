@@ -0,0 +1,134 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+
+from api.config import settings
+from api.services import telegram_sender as telegram_module
+from api.services.telegram_sender import TelegramSender, TokenBucket
+
+
+class FakeBotApi:
+    """Answers each POST with the next scripted (status, body), then 200"""
+
+    def __init__(self, script=()):
+        self.script = list(script)
+        self.calls = []
+
+    async def post(self, url, json=None):
+        self.calls.append((url.rsplit('/', 1)[1], json, time.monotonic()))
+        status, body = self.script.pop(0) if self.script else (200, {'ok': True, 'result': {'message_id': len(self.calls)}})
+        return httpx.Response(status, json=body)
+
+
+@pytest.fixture
+def bot_api(monkeypatch):
+    monkeypatch.setattr(settings, 'TELEGRAM_CHAT_RATE', 1000)
+    monkeypatch.setattr(settings, 'TELEGRAM_BACKOFF_BASE', 0.01)
+    monkeypatch.setattr(settings, 'TELEGRAM_MAX_RETRIES', 2)
+
+    def install(script=()):
+        api = FakeBotApi(script)
+        monkeypatch.setattr(telegram_module, 'get_http_client', lambda: api)
+        return api
+    return install
+
+
+def test_token_bucket_spends_its_burst_then_paces():
+    bucket = TokenBucket(rate=10, capacity=2)
+    assert [bucket.reserve() for _ in range(2)] == [0.0, 0.0]
+    assert bucket.reserve() == pytest.approx(0.1, abs=0.01)
+    assert bucket.reserve() == pytest.approx(0.2, abs=0.01)
+
+
+def test_token_bucket_pause_holds_reservations():
+    bucket = TokenBucket(rate=100, capacity=100)
+    bucket.pause(1.0)
+    assert bucket.reserve() == pytest.approx(1.0, abs=0.01)
+    # A shorter pause never shortens a longer one
+    bucket.pause(0.1)
+    assert bucket.reserve() == pytest.approx(1.0, abs=0.01)
+
+
+def test_backoff_grows_exponentially_with_jitter_up_to_the_cap(monkeypatch):
+    monkeypatch.setattr(settings, 'TELEGRAM_BACKOFF_BASE', 0.5)
+    monkeypatch.setattr(settings, 'TELEGRAM_BACKOFF_MAX', 30)
+    for attempt, full in [(0, 0.5), (1, 1.0), (3, 4.0), (10, 30)]:
+        delays = [TelegramSender._backoff(attempt) for _ in range(50)]
+        assert all(full / 2 <= delay <= full for delay in delays)
+
+
+def test_retry_after_pauses_the_chat_and_the_bot(bot_api):
+    api = bot_api([(429, {'ok': False, 'description': 'Too Many Requests', 'parameters': {'retry_after': 0.2}})])
+
+    async def scenario():
+        sender = TelegramSender()
+        result = await sender.send_message('42', 'hi')
+        return sender, result
+
+    sender, result = asyncio.run(scenario())
+    assert result == {'message_id': 2}
+    assert api.calls[1][2] - api.calls[0][2] >= 0.2
+    assert sender.throttled == 1 and sender.retries == 1
+    assert sender.global_bucket.paused_until == pytest.approx(sender.chat_buckets['42'].paused_until)
+    assert sender.global_bucket.paused_until > 0
+
+
+def test_server_errors_are_retried_then_given_up(bot_api):
+    api = bot_api([(502, {'ok': False, 'description': 'Bad Gateway'})] * 3)
+
+    async def scenario():
+        sender = TelegramSender()
+        return sender, await sender.send_message('42', 'hi')
+
+    sender, result = asyncio.run(scenario())
+    assert result is None
+    assert len(api.calls) == settings.TELEGRAM_MAX_RETRIES + 1
+    assert sender.retries == 2 and sender.failed == 1
+
+
+def test_rejected_request_is_not_retried(bot_api):
+    api = bot_api([(403, {'ok': False, 'description': 'Forbidden: bot was blocked by the user'})])
+
+    async def scenario():
+        sender = TelegramSender()
+        return sender, await sender.send_message('42', 'hi')
+
+    sender, result = asyncio.run(scenario())
+    assert result is None and len(api.calls) == 1
+    assert sender.retries == 0 and sender.failed == 1
+
+
+def test_invalid_markdown_is_resent_as_plain_text(bot_api):
+    api = bot_api([(400, {'ok': False, 'description': "Bad Request: can't parse entities"})])
+
+    async def scenario():
+        return await TelegramSender().send_message('42', '*unclosed')
+
+    assert asyncio.run(scenario()) == {'message_id': 2}
+    assert 'parse_mode' in api.calls[0][1] and 'parse_mode' not in api.calls[1][1]
+
+
+def test_send_broadcast_waits_for_every_chat(bot_api):
+    api = bot_api([(403, {'ok': False, 'description': 'Forbidden'})])
+
+    async def scenario():
+        return await TelegramSender().send_broadcast(['1', '2', '2', '3'], 'news')
+
+    assert asyncio.run(scenario()) == {'sent': 2, 'failed': 1}
+    assert sorted(call[1]['chat_id'] for call in api.calls) == ['1', '2', '3']
+
+
+def test_broadcast_endpoint_sends_inline_on_serverless(bot_api, monkeypatch):
+    from starlette.testclient import TestClient
+    from api.index import app, create_access_token, telegram_sender
+
+    api = bot_api()
+    monkeypatch.setattr(settings, 'SERVERLESS', True)
+    client = TestClient(app)
+    client.headers['Authorization'] = f"Bearer {create_access_token({'sub': settings.ADMIN_USERNAME})}"
+    response = client.post('/api/telegram/broadcast', json={'text': 'news', 'chat_ids': ['1', '2']})
+    assert response.json() == {'sent': 2, 'failed': 0}
+    assert len(api.calls) == 2
+    assert telegram_sender.stats()['broadcast_queue'] == 0
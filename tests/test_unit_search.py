@@ -0,0 +1,108 @@
+import asyncio
+
+import pytest
+
+from api.config import settings
+from api.services import unit_search as unit_search_module
+from api.services.sqlite_service import SQLiteService
+from api.services.unit_search import UnitSearchEngine
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    service = SQLiteService(str(tmp_path / 'test.db'))
+    monkeypatch.setattr(unit_search_module, 'db', service)
+    yield service
+    asyncio.run(service.close())
+
+
+async def seed(db):
+    hamad = await db.create_project({'name': 'Hamad Tower'})
+    lilian = await db.create_project({'name': 'Lilian Tower'})
+    units = [
+        # project, number, bedrooms, floor, area, price/m², status
+        (hamad, 'H1', 2, 3, 100, 15000, 'available'),   # 1.5M
+        (hamad, 'H2', 2, 5, 120, 15000, 'available'),   # 1.8M
+        (hamad, 'H3', 3, 7, 150, 16000, 'available'),   # 2.4M
+        (hamad, 'H4', 2, 2, 90, 14000, 'sold'),         # 1.26M
+        (lilian, 'L1', 2, 4, 110, 12000, 'available'),  # 1.32M
+        (lilian, 'L2', 4, 9, 200, 13000, 'available'),  # 2.6M
+    ]
+    for project, number, bedrooms, floor, area, price, status in units:
+        await db.create_unit({
+            'project_id': project['id'], 'unit_number': number, 'unit_type': 'residential',
+            'bedrooms': bedrooms, 'bathrooms': 1, 'floor_number': floor,
+            'area_sqm': area, 'price_per_sqm': price, 'status': status
+        })
+    return hamad, lilian
+
+
+def numbers(result):
+    return [unit['unit_number'] for unit in result['units']]
+
+
+def test_exact_matches_are_ranked_cheapest_first(db):
+    async def scenario():
+        await seed(db)
+        return await UnitSearchEngine().search({'bedrooms': 2})
+
+    result = asyncio.run(scenario())
+    # Sold units are out of scope
+    assert (result['exact'], result['total']) == (True, 3)
+    assert numbers(result) == ['L1', 'H1', 'H2']
+
+
+def test_price_range_and_project_alias(db):
+    async def scenario():
+        await seed(db)
+        engine = UnitSearchEngine()
+        return (
+            await engine.search({'price_max': 2000000}, project='hamad-tower'),
+            await engine.search({'price_min': 2000000}),
+        )
+
+    cheap_hamad, expensive = asyncio.run(scenario())
+    assert numbers(cheap_hamad) == ['H1', 'H2']
+    assert numbers(expensive) == ['H3', 'L2']
+
+
+def test_nearest_units_when_nothing_matches(db):
+    async def scenario():
+        hamad, _ = await seed(db)
+        return await UnitSearchEngine().search({'bedrooms': 3, 'floor_number': 6, 'price_max': 2000000}, project=hamad['id'])
+
+    result = asyncio.run(scenario())
+    assert (result['exact'], result['total']) == (False, 0)
+    # H3 has the rooms and is one floor away but over budget; H2 is one room
+    # short and one floor away but within it
+    assert numbers(result)[:2] == ['H3', 'H2']
+    assert 'H4' not in numbers(result)
+
+
+def test_ranking_stops_at_the_deadline(db, monkeypatch):
+    async def scenario(budget_ms):
+        monkeypatch.setattr(settings, 'UNIT_SEARCH_BUDGET_MS', budget_ms)
+        engine = UnitSearchEngine()
+        await engine.refresh(force=True)
+        # 3000 units with 1 bedroom, then the only one with 5, scanned last
+        for i in range(3000):
+            engine.upsert({'id': f'u{i}', 'unit_number': str(i), 'status': 'available', 'bedrooms': 1, 'total_price': 1000})
+        engine.upsert({'id': 'best', 'unit_number': 'best', 'status': 'available', 'bedrooms': 4, 'total_price': 1000})
+        return await engine.search({'bedrooms': 5}, limit=1)
+
+    assert numbers(asyncio.run(scenario(10000))) == ['best']
+    # A spent budget stops after the first block of candidates, still answering
+    assert numbers(asyncio.run(scenario(0))) != ['best']
+    assert len(asyncio.run(scenario(0))['units']) == 1
+
+
+def test_overview_of_available_stock(db):
+    async def scenario():
+        await seed(db)
+        return await UnitSearchEngine().overview('lilian-tower')
+
+    overview = asyncio.run(scenario())
+    assert overview['available'] == 2
+    assert (overview['price_min'], overview['price_max']) == (1320000.0, 2600000.0)
+    assert overview['bedrooms'] == [2, 4]
+    assert [p['name'] for p in overview['projects']] == ['Lilian Tower']
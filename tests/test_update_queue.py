@@ -0,0 +1,96 @@
+import asyncio
+import os
+import subprocess
+import sys
+
+import pytest
+
+from api.services.update_queue import QueueFull, UpdateDispatcher
+
+
+def message(update_id: int, chat_id: int = 1) -> dict:
+    return {'update_id': update_id, 'message': {'chat': {'id': chat_id}, 'text': str(update_id)}}
+
+
+def test_duplicate_update_ids_are_dropped():
+    async def scenario():
+        handled = []
+
+        async def handler(update):
+            handled.append(update['update_id'])
+
+        dispatcher = UpdateDispatcher(handler, workers=2)
+        accepted = [await dispatcher.submit(message(update_id)) for update_id in (1, 2, 1, 3, 2)]
+        await dispatcher.close()
+        return accepted, handled, dispatcher.duplicates
+
+    accepted, handled, duplicates = asyncio.run(scenario())
+    assert accepted == [True, True, False, True, False]
+    assert handled == [1, 2, 3]
+    assert duplicates == 2
+
+
+def test_inline_dispatcher_drops_duplicates():
+    async def scenario():
+        handled = []
+
+        async def handler(update):
+            handled.append(update['update_id'])
+
+        dispatcher = UpdateDispatcher(handler, workers=0)
+        accepted = [await dispatcher.submit(message(update_id)) for update_id in (7, 7)]
+        return accepted, handled
+
+    assert asyncio.run(scenario()) == ([True, False], [7])
+
+
+def test_close_drains_queued_updates():
+    async def scenario():
+        handled = []
+        release = asyncio.Event()
+
+        async def handler(update):
+            await release.wait()
+            await asyncio.sleep(0.01)
+            handled.append(update['update_id'])
+
+        dispatcher = UpdateDispatcher(handler, workers=2)
+        for update_id in range(6):
+            await dispatcher.submit(message(update_id, chat_id=update_id % 3))
+        assert handled == []
+        release.set()
+        await dispatcher.close(timeout=5)
+        return handled, dispatcher.tasks
+
+    handled, tasks = asyncio.run(scenario())
+    assert sorted(handled) == list(range(6))
+    assert tasks == []
+
+
+def test_full_queue_rejects_without_remembering():
+    async def scenario():
+        release = asyncio.Event()
+
+        async def handler(update):
+            await release.wait()
+
+        dispatcher = UpdateDispatcher(handler, workers=1, queue_size=1)
+        await dispatcher.submit(message(1))
+        await asyncio.sleep(0)  # the worker takes update 1 off the queue
+        await dispatcher.submit(message(2))
+        with pytest.raises(QueueFull):
+            await dispatcher.submit(message(3))
+        release.set()
+        await dispatcher.close(timeout=5)
+        # A rejected update is accepted when Telegram redelivers it
+        return await dispatcher.submit(message(3))
+
+    assert asyncio.run(scenario()) is True
+
+
+def test_vercel_processes_inline():
+    env = dict(os.environ, VERCEL='1', WEBHOOK_WORKERS='4')
+    code = 'from api.services.update_queue import update_dispatcher; print(update_dispatcher.worker_count)'
+    out = subprocess.run([sys.executable, '-c', code],
+                         capture_output=True, text=True, env=env, check=True).stdout
+    assert out.strip() == '0'
@@ -0,0 +1,155 @@
+import asyncio
+import hashlib
+import io
+import os
+import tracemalloc
+
+import pytest
+from PIL import Image
+from starlette.requests import Request
+from starlette.testclient import TestClient
+
+from api.config import settings
+from api.services.upload_spool import (
+    CHUNK_SIZE, MULTIPART_OVERHEAD, BadUpload, UploadTooLarge, spool_request
+)
+
+BOUNDARY = 'kayan-test-boundary'
+MB = 1024 * 1024
+
+
+class StreamedBody:
+    """ASGI receive() sending a multipart body in 64 KB messages, counting what was read"""
+
+    def __init__(self, size: int, field: str = 'file', byte: bytes = b'x'):
+        self.size = size
+        self.head = (
+            f'--{BOUNDARY}\r\nContent-Disposition: form-data; name="note"\r\n\r\nhello\r\n'
+            f'--{BOUNDARY}\r\nContent-Disposition: form-data; name="{field}"; filename="photo.jpg"\r\n'
+            'Content-Type: image/jpeg\r\n\r\n'
+        ).encode()
+        self.tail = f'\r\n--{BOUNDARY}--\r\n'.encode()
+        self.block = byte * (64 * 1024)
+        self.sent = 0
+        self._messages = self._generate()
+
+    def _generate(self):
+        yield self.head
+        left = self.size
+        while left > 0:
+            yield self.block[:left] if left < len(self.block) else self.block
+            left -= len(self.block)
+        yield self.tail
+
+    @property
+    def length(self) -> int:
+        return len(self.head) + self.size + len(self.tail)
+
+    async def receive(self):
+        body = next(self._messages, None)
+        self.sent += len(body or b'')
+        return {'type': 'http.request', 'body': body or b'', 'more_body': body is not None}
+
+    def request(self, content_length: bool = True) -> Request:
+        headers = [(b'content-type', f'multipart/form-data; boundary={BOUNDARY}'.encode())]
+        if content_length:
+            headers.append((b'content-length', str(self.length).encode()))
+        scope = {'type': 'http', 'method': 'POST', 'path': '/api/media/upload', 'headers': headers, 'query_string': b''}
+        return Request(scope, self.receive)
+
+
+def spool_files() -> list:
+    return [name for name in os.listdir(settings.MEDIA_SPOOL_DIR) if name.startswith('upload-')]
+
+
+def test_file_field_is_spooled_and_hashed():
+    body = StreamedBody(3 * MB + 123)
+
+    async def scenario():
+        async with await spool_request(body.request()) as upload:
+            with open(upload.path, 'rb') as f:
+                return upload.size, upload.content_hash, upload.filename, upload.content_type, f.read()
+
+    size, content_hash, filename, content_type, data = asyncio.run(scenario())
+    assert size == len(data) == 3 * MB + 123
+    assert data == b'x' * size
+    assert content_hash == hashlib.blake2b(data, digest_size=32).hexdigest()
+    assert (filename, content_type) == ('photo.jpg', 'image/jpeg')
+    assert spool_files() == []
+
+
+def test_memory_stays_bounded_while_spooling():
+    body = StreamedBody(40 * MB)
+
+    async def scenario():
+        tracemalloc.start()
+        try:
+            async with await spool_request(body.request(), max_size=64 * MB) as upload:
+                size = upload.size
+            return size, tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    size, peak = asyncio.run(scenario())
+    assert size == 40 * MB
+    # One write buffer (plus its joined copy), never the upload
+    assert peak < 2 * CHUNK_SIZE + 2 * MB
+
+
+def test_declared_oversize_is_refused_before_reading():
+    body = StreamedBody(5 * MB)
+    with pytest.raises(UploadTooLarge):
+        asyncio.run(spool_request(body.request(), max_size=MB))
+    assert body.sent == 0
+
+
+def test_streamed_oversize_is_cut_off_at_the_limit():
+    body = StreamedBody(50 * MB)
+    with pytest.raises(UploadTooLarge):
+        asyncio.run(spool_request(body.request(content_length=False), max_size=MB))
+    assert body.sent <= MB + MULTIPART_OVERHEAD + 64 * 1024
+    assert spool_files() == []
+
+
+def test_missing_file_field_is_a_bad_upload():
+    body = StreamedBody(1024, field='image')
+    with pytest.raises(BadUpload):
+        asyncio.run(spool_request(body.request()))
+    assert spool_files() == []
+
+
+@pytest.fixture
+def client():
+    from api.index import app, create_access_token
+    client = TestClient(app)
+    client.headers['Authorization'] = f"Bearer {create_access_token({'sub': settings.ADMIN_USERNAME})}"
+    return client
+
+
+def png(size=(64, 48), color=(200, 30, 30)) -> bytes:
+    buffer = io.BytesIO()
+    Image.new('RGB', size, color).save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+def test_upload_endpoint_stores_and_deduplicates(client):
+    data = png()
+    first = client.post('/api/media/upload', files={'file': ('red.png', data, 'image/png')})
+    assert first.status_code == 200, first.text
+    media = first.json()
+    assert media['content_hash'] == hashlib.blake2b(data, digest_size=32).hexdigest()
+    assert (media['filename'], media['file_type'], media['width']) == ('red.png', 'image/png', 64)
+
+    again = client.post('/api/media/upload', files={'file': ('copy.png', data, 'image/png')})
+    assert again.json()['id'] == media['id']
+
+
+def test_upload_endpoint_rejects_oversize_and_bad_bodies(client, monkeypatch):
+    monkeypatch.setattr(settings, 'MEDIA_MAX_UPLOAD_SIZE', 100 * 1024)
+    big = client.post('/api/media/upload', files={'file': ('big.png', b'\x89PNG' + os.urandom(200 * 1024), 'image/png')})
+    assert big.status_code == 413
+
+    assert client.post('/api/media/upload', json={'file': 'nope'}).status_code == 400
+    assert client.post('/api/media/upload', files={'image': ('a.png', png(), 'image/png')}).status_code == 400
+    assert client.post('/api/media/upload', files={'file': ('a.txt', b'not an image', 'text/plain')}).status_code == 415
+    assert spool_files() == []